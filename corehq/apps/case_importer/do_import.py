@@ -2,7 +2,9 @@ from __future__ import annotations
 
 import uuid
 from collections import Counter, defaultdict, namedtuple
+from concurrent.futures import ThreadPoolExecutor
 
+from django.db import connections
 from django.utils.functional import cached_property
 from django.utils.translation import gettext_lazy as _
 
@@ -11,6 +13,7 @@ from couchdbkit import NoResultFound
 from casexml.apps.case.const import CASE_TAG_DATE_OPENED
 from casexml.apps.case.mock import CaseBlock, CaseBlockError
 from couchexport.export import SCALAR_NEVER_WAS
+from dimagi.utils.chunked import chunked
 from dimagi.utils.logging import notify_exception
 from soil.progress import TaskProgressManager
 
@@ -28,6 +31,7 @@ from corehq.form_processor.models import STANDARD_CHARFIELD_LENGTH
 from corehq.toggles import (
     BULK_UPLOAD_DATE_OPENED,
     CASE_IMPORT_DATA_DICTIONARY_VALIDATION,
+    CASE_IMPORT_PIPELINED_SUBMISSION,
     DOMAIN_PERMISSIONS_MIRROR,
 )
 from corehq.util.metrics import metrics_counter, metrics_histogram
@@ -54,10 +58,12 @@ from .exceptions import (
     UnexpectedError,
 )
 from .extension_points import custom_case_import_operations
-from .util import EXTERNAL_ID, RESERVED_FIELDS, lookup_case
+from .util import EXTERNAL_ID, RESERVED_FIELDS, lookup_case, lookup_cases
 
 RowAndCase = namedtuple('RowAndCase', ['row', 'case'])
 ALL_LOCATIONS = 'ALL_LOCATIONS'
+# The number of rows whose cases are looked up together
+CASE_LOOKUP_CHUNKSIZE = 1000
 
 
 def do_import(spreadsheet, config, domain, task=None, record_form_callback=None):
@@ -122,8 +128,10 @@ class _TimedAndThrottledImporter:
             user=self.user,
             record_form_callback=record_form_callback,
             throttle=True,
+            pipelined=CASE_IMPORT_PIPELINED_SUBMISSION.enabled(domain),
         )
         self.owner_accessor = _OwnerAccessor(domain, self.user)
+        self.case_lookup = _CaseLookup(domain, config)
         self._unsubmitted_caseblocks = []
         self.multi_domain = multi_domain
         if CASE_IMPORT_DATA_DICTIONARY_VALIDATION.enabled(self.domain):
@@ -146,26 +154,48 @@ class _TimedAndThrottledImporter:
         with TaskProgressManager(self.task, src="case_importer") as progress_manager:
             # context to be used by extensions to keep during import
             import_context = {}
-            for row_num, row in enumerate(spreadsheet.iter_row_dicts(), start=1):
-                progress_manager.set_progress(row_num - 1, spreadsheet.max_row)
-                if row_num == 1:
-                    continue  # skip first row (header row)
-
-                try:
-                    # check if there's a domain column, if true it's value should
-                    # match the current domain, else skip the row.
-                    if self.multi_domain:
-                        if self.domain != row.get('domain'):
-                            continue
-                    self.import_row(row_num, row, import_context)
-                except CaseRowErrorList as errors:
-                    self.results.add_errors(row_num, errors)
-                except CaseRowError as error:
-                    self.results.add_error(row_num, error)
-
-            self.submission_handler.commit_caseblocks()
+            rows = enumerate(spreadsheet.iter_row_dicts(), start=1)
+            for chunk in chunked(rows, CASE_LOOKUP_CHUNKSIZE, list):
+                self._prefetch_existing_cases(chunk)
+                for row_num, row in chunk:
+                    progress_manager.set_progress(row_num - 1, spreadsheet.max_row)
+                    if row_num == 1:
+                        continue  # skip first row (header row)
+
+                    try:
+                        # check if there's a domain column, if true it's value should
+                        # match the current domain, else skip the row.
+                        if self.multi_domain:
+                            if self.domain != row.get('domain'):
+                                continue
+                        self.import_row(row_num, row, import_context)
+                    except CaseRowErrorList as errors:
+                        self.results.add_errors(row_num, errors)
+                    except CaseRowError as error:
+                        self.results.add_error(row_num, error)
+
+            self.submission_handler.commit_caseblocks(wait=True)
             return self.results.to_json()
 
+    def _prefetch_existing_cases(self, chunk):
+        # Cases with uncreated external IDs are looked up after their
+        # case blocks have been committed
+        uncreated_external_ids = self.submission_handler.uncreated_external_ids
+        search_ids = []
+        for row_num, row in chunk:
+            if row_num == 1:
+                continue  # skip first row (header row)
+            if self.multi_domain and self.domain != row.get('domain'):
+                continue
+            try:
+                search_id = self._parse_search_id(row)
+            except KeyError:
+                # The error will be raised when the row is imported
+                continue
+            if search_id not in uncreated_external_ids:
+                search_ids.append(search_id)
+        self.case_lookup.prefetch(search_ids)
+
     def import_row(self, row_num, raw_row, import_context):
         search_id = self._parse_search_id(raw_row)
         fields_to_update = self._populate_updated_fields(raw_row)
@@ -187,9 +217,10 @@ class _TimedAndThrottledImporter:
             domain=self.domain,
             user_id=self.user.user_id,
             owner_accessor=self.owner_accessor,
+            case_lookup=self.case_lookup,
         )
         if row.relies_on_uncreated_case(self.submission_handler.uncreated_external_ids):
-            self.submission_handler.commit_caseblocks()
+            self.submission_handler.commit_caseblocks(wait=True)
         if row.is_new_case and not self.config.create_new_cases:
             return
 
@@ -205,8 +236,23 @@ class _TimedAndThrottledImporter:
         except CaseBlockError as e:
             raise CaseGeneration(message=str(e))
 
+        self._discard_changed_lookups(row)
         self.submission_handler.add_caseblock(RowAndCase(row_num, caseblock))
 
+    def _discard_changed_lookups(self, row):
+        """
+        Cases are looked up by external ID before the rows that precede
+        them are imported. If a row sets an external ID, later rows must
+        look up cases by that external ID again.
+        """
+        if self.config.search_field != EXTERNAL_ID:
+            return
+        external_id = row._get_external_id()
+        if external_id:
+            self.case_lookup.discard(external_id)
+            if not row.is_new_case:
+                self.case_lookup.discard(row.existing_case.external_id)
+
     def _has_custom_case_import_operations(self):
         return any(
             extension.should_call_for_domain(self.domain)
@@ -350,6 +396,12 @@ class SubmitCaseBlockHandler:
     ``SubmitCaseBlockHandler`` can handle the submission of large
     numbers of case blocks. It supports throttling.
 
+    If ``pipelined`` is ``True``, each chunk of case blocks is submitted
+    by a background thread, so that the caller can prepare the next
+    chunk while the last one is processed. Chunks are submitted one at
+    a time, in order. External IDs of cases that are being submitted
+    stay in ``uncreated_external_ids`` until their form is processed.
+
     Used by this module, ``corehq.apps.data_interfaces.tasks`` and
     ``corehq.apps.reports.filters.api``.
     """
@@ -364,6 +416,7 @@ class SubmitCaseBlockHandler:
         record_form_callback=None,
         throttle=False,
         add_inferred_props_to_schema=True,
+        pipelined=False,
     ):
         """
         Initialize ``SubmitCaseBlockHandler``.
@@ -380,6 +433,9 @@ class SubmitCaseBlockHandler:
             caseblock submissions.
         :param add_inferred_props_to_schema: If ``True``, add inferred
             properties to schema of ``case_type``
+        :param pipelined: If ``True``, submit case blocks in a
+            background thread. Callers must call
+            ``commit_caseblocks(wait=True)`` when they are done.
         """
         self.domain = domain
         self._unsubmitted_caseblocks: list[RowAndCase] = []
@@ -392,6 +448,9 @@ class SubmitCaseBlockHandler:
         self.add_inferred_props_to_schema = add_inferred_props_to_schema
         self.case_type = case_type
         self.user = user
+        self.pipelined = pipelined
+        self._executor = None
+        self._pending_submission = None  # (future, external IDs)
 
     def add_caseblock(self, caseblock):
         self._unsubmitted_caseblocks.append(caseblock)
@@ -399,12 +458,58 @@ class SubmitCaseBlockHandler:
         if len(self._unsubmitted_caseblocks) >= CASEBLOCK_CHUNKSIZE:
             self.commit_caseblocks()
 
-    def commit_caseblocks(self):
+    def commit_caseblocks(self, wait=False):
+        """
+        Submits unsubmitted case blocks. If ``pipelined`` is ``True``,
+        returns without waiting for them to be processed, unless
+        ``wait`` is ``True``.
+        """
+        if not self.pipelined:
+            if self._unsubmitted_caseblocks:
+                self.submit_and_process_caseblocks(self._unsubmitted_caseblocks)
+                self.results.num_chunks += 1
+                self._unsubmitted_caseblocks = []
+                self.uncreated_external_ids = set()
+            return
+
         if self._unsubmitted_caseblocks:
-            self.submit_and_process_caseblocks(self._unsubmitted_caseblocks)
+            # Only one chunk is submitted at a time
+            self._wait_for_submission()
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=1,
+                    thread_name_prefix='case-import-submission',
+                )
+            future = self._executor.submit(
+                self.submit_and_process_caseblocks,
+                self._unsubmitted_caseblocks,
+            )
+            self._pending_submission = (future, set(self.uncreated_external_ids))
             self.results.num_chunks += 1
             self._unsubmitted_caseblocks = []
-            self.uncreated_external_ids = set()
+        if wait:
+            self._wait_for_submission()
+            self._shutdown_executor()
+
+    def _wait_for_submission(self):
+        if self._pending_submission is None:
+            return
+        future, external_ids = self._pending_submission
+        self._pending_submission = None
+        try:
+            future.result()
+        except Exception:
+            self._shutdown_executor()
+            raise
+        self.uncreated_external_ids -= external_ids
+
+    def _shutdown_executor(self):
+        if self._executor is None:
+            return
+        # The submission thread has its own database connections
+        self._executor.submit(connections.close_all)
+        self._executor.shutdown(wait=True)
+        self._executor = None
 
     def submit_and_process_caseblocks(self, caseblocks):
         if not caseblocks:
@@ -492,13 +597,15 @@ class SubmitCaseBlockHandler:
 
 
 class _CaseImportRow(object):
-    def __init__(self, search_id, fields_to_update, config, domain, user_id, owner_accessor):
+    def __init__(self, search_id, fields_to_update, config, domain, user_id, owner_accessor,
+                 case_lookup=None):
         self.search_id = search_id
         self.fields_to_update = fields_to_update
         self.config = config
         self.domain = domain
         self.user_id = user_id
         self.owner_accessor = owner_accessor
+        self.case_lookup = case_lookup or _CaseLookup(domain, config)
 
         self.case_name = fields_to_update.pop('name', None)
         self._check_case_name()
@@ -547,12 +654,7 @@ class _CaseImportRow(object):
 
     @cached_property
     def existing_case(self):
-        case, error = lookup_case(
-            self.config.search_field,
-            self.search_id,
-            self.domain,
-            self.config.case_type
-        )
+        case, error = self.case_lookup.lookup(self.search_id)
         _log_case_lookup(self.domain)
         if error == LookupErrors.MultipleResults:
             raise TooManyMatches()
@@ -640,6 +742,42 @@ def _log_case_lookup(domain):
     case_load_counter("case_importer", domain)
 
 
+class _CaseLookup(object):
+    """
+    Looks up the cases that rows update by their search IDs.
+
+    ``prefetch()`` looks up the cases of a chunk of rows with one query
+    per shard, instead of one query per row. Search IDs that were not
+    prefetched, or were discarded, are looked up individually.
+    """
+
+    def __init__(self, domain, config):
+        self.domain = domain
+        self.search_field = config.search_field
+        self.case_type = config.case_type
+        self._results = {}
+
+    def prefetch(self, search_ids):
+        # Results are replaced, not accumulated, to bound memory use
+        search_ids = [search_id for search_id in search_ids if search_id]
+        if search_ids:
+            self._results = lookup_cases(self.search_field, search_ids, self.domain, self.case_type)
+        else:
+            self._results = {}
+
+    def lookup(self, search_id):
+        """
+        Returns a (case, error) tuple, like ``lookup_case()``
+        """
+        try:
+            return self._results[search_id]
+        except KeyError:
+            return lookup_case(self.search_field, search_id, self.domain, self.case_type)
+
+    def discard(self, search_id):
+        self._results.pop(search_id, None)
+
+
 class _ImportResults(object):
     CREATED = 'created'
     UPDATED = 'updated'
@@ -1,3 +1,4 @@
+import threading
 import uuid
 from contextlib import contextmanager
 from unittest.mock import Mock, patch
@@ -13,7 +14,12 @@ from casexml.apps.case.mock import CaseFactory, CaseStructure
 from casexml.apps.case.tests.util import delete_all_cases
 
 from corehq.apps.case_importer import exceptions
-from corehq.apps.case_importer.do_import import _CaseImportRow, do_import
+from corehq.apps.case_importer.do_import import (
+    RowAndCase,
+    SubmitCaseBlockHandler,
+    _CaseImportRow,
+    do_import,
+)
 from corehq.apps.case_importer.tasks import bulk_import_async
 from corehq.apps.case_importer.tracking.models import CaseUploadRecord
 from corehq.apps.case_importer.util import (
@@ -98,6 +104,53 @@ class TestCaseImportRow(SimpleTestCase):
         })
 
 
+class TestPipelinedSubmission(SimpleTestCase):
+
+    def get_handler(self):
+        return SubmitCaseBlockHandler(
+            'importer-test',
+            import_results=None,
+            case_type='importer-test-casetype',
+            user=Mock(),
+            pipelined=True,
+        )
+
+    @patch('corehq.apps.case_importer.do_import.CASEBLOCK_CHUNKSIZE', 2)
+    def test_chunks_submitted_in_order(self):
+        handler = self.get_handler()
+        submitted = []
+        with patch.object(handler, 'submit_and_process_caseblocks', side_effect=submitted.append):
+            for row_num in range(5):
+                handler.add_caseblock(RowAndCase(row_num, Mock()))
+            handler.commit_caseblocks(wait=True)
+        self.assertEqual(
+            [[caseblock.row for caseblock in chunk] for chunk in submitted],
+            [[0, 1], [2, 3], [4]],
+        )
+        self.assertEqual(handler.results.num_chunks, 3)
+
+    def test_external_ids_uncreated_until_processed(self):
+        handler = self.get_handler()
+        processing = threading.Event()
+        with patch.object(handler, 'submit_and_process_caseblocks',
+                          side_effect=lambda caseblocks: processing.wait(5)):
+            handler.uncreated_external_ids.add('abc123')
+            handler.add_caseblock(RowAndCase(1, Mock()))
+            handler.commit_caseblocks()
+            self.assertIn('abc123', handler.uncreated_external_ids)
+            processing.set()
+            handler.commit_caseblocks(wait=True)
+        self.assertNotIn('abc123', handler.uncreated_external_ids)
+
+    def test_submission_error_raised(self):
+        handler = self.get_handler()
+        with patch.object(handler, 'submit_and_process_caseblocks', side_effect=ValueError):
+            handler.add_caseblock(RowAndCase(1, Mock()))
+            handler.commit_caseblocks()
+            with self.assertRaises(ValueError):
+                handler.commit_caseblocks(wait=True)
+
+
 class ImporterTest(TestCase):
 
     def setUp(self):
@@ -327,6 +380,21 @@ class ImporterTest(TestCase):
         # shouldn't create any more cases, just the one
         self.assertEqual(1, len(CommCareCase.objects.get_case_ids_in_domain(self.domain)))
 
+    def test_existing_cases_looked_up_in_bulk(self):
+        [case] = self.factory.create_or_update_case(CaseStructure(attrs={'create': True}))
+        config = self._config(['case_id', 'age'])
+        file = make_worksheet_wrapper(
+            ['case_id', 'age'],
+            [case.case_id, 'age-0'],
+            [case.case_id, 'age-1'],
+        )
+        with patch('corehq.apps.case_importer.do_import.lookup_case') as lookup_case:
+            res = do_import(file, config, self.domain)
+        lookup_case.assert_not_called()
+        self.assertEqual(0, res['created_count'])
+        self.assertEqual(2, res['match_count'])
+        self.assertFalse(res['errors'])
+
     def test_external_id_matching_on_create_with_custom_column_name(self):
         headers = ['id_column', 'age', 'sex', 'location']
         external_id = 'external-id-test'
@@ -423,6 +491,22 @@ class ImporterTest(TestCase):
         for prop in ['age', 'sex', 'location']:
             self.assertTrue(prop in case.get_case_property(prop))
 
+    @patch('corehq.apps.case_importer.do_import.CASE_LOOKUP_CHUNKSIZE', 2)
+    def testExternalIdCreatedInPreviousLookupChunk(self):
+        headers = ['external_id', 'age']
+        config = self._config(headers, search_field='external_id')
+        file = make_worksheet_wrapper(
+            ['external_id', 'age'],
+            ['importer-test-external-id', 'age-0'],  # created in the first chunk
+            ['importer-test-external-id', 'age-1'],  # looked up in the second chunk
+        )
+
+        res = do_import(file, config, self.domain)
+        self.assertFalse(res['errors'])
+        self.assertEqual(1, res['created_count'])
+        self.assertEqual(1, res['match_count'])
+        self.assertEqual(1, len(CommCareCase.objects.get_case_ids_in_domain(self.domain)))
+
     def testParentCase(self):
         headers = ['parent_id', 'name', 'case_id']
         config = self._config(headers, create_new_cases=True, search_column='case_id')
@@ -66,6 +66,34 @@ class TestImporterUtils(TestCase):
         result = util.lookup_case(util.EXTERNAL_ID, "123", DOMAIN, "t1")
         self.checkResult(result, None, LookupErrors.MultipleResults)
 
+    def test_lookup_cases_with_case_ids(self):
+        results = util.lookup_cases("case_id", ["c1", "c2", "unknown"], DOMAIN, "t1")
+        self.checkResult(results["c1"], self.case1, None)
+        # c2 is in a different domain
+        self.checkResult(results["c2"], None, LookupErrors.NotFound)
+        self.checkResult(results["unknown"], None, LookupErrors.NotFound)
+
+    def test_lookup_cases_with_case_ids_and_wrong_type(self):
+        results = util.lookup_cases("case_id", ["c1"], DOMAIN, "t2")
+        self.checkResult(results["c1"], None, LookupErrors.NotFound)
+
+    def test_lookup_cases_with_external_ids(self):
+        results = util.lookup_cases(util.EXTERNAL_ID, ["123", "unknown"], DOMAIN, "t1")
+        self.checkResult(results["123"], self.case1, None)
+        self.checkResult(results["unknown"], None, LookupErrors.NotFound)
+
+    def test_lookup_cases_with_external_ids_and_wrong_type(self):
+        results = util.lookup_cases(util.EXTERNAL_ID, ["123"], DOMAIN, "t2")
+        self.checkResult(results["123"], None, LookupErrors.NotFound)
+
+    def test_lookup_cases_with_multiple_results(self):
+        case3_id = new_id_in_different_dbalias(self.case1.case_id)  # raises SkipTest on non-sharded db
+        case3 = _create_case(DOMAIN, case_id=case3_id, case_type='t1', external_id='123')
+        self.addCleanup(case3.delete)
+
+        results = util.lookup_cases(util.EXTERNAL_ID, ["123"], DOMAIN, "t1")
+        self.checkResult(results["123"], None, LookupErrors.MultipleResults)
+
     def checkResult(self, result, case, code):
         def get_case_id(case):
             return None if case is None else case.case_id
@@ -1,5 +1,5 @@
 import json
-from collections import OrderedDict, namedtuple
+from collections import OrderedDict, defaultdict, namedtuple
 from contextlib import contextmanager
 
 from celery import states
@@ -161,6 +161,40 @@ def lookup_case(search_field, search_id, domain, case_type):
     return (None, LookupErrors.NotFound)
 
 
+def lookup_cases(search_field, search_ids, domain, case_type):
+    """
+    Like ``lookup_case()``, but for many search IDs, with one query (per
+    shard) for all of them.
+
+    Returns a dictionary of search_id: (case, error) tuples.
+    """
+    search_ids = list(set(search_ids))
+    if search_field == 'case_id':
+        cases = CommCareCase.objects.get_cases(search_ids, domain)
+        cases_by_id = {
+            case.case_id: [case] for case in cases
+            if case.domain == domain and case.type == case_type
+        }
+    elif search_field == EXTERNAL_ID:
+        cases = CommCareCase.objects.get_cases_by_external_ids(domain, search_ids, case_type=case_type)
+        cases_by_id = defaultdict(list)
+        for case in cases:
+            cases_by_id[case.external_id].append(case)
+    else:
+        cases_by_id = {}
+
+    results = {}
+    for search_id in search_ids:
+        matches = cases_by_id.get(search_id)
+        if not matches:
+            results[search_id] = (None, LookupErrors.NotFound)
+        elif len(matches) > 1:
+            results[search_id] = (None, LookupErrors.MultipleResults)
+        else:
+            results[search_id] = (matches[0], None)
+    return results
+
+
 def open_spreadsheet_download_ref(filename):
     """
     open a spreadsheet download ref just to test there are no errors opening it
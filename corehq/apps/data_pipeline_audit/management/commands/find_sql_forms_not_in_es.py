@@ -55,13 +55,16 @@ class Command(BaseCommand):
 
 
 def iter_form_ids_by_last_modified(start_datetime, end_datetime):
-    from corehq.sql_db.util import paginate_query_across_partitioned_databases
+    from corehq.sql_db.util import (
+        paginate_query_across_partitioned_databases_in_parallel,
+    )
 
     annotate = {
         'last_modified': Greatest('received_on', 'edited_on', 'deleted_on'),
     }
 
-    return paginate_query_across_partitioned_databases(
+    # Form IDs are looked up in ES in chunks, so their order doesn't matter
+    return paginate_query_across_partitioned_databases_in_parallel(
         XFormInstance,
         (Q(last_modified__gt=start_datetime, last_modified__lt=end_datetime)
          & Q(state__in=[XFormInstance.NORMAL, XFormInstance.ARCHIVED])),
@@ -3,13 +3,14 @@ from django.utils.translation import gettext as _
 from django.forms.models import model_to_dict
 from django.core.exceptions import ValidationError
 
+from corehq import toggles
 from corehq.apps.geospatial.const import (
     GPS_POINT_CASE_PROPERTY,
     TRAVEL_MODE_WALKING,
     TRAVEL_MODE_CYCLING,
     TRAVEL_MODE_DRIVING,
 )
-from corehq.apps.geospatial.routing_solvers import pulp
+from corehq.apps.geospatial.routing_solvers import clustered, pulp
 from corehq.motech.const import ALGO_AES, ALGO_AES_CBC
 from corehq.motech.utils import (
     b64_aes_decrypt,
@@ -110,9 +111,15 @@ class GeoConfig(models.Model):
 
     @property
     def disbursement_solver(self):
-        return self.VALID_DISBURSEMENT_ALGORITHM_CLASSES[
+        solver_class = self.VALID_DISBURSEMENT_ALGORITHM_CLASSES[
             self.selected_disbursement_algorithm
         ]
+        if (
+            solver_class is pulp.RadialDistanceSolver
+            and toggles.CLUSTERED_DISBURSEMENT_ALGORITHM.enabled(self.domain)
+        ):
+            return clustered.ClusteredRadialDistanceSolver
+        return solver_class
 
     @property
     def plaintext_api_token(self):
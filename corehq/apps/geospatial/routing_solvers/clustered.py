@@ -0,0 +1,258 @@
+"""
+Clustered case disbursement
+===========================
+
+``RadialDistanceSolver`` creates a decision variable for every pair of
+user and case, so the time and memory it needs to solve a disbursement
+grow with the number of users times the number of cases.
+
+``ClusteredRadialDistanceSolver`` splits a large disbursement into
+smaller ones:
+
+1. Users are grouped into clusters of nearby users with k-means, with
+   about ``USERS_PER_CLUSTER`` users per cluster.
+
+2. Cases are added to the nearest cluster that has capacity for them.
+   A cluster's capacity is its number of users times the maximum
+   number of cases per user, so cases near a busy cluster overflow into
+   the neighbouring clusters.
+
+3. Each cluster is solved by ``RadialDistanceSolver``. pulp runs the
+   solver in a subprocess, so clusters are solved in parallel.
+
+4. Cases that were not assigned in their cluster are assigned to the
+   nearest user, in any cluster, who has capacity for them and is
+   within the maximum case distance.
+
+The minimum number of cases per user is applied within each cluster.
+If a cluster cannot meet it, the cluster is solved again without it.
+"""
+import copy
+import math
+from concurrent.futures import ThreadPoolExecutor
+
+from corehq.apps.geospatial.routing_solvers.base import DisbursementAlgorithmSolverInterface
+from corehq.apps.geospatial.routing_solvers.mapbox_utils import validate_routing_request
+from corehq.apps.geospatial.routing_solvers.pulp import (
+    Parameters,
+    RadialDistanceSolver,
+    great_circle_distances,
+    parse_points,
+)
+
+USERS_PER_CLUSTER = 20
+KMEANS_ITERATIONS = 10
+MAX_PARALLEL_SOLVES = 4
+
+
+class ClusteredRadialDistanceSolver(DisbursementAlgorithmSolverInterface):
+    """
+    Solves user-case location assignment based on radial distance, for
+    clusters of nearby users and cases
+    """
+
+    def __init__(self, request_json):
+        super().__init__(request_json)
+
+        validate_routing_request(request_json)
+        self.user_locations = request_json['users']
+        self.case_locations = request_json['cases']
+
+    def get_parameters(self, config):
+        return Parameters(
+            config=config,
+            user_count=len(self.user_locations),
+            case_count=len(self.case_locations),
+        )
+
+    def solve(self, config, print_solution=False):
+        cluster_count = math.ceil(len(self.user_locations) / USERS_PER_CLUSTER)
+        if cluster_count <= 1 or not self.case_locations:
+            return RadialDistanceSolver(self.request_json).solve(config)
+
+        parameters = self.get_parameters(config)
+        try:
+            user_points = parse_points(self.user_locations)
+            case_points = parse_points(self.case_locations)
+        except ValueError as e:
+            raise ValueError('Some user and/or case locations are invalid') from e
+
+        user_labels, centroids = kmeans(
+            [to_vector(point) for point in user_points],
+            cluster_count,
+        )
+        cluster_users = [[] for __ in centroids]
+        for i, label in enumerate(user_labels):
+            cluster_users[label].append(i)
+        capacities = [len(users) * parameters.max_cases_per_user for users in cluster_users]
+        cluster_cases = assign_to_clusters(
+            [to_vector(point) for point in case_points],
+            centroids,
+            capacities,
+        )
+
+        # The default maximum number of cases per user depends on the
+        # number of users and cases, so it is set for all clusters
+        cluster_config = copy.copy(config)
+        cluster_config.max_cases_per_user = parameters.max_cases_per_user
+        problems = [
+            (users, cases)
+            for users, cases in zip(cluster_users, cluster_cases)
+            if users and cases
+        ]
+        with ThreadPoolExecutor(max_workers=MAX_PARALLEL_SOLVES) as executor:
+            results = list(executor.map(
+                lambda problem: self._solve_cluster(*problem, cluster_config),
+                problems,
+            ))
+
+        assigned = {loc['id']: [] for loc in self.user_locations}
+        assigned_case_ids = set()
+        for cluster_assigned in results:
+            for user_id, case_ids in cluster_assigned.items():
+                assigned[user_id].extend(case_ids)
+                assigned_case_ids.update(case_ids)
+
+        unassigned_case_indexes = [
+            j for j, case in enumerate(self.case_locations)
+            if case['id'] not in assigned_case_ids
+        ]
+        unassigned = self._assign_to_nearest_users(
+            unassigned_case_indexes,
+            assigned,
+            user_points,
+            case_points,
+            parameters,
+        )
+        return RadialDistanceSolver.solution_results(
+            assigned=assigned,
+            unassigned=[copy.deepcopy(self.case_locations[j]) for j in unassigned],
+            parameters=parameters,
+        )
+
+    def _solve_cluster(self, user_indexes, case_indexes, config):
+        """
+        Returns a dictionary of the case IDs assigned to each user ID in
+        the cluster
+        """
+        solver = RadialDistanceSolver({
+            'users': [self.user_locations[i] for i in user_indexes],
+            'cases': [self.case_locations[j] for j in case_indexes],
+        })
+        result = solver.solve(config)
+        if not result['assigned'] and config.min_cases_per_user:
+            # The problem is infeasible, probably because there are too
+            # few cases in the cluster for its users' minimum
+            relaxed_config = copy.copy(config)
+            relaxed_config.min_cases_per_user = 0
+            result = solver.solve(relaxed_config)
+        return result['assigned'] or {}
+
+    def _assign_to_nearest_users(self, case_indexes, assigned, user_points, case_points, parameters):
+        """
+        Assigns each case to the nearest user with capacity for it.
+        Updates ``assigned``, and returns the indexes of cases that
+        could not be assigned.
+        """
+        remaining_capacity = [
+            parameters.max_cases_per_user - len(assigned[loc['id']])
+            for loc in self.user_locations
+        ]
+        unassigned = []
+        for j in case_indexes:
+            distances = great_circle_distances(case_points[j], user_points)
+            candidates = [
+                (distance, i) for i, distance in enumerate(distances)
+                if remaining_capacity[i] > 0
+                and RadialDistanceSolver.is_valid_user_case(parameters, distance_to_case=distance)
+            ]
+            if not candidates:
+                unassigned.append(j)
+                continue
+            __, i = min(candidates)
+            assigned[self.user_locations[i]['id']].append(self.case_locations[j]['id'])
+            remaining_capacity[i] -= 1
+        return unassigned
+
+
+def to_vector(point):
+    """
+    Returns the position of ``point`` on the unit sphere, so that
+    points that are near each other have vectors that are near each
+    other, including across the antimeridian.
+    """
+    lat, lon, cos_lat = point
+    return (cos_lat * math.cos(lon), cos_lat * math.sin(lon), math.sin(lat))
+
+
+def _squared_distance(a, b):
+    return (a[0] - b[0]) ** 2 + (a[1] - b[1]) ** 2 + (a[2] - b[2]) ** 2
+
+
+def _nearest(vector, centroids):
+    return min(range(len(centroids)), key=lambda c: _squared_distance(vector, centroids[c]))
+
+
+def kmeans(vectors, k, iterations=KMEANS_ITERATIONS):
+    """
+    Groups ``vectors`` into ``k`` clusters.
+
+    Returns a list of the cluster of each vector, and a list of the
+    centroids of the clusters. Initial centroids are chosen by farthest
+    point sampling, so that results are deterministic.
+    """
+    centroids = [vectors[0]]
+    min_distances = [_squared_distance(v, centroids[0]) for v in vectors]
+    while len(centroids) < min(k, len(vectors)):
+        farthest = max(range(len(vectors)), key=min_distances.__getitem__)
+        centroids.append(vectors[farthest])
+        min_distances = [
+            min(distance, _squared_distance(v, vectors[farthest]))
+            for v, distance in zip(vectors, min_distances)
+        ]
+
+    labels = None
+    for __ in range(iterations):
+        new_labels = [_nearest(v, centroids) for v in vectors]
+        if new_labels == labels:
+            break
+        labels = new_labels
+        sums = [[0.0, 0.0, 0.0] for __ in centroids]
+        for v, label in zip(vectors, labels):
+            for axis in range(3):
+                sums[label][axis] += v[axis]
+        for c, total in enumerate(sums):
+            norm = math.sqrt(sum(value ** 2 for value in total))
+            if norm:
+                # Clusters that lost all their vectors keep their centroid
+                centroids[c] = tuple(value / norm for value in total)
+    return labels, centroids
+
+
+def assign_to_clusters(vectors, centroids, capacities):
+    """
+    Adds each vector to the nearest cluster that has capacity for it.
+    Vectors are added in order of their distance to the cluster, so a
+    cluster is filled with the vectors nearest to it.
+
+    Returns a list of the indexes of the vectors in each cluster.
+    Vectors that do not fit in any cluster are left out.
+    """
+    pairs = sorted(
+        (_squared_distance(v, centroid), j, c)
+        for j, v in enumerate(vectors)
+        for c, centroid in enumerate(centroids)
+        if capacities[c] > 0
+    )
+    remaining_capacity = list(capacities)
+    clusters = [[] for __ in centroids]
+    added = set()
+    for __, j, c in pairs:
+        if j in added or not remaining_capacity[c]:
+            continue
+        clusters[c].append(j)
+        remaining_capacity[c] -= 1
+        added.add(j)
+    for cluster in clusters:
+        cluster.sort()
+    return clusters
@@ -1,12 +1,17 @@
-import haversine
+import bisect
+import math
 import requests
 import pulp
 import copy
 
+from collections import defaultdict
 from dataclasses import dataclass
 from .mapbox_utils import validate_routing_request
 from corehq.apps.geospatial.routing_solvers.base import DisbursementAlgorithmSolverInterface
 
+# The mean radius of the Earth, as used by the haversine library
+EARTH_RADIUS_KM = 6371.0088
+
 
 @dataclass
 class Parameters:
@@ -32,11 +37,51 @@ class Parameters:
             self.max_case_travel_time_seconds = max_travel_time_secs
 
 
+def parse_points(locations):
+    """
+    Returns a list of (latitude, longitude, cosine of latitude) tuples
+    for ``locations``, with latitude and longitude in radians.
+
+    Raises ValueError if a location's coordinates are invalid.
+    """
+    points = []
+    for loc in locations:
+        lat = float(loc['lat'])
+        lon = float(loc['lon'])
+        if not (-90 <= lat <= 90 and -180 <= lon <= 180):
+            raise ValueError(f'Invalid coordinates: {lat}, {lon}')
+        lat = math.radians(lat)
+        points.append((lat, math.radians(lon), math.cos(lat)))
+    return points
+
+
+def great_circle_distances(point, points):
+    """
+    Returns the haversine distances in kilometers from ``point`` to each
+    of ``points``, which are given as returned by ``parse_points()``.
+    """
+    lat1, lon1, cos_lat1 = point
+    sin, asin, sqrt = math.sin, math.asin, math.sqrt
+    diameter = 2 * EARTH_RADIUS_KM
+    return [
+        diameter * asin(sqrt(
+            sin((lat2 - lat1) * 0.5) ** 2
+            + cos_lat1 * cos_lat2 * sin((lon2 - lon1) * 0.5) ** 2
+        ))
+        for lat2, lon2, cos_lat2 in points
+    ]
+
+
 class RadialDistanceSolver(DisbursementAlgorithmSolverInterface):
     """
     Solves user-case location assignment based on radial distance
 
+    If a maximum case distance is set, only user-case pairs within that
+    distance are added to the linear programming problem, and cases
+    that are not near any user are left unassigned.
     """
+    # Distances can be calculated for nearby pairs only
+    prunes_distant_cases = True
 
     def __init__(self, request_json):
         super().__init__(request_json)
@@ -46,18 +91,41 @@ class RadialDistanceSolver(DisbursementAlgorithmSolverInterface):
         self.case_locations = request_json['cases']
 
     def calculate_distance_matrix(self, config):
-        distance_matrix = []
-        for user in self.user_locations:
-            user_point = (float(user['lat']), float(user['lon']))
-            user_distances = []
-            for case in self.case_locations:
-                case_point = (float(case['lat']), float(case['lon']))
-                user_distances.append(haversine.haversine(case_point, user_point))
-
-            distance_matrix.append(user_distances)
-
+        case_points = parse_points(self.case_locations)
+        distance_matrix = [
+            great_circle_distances(user_point, case_points)
+            for user_point in parse_points(self.user_locations)
+        ]
         return distance_matrix, None
 
+    def calculate_nearby_distances(self, max_distance):
+        """
+        Returns a dictionary of distances in kilometers, keyed by
+        (user index, case index), of user-case pairs that are within
+        ``max_distance`` kilometers of each other.
+
+        A pair's great-circle distance is at least the distance between
+        their latitudes, so cases are sorted by latitude, and distances
+        are only calculated for cases within ``max_distance`` of each
+        user's latitude.
+        """
+        case_points = parse_points(self.case_locations)
+        case_order = sorted(range(len(case_points)), key=lambda j: case_points[j][0])
+        sorted_lats = [case_points[j][0] for j in case_order]
+        max_lat_delta = max_distance / EARTH_RADIUS_KM
+
+        distances = {}
+        for i, user_point in enumerate(parse_points(self.user_locations)):
+            user_lat = user_point[0]
+            start = bisect.bisect_left(sorted_lats, user_lat - max_lat_delta)
+            end = bisect.bisect_right(sorted_lats, user_lat + max_lat_delta)
+            nearby = case_order[start:end]
+            nearby_distances = great_circle_distances(user_point, [case_points[j] for j in nearby])
+            for j, distance in zip(nearby, nearby_distances):
+                if distance <= max_distance:
+                    distances[i, j] = distance
+        return distances
+
     def get_parameters(self, config):
         return Parameters(
             config=config,
@@ -68,6 +136,14 @@ class RadialDistanceSolver(DisbursementAlgorithmSolverInterface):
     def solve(self, config, print_solution=False):
         parameters = self.get_parameters(config)
 
+        if (
+            self.prunes_distant_cases
+            and parameters.max_case_distance
+            and self.user_locations
+            and self.case_locations
+        ):
+            return self.solve_for_nearby_cases(parameters)
+
         try:
             distance_costs, duration_costs = self.calculate_distance_matrix(config)
         except ValueError as e:
@@ -137,6 +213,74 @@ class RadialDistanceSolver(DisbursementAlgorithmSolverInterface):
             parameters=parameters,
         )
 
+    def solve_for_nearby_cases(self, parameters):
+        """
+        Assigns cases to users within ``parameters.max_case_distance``.
+
+        Only nearby user-case pairs get decision variables, so the size
+        of the problem depends on how many cases are near each user,
+        not on the number of users times the number of cases. A user's
+        minimum number of cases is limited to the number of cases near
+        them.
+
+        As many nearby cases as possible are assigned, and then the
+        total distance is minimized: Leaving a case unassigned costs
+        more than the total distance of all nearby cases, so cases are
+        only left unassigned if the users near them already have their
+        maximum number of cases.
+        """
+        try:
+            distance_costs = self.calculate_nearby_distances(parameters.max_case_distance)
+        except ValueError as e:
+            raise ValueError('Some user and/or case locations are invalid') from e
+
+        solution = {loc['id']: [] for loc in self.user_locations}
+        assigned_case_indexes = set()
+        if distance_costs:
+            decision_variables = {
+                (i, j): pulp.LpVariable(f"x_{i}_{j}", lowBound=0, upBound=1, cat=pulp.LpBinary)
+                for i, j in sorted(distance_costs)
+            }
+            user_variables = defaultdict(list)
+            case_variables = defaultdict(list)
+            for (i, j), variable in decision_variables.items():
+                user_variables[i].append(variable)
+                case_variables[j].append(variable)
+
+            problem = pulp.LpProblem("assign_user_cases", sense=pulp.LpMinimize)
+            for variables in user_variables.values():
+                problem += pulp.lpSum(variables) <= parameters.max_cases_per_user
+                problem += pulp.lpSum(variables) >= min(parameters.min_cases_per_user, len(variables))
+            for variables in case_variables.values():
+                problem += pulp.lpSum(variables) <= 1
+            unassigned_case_cost = parameters.max_case_distance * len(case_variables) + 1
+            problem += pulp.lpSum(
+                (distance_costs[i, j] - unassigned_case_cost) * variable
+                for (i, j), variable in decision_variables.items()
+            )
+            problem.solve()
+
+            if pulp.LpStatus[problem.status] != "Optimal":
+                return self.solution_results(
+                    assigned=[],
+                    unassigned=copy.deepcopy(self.case_locations),
+                    parameters=parameters,
+                )
+            for (i, j), variable in decision_variables.items():
+                if pulp.value(variable) > 0.5:
+                    solution[self.user_locations[i]['id']].append(self.case_locations[j]['id'])
+                    assigned_case_indexes.add(j)
+
+        unassigned_cases = [
+            copy.deepcopy(case) for j, case in enumerate(self.case_locations)
+            if j not in assigned_case_indexes
+        ]
+        return self.solution_results(
+            assigned=solution,
+            unassigned=unassigned_cases,
+            parameters=parameters,
+        )
+
     @staticmethod
     def solution_results(assigned, unassigned, parameters):
         return {"assigned": assigned, "unassigned": unassigned, "parameters": parameters.__dict__}
@@ -187,6 +331,8 @@ class RoadNetworkSolver(RadialDistanceSolver):
     """
     Solves user-case location assignment based on driving distance
     """
+    # Driving distances are not known until the Mapbox matrix is fetched
+    prunes_distant_cases = False
 
     def calculate_distance_matrix(self, config):
         # Todo; support more than Mapbox limit by chunking
@@ -0,0 +1,141 @@
+import math
+from unittest.mock import patch
+
+from django.test import SimpleTestCase
+
+from corehq.apps.geospatial.models import GeoConfig
+from corehq.apps.geospatial.routing_solvers.clustered import (
+    ClusteredRadialDistanceSolver,
+    assign_to_clusters,
+    kmeans,
+    to_vector,
+)
+from corehq.apps.geospatial.routing_solvers.pulp import RadialDistanceSolver
+from corehq.util.test_utils import flag_enabled
+
+
+def _vector(lat, lon):
+    lat = math.radians(lat)
+    return to_vector((lat, math.radians(lon), math.cos(lat)))
+
+
+@patch('corehq.apps.geospatial.routing_solvers.clustered.USERS_PER_CLUSTER', 1)
+class TestClusteredRadialDistanceSolver(SimpleTestCase):
+
+    @property
+    def _problem_data(self):
+        return {
+            "users": [
+                {"id": "New York", "lon": -73.9750671, "lat": 40.7638143},
+                {"id": "Los Angeles", "lon": -117.618932, "lat": 33.045205}
+            ],
+            "cases": [
+                {"id": "New Hampshire", "lon": -71.572395, "lat": 43.193851},
+                {"id": "Phoenix", "lon": -110.475177, "lat": 33.870416},
+                {"id": "Newark", "lat": 40.78787248247479, "lon": -74.21003634906795},
+                {"id": "NY2", "lat": 40.98704295395249, "lon": -75.21263845406212},
+                {"id": "LA2", "lat": 38.72911676426769, "lon": -114.95862208084543},
+                {"id": "LA3", "lat": 35.39353835883682, "lon": -110.9340138985604},
+                {"id": "Dallas", "lat": 34.4679113819021, "lon": -96.58954660416406},
+                {"id": "Jackson", "lat": 40.55517003526139, "lon": -106.34189549259928},
+            ],
+        }
+
+    def test_basic(self):
+        config = GeoConfig()
+        solver = ClusteredRadialDistanceSolver(self._problem_data)
+        params = solver.get_parameters(config=config)
+
+        self.assertEqual(
+            solver.solve(config), {
+                'assigned': {
+                    'New York': ['New Hampshire', 'Newark', 'NY2'],
+                    'Los Angeles': ['Phoenix', 'LA2', 'LA3', 'Dallas', 'Jackson']
+                }, 'unassigned': [], 'parameters': params.__dict__}
+        )
+
+    def test_cases_overflow_into_neighbouring_cluster(self):
+        config = GeoConfig(max_cases_per_user=4)
+        solver = ClusteredRadialDistanceSolver(self._problem_data)
+        params = solver.get_parameters(config=config)
+
+        self.assertEqual(
+            solver.solve(config), {
+                'assigned': {
+                    'New York': ['New Hampshire', 'Newark', 'NY2', 'Dallas'],
+                    'Los Angeles': ['Phoenix', 'LA2', 'LA3', 'Jackson']
+                }, 'unassigned': [], 'parameters': params.__dict__}
+        )
+
+    def test_more_cases_than_is_assignable(self):
+        config = GeoConfig(max_cases_per_user=3)
+        solver = ClusteredRadialDistanceSolver(self._problem_data)
+
+        result = solver.solve(config)
+        self.assertEqual(sum(len(case_ids) for case_ids in result['assigned'].values()), 6)
+        self.assertEqual(len(result['unassigned']), 2)
+
+    def test_cases_too_far_distance(self):
+        config = GeoConfig(max_case_distance=1)
+        solver = ClusteredRadialDistanceSolver(self._problem_data)
+        params = solver.get_parameters(config=config)
+
+        self.assertEqual(
+            solver.solve(config), {
+                'assigned': {'New York': [], 'Los Angeles': []},
+                'unassigned': self._problem_data['cases'],
+                'parameters': params.__dict__,
+            }
+        )
+
+    def test_incorrect_data(self):
+        problem_data = self._problem_data
+        problem_data['cases'] = [
+            {'id': 'Wrong', 'lat': 'incorrect-data', 'lon': 21.20},
+        ]
+        with self.assertRaises(ValueError):
+            ClusteredRadialDistanceSolver(problem_data).solve(GeoConfig())
+
+
+class TestClustering(SimpleTestCase):
+
+    def test_kmeans(self):
+        vectors = [
+            _vector(40.7, -74.0),
+            _vector(40.8, -73.9),
+            _vector(34.0, -118.2),
+            _vector(34.1, -118.3),
+            _vector(0, 179.9),
+            _vector(0, -179.9),
+        ]
+        labels, centroids = kmeans(vectors, 3)
+        self.assertEqual(len(centroids), 3)
+        self.assertEqual(labels[0], labels[1])
+        self.assertEqual(labels[2], labels[3])
+        self.assertEqual(labels[4], labels[5])
+        self.assertEqual(len(set(labels)), 3)
+
+    def test_assign_to_clusters(self):
+        centroids = [_vector(40.7, -74.0), _vector(34.0, -118.2)]
+        vectors = [_vector(40.7, -74.0)] * 3 + [_vector(34.0, -118.2)]
+        self.assertEqual(
+            assign_to_clusters(vectors, centroids, [2, 10]),
+            [[0, 1], [2, 3]],
+        )
+
+    def test_assign_to_clusters_over_capacity(self):
+        centroids = [_vector(40.7, -74.0)]
+        vectors = [_vector(40.7, -74.0)] * 3
+        self.assertEqual(assign_to_clusters(vectors, centroids, [2]), [[0, 1]])
+
+
+class TestDisbursementSolver(SimpleTestCase):
+
+    def test_radial_algorithm(self):
+        config = GeoConfig(domain='test-domain')
+        self.assertIs(config.disbursement_solver, RadialDistanceSolver)
+
+    @flag_enabled('CLUSTERED_DISBURSEMENT_ALGORITHM')
+    def test_clustered_radial_algorithm(self):
+        config = GeoConfig(domain='test-domain')
+        self.assertIs(config.disbursement_solver, ClusteredRadialDistanceSolver)
@@ -154,6 +154,62 @@ class TestRadialDistanceSolver(SimpleTestCase):
         with self.assertRaises(ValueError):
             RadialDistanceSolver(problem_data).calculate_distance_matrix(config)
 
+    def test_incorrect_data_for_nearby_distances(self):
+        problem_data = self._problem_data
+        problem_data['cases'] = [
+            {'id': 'Wrong', 'lat': 'incorrect-data', 'lon': 21.20},
+        ]
+        with self.assertRaises(ValueError):
+            RadialDistanceSolver(problem_data).calculate_nearby_distances(1000)
+
+    def test_nearby_distances_match_distance_matrix(self):
+        distance_matrix, __ = self.solver.calculate_distance_matrix(GeoConfig())
+        expected = {
+            (i, j): distance
+            for i, row in enumerate(distance_matrix)
+            for j, distance in enumerate(row)
+            if distance <= 1000
+        }
+        self.assertEqual(self.solver.calculate_nearby_distances(1000), expected)
+
+    def test_cases_within_distance(self):
+        config = GeoConfig(max_case_distance=1000)
+        params = self.solver.get_parameters(config=config)
+        cases = self._problem_data['cases']
+
+        self.assertEqual(
+            self.solver.solve(config), {
+                'assigned': {
+                    'New York': ['New Hampshire', 'Newark', 'NY2'],
+                    'Los Angeles': ['Phoenix', 'LA2', 'LA3'],
+                },
+                'unassigned': [case for case in cases if case['id'] in ('Dallas', 'Jackson')],
+                'parameters': params.__dict__,
+            }
+        )
+
+    def test_more_nearby_cases_than_max_cases_per_user(self):
+        problem_data = self._problem_data
+        problem_data['cases'] = [
+            {"id": f"NY{i}", "lat": 40.7638143 + i / 100, "lon": -73.9750671}
+            for i in range(8)
+        ]
+        solver = RadialDistanceSolver(problem_data)
+        config = GeoConfig(max_case_distance=100)
+        params = solver.get_parameters(config=config)
+        self.assertEqual(params.max_cases_per_user, 5)
+
+        self.assertEqual(
+            solver.solve(config), {
+                'assigned': {
+                    'New York': ['NY0', 'NY1', 'NY2', 'NY3', 'NY4'],
+                    'Los Angeles': [],
+                },
+                'unassigned': problem_data['cases'][5:],
+                'parameters': params.__dict__,
+            }
+        )
+
 
 class TestRoadNetworkSolver(SimpleTestCase):
 
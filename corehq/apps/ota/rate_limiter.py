@@ -46,11 +46,9 @@ def rate_limit_restore(domain):
 
 def _rate_limit_restore(domain):
 
-    allow_usage = restore_rate_limiter.allow_usage(domain)
+    allow_usage = restore_rate_limiter.allow_and_report_usage(domain)
 
-    if allow_usage:
-        restore_rate_limiter.report_usage(domain)
-    else:
+    if not allow_usage:
         metrics_counter('commcare.restore.rate_limited', tags={
             'domain': domain,
         })
@@ -182,6 +182,10 @@ class IndicatorAdapterLoadTracker(object):
         self._track_load(len(rows))
         self.adapter.save_rows(rows, use_shard_col)
 
+    def copy_rows(self, rows, fresh_table=False):
+        self._track_load(len(rows))
+        self.adapter.copy_rows(rows, fresh_table)
+
     def delete(self, doc, use_shard_col=True):
         self._track_load()
         self.adapter.delete(doc, use_shard_col)
@@ -0,0 +1,339 @@
+"""Compile data source filters and indicators into flat functions
+
+The interpreter evaluates a data source by walking the tree of expression,
+filter and indicator objects built from its spec for every document, with
+each node dispatching to its children through ``__call__``. For data
+sources with many columns most of the transform time is spent in that
+dispatch rather than in looking up values.
+
+``CompiledDataSource`` walks the same objects once and replaces the nodes
+it knows about with functions bound to their configuration (property
+names, datatype transforms, constant operands). The indicators are
+flattened into a single list of column getters. Subexpressions which
+occur more than once in the data source (for example the same property
+path read by several columns, or the same related document lookup) are
+evaluated once per item and stored in the evaluation context's iteration
+cache. Named expressions use the same cache key as
+``NamedExpressionSpec`` so their results are shared with any part of the
+data source that is still interpreted.
+
+Nodes the compiler does not know about are called as they are, so any
+expression type is supported; it is just not compiled.
+"""
+import itertools
+import json
+from functools import partial
+
+from jsonobject import JsonObject
+
+from corehq.apps.userreports.expressions.getters import (
+    TransformedGetter,
+    safe_recursive_lookup,
+    transform_for_datatype,
+)
+from corehq.apps.userreports.expressions.specs import (
+    ConditionalExpressionSpec,
+    ConstantGetterSpec,
+    IdentityExpressionSpec,
+    IterationNumberExpressionSpec,
+    NamedExpressionSpec,
+    PropertyNameGetterSpec,
+    PropertyPathGetterSpec,
+    RootDocExpressionSpec,
+    SwitchExpressionSpec,
+)
+from corehq.apps.userreports.filters import (
+    ANDFilter,
+    NamedFilter,
+    NOTFilter,
+    ORFilter,
+    SinglePropertyValueFilter,
+)
+from corehq.apps.userreports.indicators import (
+    BooleanIndicator,
+    ColumnValue,
+    CompoundIndicator,
+    RawIndicator,
+)
+
+_compilation_ids = itertools.count()
+
+
+class CompiledDataSource:
+    """Compiled main filter, base item expression and indicators of a
+    data source configuration.
+
+    ``filter``, ``base_item_expression`` and ``get_values`` take the same
+    arguments and return the same values as the interpreted
+    ``DataSourceConfiguration._get_main_filter()``,
+    ``DataSourceConfiguration.parsed_expression`` and
+    ``DataSourceConfiguration.indicators.get_values``.
+    """
+
+    def __init__(self, config):
+        roots = (config._get_main_filter(), config.parsed_expression, config.indicators)
+        # The first pass counts how often each subexpression occurs, the
+        # second compiles with caching for those occurring more than once.
+        counting = _Compiler(occurrences=None)
+        counting.compile(*roots)
+        compiler = _Compiler(occurrences=counting.occurrences)
+        self.filter, self.base_item_expression, self._getters = compiler.compile(*roots)
+
+    def get_values(self, item, evaluation_context=None):
+        values = []
+        for column, getter in self._getters:
+            if column is None:
+                values.extend(getter(item, evaluation_context))
+            else:
+                values.append(ColumnValue(column, getter(item, evaluation_context)))
+        return values
+
+
+class _Compiler:
+
+    def __init__(self, occurrences):
+        self.counting = occurrences is None
+        self.occurrences = {} if occurrences is None else occurrences
+        self.compilation_id = next(_compilation_ids)
+        self.slots = {}
+        self.named_expressions = {}
+
+    def compile(self, filter_, base_item_expression, indicators):
+        return (
+            self.filter(filter_)[0],
+            self.expression(base_item_expression)[0] if base_item_expression else None,
+            self.indicators(indicators),
+        )
+
+    def indicators(self, indicator):
+        """Flatten an indicator into a list of ``(column, getter)`` pairs
+
+        ``column`` is ``None`` for indicators which are not compiled, in
+        which case ``getter`` returns a list of ``ColumnValue`` objects.
+        """
+        if isinstance(indicator, CompoundIndicator):
+            return [getter for sub in indicator.indicators for getter in self.indicators(sub)]
+        if isinstance(indicator, BooleanIndicator):
+            filter_fn = self.filter(indicator.filter)[0]
+            return [(indicator.column, partial(_boolean_value, filter_fn))]
+        if isinstance(indicator, RawIndicator):
+            return [(indicator.column, self.expression(indicator.getter)[0])]
+        return [(None, indicator.get_values)]
+
+    def expression(self, node):
+        """Compile an expression
+
+        :returns: ``(fn, key)`` where ``key`` identifies the expression
+        for sharing its result, or is ``None`` if it cannot be shared.
+        """
+        fn, key, cheap = self._expression(node)
+        return self._share(fn, key, cheap), key
+
+    def filter(self, node):
+        fn, key, cheap = self._filter(node)
+        return self._share(fn, key, cheap), key
+
+    def _share(self, fn, key, cheap):
+        if key is None or cheap:
+            return fn
+        if self.counting:
+            self.occurrences[key] = self.occurrences.get(key, 0) + 1
+            return fn
+        if self.occurrences.get(key, 0) < 2:
+            return fn
+        slot = self.slots.setdefault(key, len(self.slots))
+        return partial(_shared_value, fn, (self.compilation_id, slot))
+
+    def _expression(self, node):
+        if isinstance(node, (IdentityExpressionSpec, IterationNumberExpressionSpec)):
+            return node, _spec_key(node), True
+        if isinstance(node, ConstantGetterSpec):
+            return partial(_constant_value, node.constant), None, True
+        if isinstance(node, PropertyNameGetterSpec):
+            return self._property_name(node)
+        if isinstance(node, PropertyPathGetterSpec):
+            transform = transform_for_datatype(node.datatype)
+            fn = partial(_property_path_value, list(node.property_path), transform)
+            return fn, _spec_key(node), False
+        if isinstance(node, NamedExpressionSpec):
+            return self._named_expression(node), ('named', node.name), True
+        if isinstance(node, ConditionalExpressionSpec):
+            test, test_key = self.filter(node._test_function)
+            if_true, true_key = self.expression(node._true_expression)
+            if_false, false_key = self.expression(node._false_expression)
+            key = _compound_key('conditional', test_key, true_key, false_key)
+            return partial(_conditional_value, test, if_true, if_false), key, False
+        if isinstance(node, RootDocExpressionSpec):
+            fn, key = self.expression(node._expression_fn)
+            return partial(_root_doc_value, fn), _compound_key('root_doc', key), False
+        if isinstance(node, SwitchExpressionSpec):
+            return self._switch(node)
+        if isinstance(node, TransformedGetter):
+            fn, key = self.expression(node.getter)
+            if node.transform:
+                return partial(_transformed_value, fn, node.transform), None, False
+            return fn, key, True
+        return node, _spec_key(node), False
+
+    def _property_name(self, node):
+        name_expression = node._property_name_expression
+        if not isinstance(name_expression, ConstantGetterSpec):
+            return node, _spec_key(node), False
+        transform = transform_for_datatype(node.datatype)
+        fn = partial(_property_name_value, name_expression.constant, transform)
+        return fn, _spec_key(node), not node.datatype
+
+    def _named_expression(self, node):
+        name = node.name
+        if name not in self.named_expressions:
+            definition = node._factory_context.get_named_expression(name)
+            self.named_expressions[name] = self.expression(definition)[0]
+        return partial(_named_value, node, self.named_expressions[name])
+
+    def _switch(self, node):
+        switch_on, switch_key = self.expression(node._switch_on_expression)
+        cases = []
+        case_keys = []
+        for value in node.cases:
+            fn, key = self.expression(node._case_expressions[value])
+            cases.append((value, fn))
+            case_keys.append((value, key))
+        default, default_key = self.expression(node._default_expression)
+        key = _compound_key('switch', switch_key, default_key, *(
+            None if case_key is None else (value, case_key) for value, case_key in case_keys
+        ))
+        return partial(_switch_value, switch_on, tuple(cases), default), key, False
+
+    def _filter(self, node):
+        if isinstance(node, ANDFilter) or isinstance(node, ORFilter):
+            compiled = [self.filter(sub) for sub in node.filters]
+            fns = tuple(fn for fn, key in compiled)
+            op = 'and' if isinstance(node, ANDFilter) else 'or'
+            key = _compound_key(op, *(key for fn, key in compiled))
+            return partial(_and_value if op == 'and' else _or_value, fns), key, False
+        if isinstance(node, NOTFilter):
+            fn, key = self.filter(node._filter)
+            return partial(_not_value, fn), _compound_key('not', key), True
+        if isinstance(node, NamedFilter):
+            fn, key = self.filter(node.filter)
+            return fn, _compound_key('named_filter', node.filter_name), True
+        if isinstance(node, SinglePropertyValueFilter):
+            return self._single_property_value_filter(node)
+        return node, None, False
+
+    def _single_property_value_filter(self, node):
+        expression, expression_key = self.expression(node.expression)
+        operator = node.operator
+        reference = node.reference_expression
+        if isinstance(reference, ConstantGetterSpec):
+            fn = partial(_compare_to_constant, expression, operator, reference.constant)
+            reference_key = _spec_key(reference)
+        else:
+            reference, reference_key = self.expression(reference)
+            fn = partial(_compare, expression, operator, reference)
+        key = _compound_key('compare', operator.__name__, expression_key, reference_key)
+        return fn, key, False
+
+
+def _spec_key(node):
+    if not isinstance(node, JsonObject):
+        return None
+    try:
+        return json.dumps(node.to_json(), sort_keys=True)
+    except (TypeError, ValueError):
+        return None
+
+
+def _compound_key(*parts):
+    if any(part is None for part in parts):
+        return None
+    return parts
+
+
+def _shared_value(fn, key, item, evaluation_context=None):
+    if evaluation_context is None:
+        return fn(item, evaluation_context)
+    cache = evaluation_context.iteration_cache
+    cache_key = key + (id(item),)
+    try:
+        return cache[cache_key]
+    except KeyError:
+        value = cache[cache_key] = fn(item, evaluation_context)
+        return value
+
+
+def _named_value(node, fn, item, evaluation_context=None):
+    if evaluation_context is None:
+        return fn(item, evaluation_context)
+    key = node._context_cache_key(item)
+    if evaluation_context.exists_in_cache(key):
+        return evaluation_context.get_cache_value(key)
+    result = fn(item, evaluation_context)
+    evaluation_context.set_iteration_cache_value(key, result)
+    return result
+
+
+def _constant_value(constant, item, evaluation_context=None):
+    return constant
+
+
+def _property_name_value(name, transform, item, evaluation_context=None):
+    return transform(item.get(name) if isinstance(item, dict) else None)
+
+
+def _property_path_value(path, transform, item, evaluation_context=None):
+    return transform(safe_recursive_lookup(item, path))
+
+
+def _conditional_value(test, if_true, if_false, item, evaluation_context=None):
+    if test(item, evaluation_context):
+        return if_true(item, evaluation_context)
+    return if_false(item, evaluation_context)
+
+
+def _root_doc_value(fn, item, evaluation_context=None):
+    if evaluation_context is None:
+        return None
+    return fn(evaluation_context.root_doc, evaluation_context)
+
+
+def _switch_value(switch_on, cases, default, item, evaluation_context=None):
+    switch_value = switch_on(item, evaluation_context)
+    for value, fn in cases:
+        if switch_value == value:
+            return fn(item, evaluation_context)
+    return default(item, evaluation_context)
+
+
+def _transformed_value(fn, transform, item, evaluation_context=None):
+    return transform(fn(item, evaluation_context))
+
+
+def _and_value(fns, item, evaluation_context=None):
+    for fn in fns:
+        if not fn(item, evaluation_context):
+            return False
+    return True
+
+
+def _or_value(fns, item, evaluation_context=None):
+    for fn in fns:
+        if fn(item, evaluation_context):
+            return True
+    return False
+
+
+def _not_value(fn, item, evaluation_context=None):
+    return not fn(item, evaluation_context)
+
+
+def _compare_to_constant(expression, operator, constant, item, evaluation_context=None):
+    return operator(expression(item, evaluation_context), constant)
+
+
+def _compare(expression, operator, reference, item, evaluation_context=None):
+    return operator(expression(item, evaluation_context), reference(item, evaluation_context))
+
+
+def _boolean_value(filter_fn, item, evaluation_context=None):
+    return 1 if filter_fn(item, evaluation_context) else 0
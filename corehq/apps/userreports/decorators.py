@@ -2,6 +2,7 @@ import hashlib
 import inspect
 from functools import wraps
 
+from memoized import memoized
 from sqlagg import ColumnNotFoundException
 from sqlalchemy.exc import ProgrammingError
 
@@ -35,25 +36,38 @@ def ucr_context_cache(vary_on=()):
     Decorator which caches calculations performed during a UCR EvaluationContext
     The decorated function or method must have a parameter called 'evaluation_context'
     which will be used by this decorator to store the cache.
+
+    The decorated function has a ``get_cache_key(*values)`` attribute which
+    returns the cache key for the given values of the ``vary_on`` parameters,
+    so that the cache can be populated ahead of time.
     """
     def decorator(fn):
         assert 'evaluation_context' in fn.__code__.co_varnames
         assert isinstance(vary_on, tuple)
 
+        @memoized
+        def get_prefix():
+            return '{}.{}'.format(
+                fn.__name__[:40] + (fn.__name__[40:] and '..'),
+                hashlib.md5(inspect.getsource(fn).encode('utf-8')).hexdigest()[-8:]
+            )
+
+        def get_cache_key(*values):
+            assert len(values) == len(vary_on)
+            return (get_prefix(),) + tuple(values)
+
         @wraps(fn)
         def _inner(*args, **kwargs):
             # shamelessly stolen from quickcache
             callargs = inspect.getcallargs(fn, *args, **kwargs)
             evaluation_context = callargs['evaluation_context']
-            prefix = '{}.{}'.format(
-                fn.__name__[:40] + (fn.__name__[40:] and '..'),
-                hashlib.md5(inspect.getsource(fn).encode('utf-8')).hexdigest()[-8:]
-            )
-            cache_key = (prefix,) + tuple(callargs[arg_name] for arg_name in vary_on)
+            cache_key = get_cache_key(*(callargs[arg_name] for arg_name in vary_on))
             if evaluation_context.exists_in_cache(cache_key):
                 return evaluation_context.get_cache_value(cache_key)
             res = fn(*args, **kwargs)
             evaluation_context.set_cache_value(cache_key, res)
             return res
+
+        _inner.get_cache_key = get_cache_key
         return _inner
     return decorator
@@ -10,11 +10,23 @@ class Command(BaseCommand):
         parser.add_argument('indicator_config_id')
         parser.add_argument('--in-place', action='store_true', dest='in_place', default=False,
                             help='Rebuild table in place (preserve existing data)')
+        parser.add_argument('--parallel', action='store_true', default=False,
+                            help='Rebuild table with a celery task for each partition of the documents, '
+                                 'then replace the existing table')
+        parser.add_argument('--ranges-per-db', type=int, default=tasks.REBUILD_RANGES_PER_DB,
+                            help='Number of partitions in each form processing database (with --parallel)')
         parser.add_argument('--initiated-by', action='store', required=True, dest='initiated',
                             help='Who initiated the rebuild (for sending email notifications)')
 
     def handle(self, indicator_config_id, **options):
-        if options['in_place']:
+        if options['parallel']:
+            tasks.rebuild_indicators_in_parallel(
+                indicator_config_id,
+                initiated_by=options['initiated'],
+                source='rebuild_indicator_table',
+                ranges_per_db=options['ranges_per_db'],
+            )
+        elif options['in_place']:
             tasks.rebuild_indicators_in_place(
                 indicator_config_id, options['initiated'], source='rebuild_indicator_table'
             )
@@ -56,6 +56,7 @@ from corehq.apps.userreports.app_manager.data_source_meta import (
     REPORT_BUILDER_DATA_SOURCE_TYPE_VALUES,
 )
 from corehq.apps.userreports.columns import get_expanded_column_config
+from corehq.apps.userreports.compiler import CompiledDataSource
 from corehq.apps.userreports.const import (
     ALL_EXPRESSION_TYPES,
     DATA_SOURCE_TYPE_AGGREGATE,
@@ -379,7 +380,8 @@ class DataSourceConfiguration(CachedCouchDocumentMixin, Document, AbstractUCRDat
         if eval_context is None:
             eval_context = EvaluationContext(document)
 
-        filter_fn = self._get_main_filter()
+        compiled = self._get_compiled_data_source()
+        filter_fn = compiled.filter if compiled else self._get_main_filter()
         return filter_fn(document, eval_context)
 
     def deleted_filter(self, document):
@@ -413,6 +415,12 @@ class DataSourceConfiguration(CachedCouchDocumentMixin, Document, AbstractUCRDat
             for validation in self.validations
         ]
 
+    @memoized
+    def _get_compiled_data_source(self):
+        if toggles.UCR_COMPILED_EXPRESSIONS.enabled(self.domain):
+            return CompiledDataSource(self)
+        return None
+
     @memoized
     def _get_main_filter(self):
         return self._get_filter([self.referenced_doc_type])
@@ -538,6 +546,12 @@ class DataSourceConfiguration(CachedCouchDocumentMixin, Document, AbstractUCRDat
             None,
         )
 
+    @property
+    @memoized
+    def prefetch_lookups(self):
+        from corehq.apps.userreports.prefetch import get_prefetch_lookups
+        return get_prefetch_lookups(self)
+
     @property
     @memoized
     def parsed_expression(self):
@@ -562,7 +576,9 @@ class DataSourceConfiguration(CachedCouchDocumentMixin, Document, AbstractUCRDat
             if not self.base_item_expression:
                 return [document]
             else:
-                result = self.parsed_expression(document, eval_context)
+                compiled = self._get_compiled_data_source()
+                parsed_expression = compiled.base_item_expression if compiled else self.parsed_expression
+                result = parsed_expression(document, eval_context)
                 if result is None:
                     return []
                 elif isinstance(result, list):
@@ -594,8 +610,9 @@ class DataSourceConfiguration(CachedCouchDocumentMixin, Document, AbstractUCRDat
                 return []
 
         rows = []
+        indicators = self._get_compiled_data_source() or self.indicators
         for item in self.get_items(doc, eval_context):
-            values = self.indicators.get_values(item, eval_context)
+            values = indicators.get_values(item, eval_context)
             rows.append(values)
             eval_context.increment_iteration()
 
@@ -6,6 +6,7 @@ from datetime import datetime, timedelta
 
 from django.conf import settings
 
+from corehq import toggles
 from corehq.apps.change_feed.consumer.feed import (
     KafkaChangeFeed,
     KafkaCheckpointEventHandler,
@@ -23,6 +24,7 @@ from corehq.apps.userreports.exceptions import (
 )
 from corehq.apps.userreports.models import AsyncIndicator
 from corehq.apps.userreports.pillow_utils import rebuild_sql_tables
+from corehq.apps.userreports.prefetch import RelatedDocPrefetcher
 from corehq.apps.userreports.specs import EvaluationContext
 from corehq.apps.userreports.util import get_indicator_adapter
 from corehq.pillows.base import is_couch_change_for_sql_domain
@@ -447,11 +449,25 @@ class ConfigurableReportPillowProcessor(BulkPillowProcessor):
             retry_changes, docs = bulk_fetch_changes_docs(to_update, domain)
         change_exceptions = []
 
+        prefetcher = None
+        if toggles.UCR_PREFETCH_RELATED_DOCS.enabled(domain):
+            with self._metrics_timer('prefetch'):
+                prefetcher = RelatedDocPrefetcher(domain, [
+                    adapter.config for adapter in adapters if not adapter.run_asynchronous
+                ])
+                try:
+                    prefetcher.prefetch(docs)
+                except Exception as e:
+                    # the lookups will load their documents when evaluated
+                    pillow_logging.exception("Error prefetching related documents: %s", e)
+
         with self._metrics_timer('single_batch_transform'):
             for doc in docs:
                 change = changes_by_id[doc['_id']]
                 doc_subtype = change.metadata.document_subtype
                 eval_context = EvaluationContext(doc)
+                if prefetcher:
+                    prefetcher.seed(eval_context)
                 with self._metrics_timer('single_doc_transform'):
                     for adapter in adapters:
                         with self._per_config_metrics_timer('transform', adapter.config._id):
@@ -0,0 +1,233 @@
+"""Bulk load the documents looked up by data source expressions
+
+Expressions like ``related_doc`` and ``related_case`` load one document
+per call and cache it in the evaluation context of the document being
+processed. For a chunk of changes processed by the UCR pillow that is
+one query per document per related document, for every data source that
+does the lookup.
+
+``RelatedDocPrefetcher`` finds the lookups in the data sources of a
+domain, evaluates the expressions that produce their ids against each
+document in the chunk, loads the related documents with one query per
+document type and seeds each document's evaluation context with them.
+
+Only lookups whose id expression can be evaluated without loading other
+documents are prefetched. The expression may still be evaluated against
+something other than the root document when it is used inside a
+``base_item_expression`` or another lookup's ``value_expression``, in
+which case the wrong ids are prefetched and the lookup falls back to
+loading its document when it is evaluated. Prefetched values are only
+ever correct values for their cache keys, so they never change results.
+"""
+from collections import defaultdict, namedtuple
+
+from corehq.apps.change_feed.data_sources import (
+    get_document_store_for_doc_type,
+)
+from corehq.apps.locations.models import SQLLocation
+from corehq.apps.locations.ucr_expressions import _get_location
+from corehq.apps.userreports.expressions.factory import ExpressionFactory
+from corehq.apps.userreports.expressions.specs import (
+    RelatedCaseExpressionSpec,
+    RelatedDocExpressionSpec,
+)
+from corehq.apps.userreports.specs import EvaluationContext
+
+RELATED_DOC = 'related_doc'
+RELATED_CASE = 'related_case'
+LOCATION = 'location'
+
+# (related_doc_type, load_source) of documents loaded with a document store
+DOCUMENT_STORE_LOOKUPS = {
+    (RELATED_DOC, 'CommCareCase'): ('CommCareCase', 'related_doc_expression'),
+    (RELATED_DOC, 'XFormInstance'): ('XFormInstance', 'related_doc_expression'),
+    (RELATED_DOC, 'Location'): ('Location', 'related_doc_expression'),
+    (RELATED_CASE, None): ('CommCareCase', 'related_case_expression'),
+}
+
+# expression and filter types which can be evaluated without loading
+# other documents
+SAFE_TYPES = {
+    'and',
+    'array_index',
+    'base_iteration_number',
+    'boolean_expression',
+    'coalesce',
+    'conditional',
+    'constant',
+    'dict',
+    'identity',
+    'iterator',
+    'jsonpath',
+    'named',
+    'nested',
+    'not',
+    'or',
+    'property_match',
+    'property_name',
+    'property_path',
+    'root_doc',
+    'split_string',
+    'switch',
+}
+
+PrefetchLookup = namedtuple('PrefetchLookup', 'kind doc_type id_expression')
+
+
+def get_prefetch_lookups(config):
+    """Get the lookups in a data source which can be prefetched
+
+    :returns: A list of ``PrefetchLookup``.
+    """
+    lookups = []
+    factory_context = None
+    for kind, doc_type, id_spec in _iter_lookup_specs(list(_get_data_source_specs(config))):
+        if not id_spec or not _is_safe(id_spec, config, set()):
+            continue
+        if factory_context is None:
+            factory_context = config.get_factory_context()
+        id_expression = ExpressionFactory.from_spec(id_spec, factory_context)
+        lookups.append(PrefetchLookup(kind, doc_type, id_expression))
+    return lookups
+
+
+class RelatedDocPrefetcher:
+
+    def __init__(self, domain, configs):
+        self.domain = domain
+        self.lookups = [lookup for config in configs for lookup in config.prefetch_lookups]
+        self.values_by_doc_id = defaultdict(dict)
+
+    def prefetch(self, docs):
+        if not self.lookups:
+            return
+        ids_by_doc_id = self._get_ids_by_doc_id(docs)
+        ids_by_lookup = defaultdict(set)
+        for ids in ids_by_doc_id.values():
+            for lookup_type, lookup_id in ids:
+                ids_by_lookup[lookup_type].add(lookup_id)
+        loaded = self._load(ids_by_lookup)
+        for doc_id, ids in ids_by_doc_id.items():
+            for lookup_type, lookup_id in ids:
+                if (lookup_type, lookup_id) in loaded:
+                    cache_key = _get_cache_key(lookup_type, lookup_id)
+                    self.values_by_doc_id[doc_id][cache_key] = loaded[(lookup_type, lookup_id)]
+
+    def seed(self, evaluation_context):
+        values = self.values_by_doc_id.get(evaluation_context.root_doc['_id'], {})
+        for cache_key, value in values.items():
+            evaluation_context.set_cache_value(cache_key, value)
+
+    def _get_ids_by_doc_id(self, docs):
+        ids_by_doc_id = {}
+        for doc in docs:
+            ids = set()
+            for kind, doc_type, id_expression in self.lookups:
+                try:
+                    # a fresh context so no named expression results are
+                    # left in the cache of the context used by the pillow
+                    lookup_id = id_expression(doc, EvaluationContext(doc))
+                except Exception:
+                    # the data source will report this when it is evaluated
+                    continue
+                if lookup_id and isinstance(lookup_id, str):
+                    ids.add(((kind, doc_type), lookup_id))
+            ids_by_doc_id[doc['_id']] = ids
+        return ids_by_doc_id
+
+    def _load(self, ids_by_lookup):
+        loaded = {}
+        ids_by_store = defaultdict(set)
+        for lookup_type, ids in ids_by_lookup.items():
+            if lookup_type in DOCUMENT_STORE_LOOKUPS:
+                ids_by_store[DOCUMENT_STORE_LOOKUPS[lookup_type]].update(ids)
+        docs_by_store = {}
+        for (doc_type, load_source), ids in ids_by_store.items():
+            store = get_document_store_for_doc_type(self.domain, doc_type, load_source=load_source)
+            docs_by_store[(doc_type, load_source)] = {
+                doc['_id']: doc for doc in store.iter_documents(list(ids))
+                if doc.get('domain') == self.domain
+            }
+
+        for lookup_type, ids in ids_by_lookup.items():
+            if lookup_type in DOCUMENT_STORE_LOOKUPS:
+                docs = docs_by_store[DOCUMENT_STORE_LOOKUPS[lookup_type]]
+                loaded.update(
+                    ((lookup_type, doc_id), docs[doc_id]) for doc_id in ids if doc_id in docs
+                )
+            elif lookup_type == (LOCATION, None):
+                locations = SQLLocation.objects.select_related('location_type').filter(
+                    domain=self.domain,
+                    location_id__in=list(ids),
+                )
+                for location in locations:
+                    loaded[(lookup_type, location.location_id)] = location
+                # locations are looked up with a query that returns
+                # nothing for missing locations, so those can be seeded
+                for location_id in ids:
+                    loaded.setdefault((lookup_type, location_id), None)
+        return loaded
+
+
+def _get_cache_key(lookup_type, lookup_id):
+    kind, doc_type = lookup_type
+    if kind == RELATED_DOC:
+        return RelatedDocExpressionSpec._get_document.get_cache_key(doc_type, lookup_id)
+    if kind == RELATED_CASE:
+        return RelatedCaseExpressionSpec._get_document.get_cache_key(lookup_id, None)
+    assert kind == LOCATION, kind
+    return _get_location.get_cache_key(lookup_id)
+
+
+def _get_data_source_specs(config):
+    yield config.configured_filter
+    yield config.base_item_expression
+    yield from config.configured_indicators
+    yield from config.named_expressions.values()
+    yield from config.named_filters.values()
+
+
+def _iter_lookup_specs(spec):
+    """Yield ``(kind, doc_type, id_spec)`` for every lookup in ``spec``"""
+    if isinstance(spec, dict):
+        spec_type = spec.get('type')
+        if spec_type == 'related_doc' and (RELATED_DOC, spec.get('related_doc_type')) in DOCUMENT_STORE_LOOKUPS:
+            yield RELATED_DOC, spec['related_doc_type'], spec.get('doc_id_expression')
+        elif spec_type == 'location_parent_id':
+            yield RELATED_DOC, 'Location', spec.get('location_id_expression')
+        elif spec_type == 'related_case' and spec.get('case_id_expression'):
+            yield RELATED_CASE, None, spec['case_id_expression']
+        elif spec_type == 'location_type_name':
+            yield LOCATION, None, spec.get('location_id_expression')
+        elif spec_type == 'ancestor_location':
+            yield LOCATION, None, spec.get('location_id')
+        for value in spec.values():
+            yield from _iter_lookup_specs(value)
+    elif isinstance(spec, (list, tuple)):
+        for value in spec:
+            yield from _iter_lookup_specs(value)
+
+
+def _is_safe(spec, config, seen_names):
+    """Check that ``spec`` can be evaluated without loading other documents"""
+    if isinstance(spec, dict):
+        spec_type = spec.get('type')
+        if spec_type is not None and spec_type not in SAFE_TYPES:
+            return False
+        if spec_type == 'named':
+            name = spec.get('name')
+            if name in seen_names:
+                return True
+            definitions = [
+                named[name] for named in (config.named_expressions, config.named_filters)
+                if name in named
+            ]
+            if not definitions:
+                # defined in the expression registry
+                return False
+            if not _is_safe(definitions, config, seen_names | {name}):
+                return False
+        return all(_is_safe(value, config, seen_names) for value in spec.values())
+    if isinstance(spec, (list, tuple)):
+        return all(_is_safe(value, config, seen_names) for value in spec)
+    return True
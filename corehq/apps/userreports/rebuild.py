@@ -1,11 +1,20 @@
+import itertools
+import json
 import logging
 from collections import defaultdict
+from datetime import datetime
+
+from django.db.models import Max, Min, Q
 
 import attr
 from alembic.autogenerate import compare_metadata
 from alembic.operations import Operations
 
 from dimagi.utils.couch import get_redis_client
+from pillowtop.dao.couch import ID_CHUNK_SIZE
+
+from corehq.form_processor.models import CommCareCase, XFormInstance
+from corehq.sql_db.util import get_db_aliases_for_partitioned_query
 
 from .alembic_diffs import (
     DiffTypes,
@@ -14,9 +23,14 @@ from .alembic_diffs import (
     reformat_alembic_diffs,
 )
 from .models import id_is_static
+from .util import get_table_name
 
 logger = logging.getLogger(__name__)
 
+# not prefixed with UCR_TABLE_PREFIX so they are not mistaken for orphaned
+# data source tables while they are being built
+UCR_STAGING_TABLE_PREFIX = 'tmp_ucr_'
+
 
 def get_redis_key_for_config(config):
     if id_is_static(config._id):
@@ -45,11 +59,169 @@ class DataSourceResumeHelper(object):
         self._client.rpush(self._key, f"{domain}:{case_type_or_xmlns}".encode('utf8'))
 
     def clear_resume_info(self):
-        self._client.delete(self._key)
+        self._client.delete(self._key, self._partitions_key, self._parallel_key)
 
     def has_resume_info(self):
         return self._client.exists(self._key)
 
+    @property
+    def _partitions_key(self):
+        return f'{self._key}:partitions'
+
+    @property
+    def _parallel_key(self):
+        return f'{self._key}:parallel'
+
+    def set_partitions(self, partitions, started_on):
+        """Save the partitions of a parallel rebuild
+
+        :param started_on: The time the rebuild started. Documents modified
+            since then are processed again once all partitions are built.
+        """
+        pipeline = self._client.pipeline()
+        pipeline.delete(self._partitions_key)
+        if partitions:
+            pipeline.hset(self._partitions_key, mapping={
+                partition.id: json.dumps(attr.asdict(partition)) for partition in partitions
+            })
+        pipeline.hset(self._parallel_key, 'started_on', started_on.isoformat())
+        pipeline.execute()
+
+    def has_partitions(self):
+        return bool(self._client.exists(self._parallel_key))
+
+    def get_partitions(self):
+        return sorted(
+            (
+                RebuildPartition(**json.loads(value))
+                for value in self._client.hvals(self._partitions_key)
+            ),
+            key=lambda partition: partition.id
+        )
+
+    def get_partition(self, partition_id):
+        value = self._client.hget(self._partitions_key, partition_id)
+        if value is not None:
+            return RebuildPartition(**json.loads(value))
+
+    def get_partitions_started_on(self):
+        started_on = self._client.hget(self._parallel_key, 'started_on')
+        if started_on is not None:
+            return datetime.fromisoformat(started_on.decode('utf8'))
+
+    def set_partition_progress(self, partition, last_pk, complete=False):
+        partition = attr.evolve(partition, last_pk=last_pk, complete=complete)
+        self._client.hset(self._partitions_key, partition.id, json.dumps(attr.asdict(partition)))
+        return partition
+
+
+@attr.s(frozen=True)
+class RebuildPartition(object):
+    """The documents of one case type or xmlns in one form processing
+    database, with primary keys in ``(start_pk, end_pk]``
+
+    ``last_pk`` is the primary key of the last document that was built.
+    """
+    domain = attr.ib()
+    case_type_or_xmlns = attr.ib()
+    db_alias = attr.ib()
+    start_pk = attr.ib()
+    end_pk = attr.ib()
+    last_pk = attr.ib(default=None)
+    complete = attr.ib(default=False)
+
+    @property
+    def id(self):
+        return f'{self.domain}:{self.case_type_or_xmlns}:{self.db_alias}:{self.start_pk}:{self.end_pk}'
+
+
+PARTITIONED_DOC_TYPES = {
+    'CommCareCase': (CommCareCase, 'case_id', 'type'),
+    'XFormInstance': (XFormInstance, 'form_id', 'xmlns'),
+}
+
+
+def get_staging_table_name(config):
+    return get_table_name(config.domain, config.table_id, prefix=UCR_STAGING_TABLE_PREFIX)
+
+
+def supports_parallel_rebuild(config):
+    # asynchronous data sources would save rows to the table being replaced
+    return config.referenced_doc_type in PARTITIONED_DOC_TYPES and not config.asynchronous
+
+
+def get_rebuild_partitions(config, ranges_per_db):
+    """Split the documents of a data source by form processing database
+    and into ``ranges_per_db`` primary key ranges in each database.
+    """
+    partitions = []
+    iterations = itertools.product(config.data_domains, config.get_case_type_or_xmlns_filter())
+    for domain, case_type_or_xmlns in iterations:
+        for db_alias in get_db_aliases_for_partitioned_query():
+            query = _get_partition_query(config, domain, case_type_or_xmlns, db_alias)
+            bounds = query.aggregate(min_pk=Min('id'), max_pk=Max('id'))
+            if bounds['min_pk'] is None:
+                continue
+            for start_pk, end_pk in _split_range(bounds['min_pk'] - 1, bounds['max_pk'], ranges_per_db):
+                partitions.append(RebuildPartition(domain, case_type_or_xmlns, db_alias, start_pk, end_pk))
+    return partitions
+
+
+def iter_partition_ids(config, partition):
+    """Iterate over the ids of the documents in a partition, starting
+    after the last document that was built
+
+    :returns: Generator of ``(doc_ids, last_pk)`` for chunks of documents
+    """
+    query = _get_partition_query(config, partition.domain, partition.case_type_or_xmlns, partition.db_alias)
+    query = query.filter(id__lte=partition.end_pk)
+    last_pk = partition.start_pk if partition.last_pk is None else partition.last_pk
+    yield from _iter_ids_chunked(config, query, last_pk)
+
+
+def iter_modified_ids(config, domain, case_type_or_xmlns, since, deleted=False):
+    """Iterate over the ids of documents modified since a parallel rebuild
+    started, in all form processing databases
+
+    :param deleted: Iterate over the documents which have been deleted
+        instead of those which have not.
+    """
+    for db_alias in get_db_aliases_for_partitioned_query():
+        query = _get_partition_query(config, domain, case_type_or_xmlns, db_alias, deleted=deleted)
+        query = query.filter(server_modified_on__gte=since)
+        for doc_ids, last_pk in _iter_ids_chunked(config, query, None):
+            yield doc_ids
+
+
+def _get_partition_query(config, domain, case_type_or_xmlns, db_alias, deleted=False):
+    model, id_field, type_field = PARTITIONED_DOC_TYPES[config.referenced_doc_type]
+    if model is CommCareCase:
+        not_deleted = Q(deleted=False)
+    else:
+        not_deleted = Q(state=XFormInstance.NORMAL)
+    query = model.objects.using(db_alias).filter(domain=domain)
+    query = query.exclude(not_deleted) if deleted else query.filter(not_deleted)
+    if case_type_or_xmlns is not None:
+        query = query.filter(**{type_field: case_type_or_xmlns})
+    return query
+
+
+def _iter_ids_chunked(config, query, last_pk):
+    id_field = PARTITIONED_DOC_TYPES[config.referenced_doc_type][1]
+    while True:
+        chunk_query = query if last_pk is None else query.filter(id__gt=last_pk)
+        rows = list(chunk_query.order_by('id').values_list('id', id_field)[:ID_CHUNK_SIZE])
+        if not rows:
+            break
+        last_pk = rows[-1][0]
+        yield [doc_id for pk, doc_id in rows], last_pk
+
+
+def _split_range(start, end, count):
+    """Split ``(start, end]`` into at most ``count`` ranges"""
+    size = max(-(-(end - start) // count), 1)
+    return [(lower, min(lower + size, end)) for lower in range(start, end, size)]
+
 
 @attr.s
 class MigrateRebuildTables(object):
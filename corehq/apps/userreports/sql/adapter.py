@@ -1,15 +1,19 @@
 import hashlib
+import io
 import logging
+from datetime import date, datetime
 
 from django.utils.translation import gettext as _
 
 import psycopg2
 import sqlalchemy
+from psycopg2 import sql
 from memoized import memoized
 from sqlalchemy.exc import ProgrammingError, OperationalError
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.schema import Index, PrimaryKeyConstraint
 
+from corehq import toggles
 from corehq.apps.userreports.adapter import IndicatorAdapter
 from corehq.apps.userreports.exceptions import (
     ColumnNotFoundError,
@@ -23,6 +27,10 @@ from corehq.util.test_utils import unit_testing_only
 from corehq.apps.userreports.util import register_data_source_row_change
 logger = logging.getLogger(__name__)
 
+# Smaller batches are saved with a single INSERT statement, for which the
+# overhead of creating a staging table is not worth it.
+COPY_MIN_ROWS = 100
+COPY_STAGING_TABLE = 'ucr_copy_staging'
 
 engine_metadata = {}
 
@@ -102,6 +110,45 @@ class IndicatorSqlAdapter(IndicatorAdapter):
         finally:
             self.session_helper.Session.commit()
 
+    def swap_table(self, staging_adapter):
+        """
+        Replaces the table with the table of ``staging_adapter``, which
+        was built for the same data source under another name.
+
+        Indexes and the primary key are renamed to the names they would
+        have if the table had been built under its own name.
+        """
+        table = self.get_table()
+        staging_table = staging_adapter.get_table()
+        preparer = self.engine.dialect.identifier_preparer
+        # _prepared_index_name gives the (quoted) name an index is created
+        # with, after the naming convention and truncation are applied
+        compiler = self.engine.dialect.ddl_compiler(self.engine.dialect, None)
+        index_names = {
+            _get_index_key(index): compiler._prepared_index_name(index, include_schema=False)
+            for index in table.indexes
+        }
+        statements = [
+            'ALTER TABLE {} RENAME TO {}'.format(preparer.quote(staging_table.name), preparer.quote(table.name)),
+            'ALTER TABLE {} RENAME CONSTRAINT {} TO {}'.format(
+                preparer.quote(table.name),
+                preparer.quote(f'{staging_table.name}_pkey'),
+                preparer.quote(f'{table.name}_pkey'),
+            ),
+        ]
+        for index in staging_table.indexes:
+            statements.append('ALTER INDEX {} RENAME TO {}'.format(
+                compiler._prepared_index_name(index, include_schema=False),
+                index_names[_get_index_key(index)],
+            ))
+
+        self.session_helper.Session.remove()
+        with self.engine.begin() as connection:
+            table.drop(connection, checkfirst=True)
+            for statement in statements:
+                connection.execute(sqlalchemy.text(statement))
+        get_metadata(staging_adapter.engine_id).remove(staging_table)
+
     def drop_table(self, initiated_by=None, source=None, skip_log=False):
         self.log_table_drop(initiated_by, source, skip_log)
         # this will hang if there are any open sessions, so go ahead and close them
@@ -160,6 +207,17 @@ class IndicatorSqlAdapter(IndicatorAdapter):
         if not rows:
             return
 
+        if (use_shard_col and len(rows) >= COPY_MIN_ROWS
+                and toggles.UCR_COPY_LOADER.enabled(self.config.domain)):
+            try:
+                self.copy_rows(rows)
+                return
+            except psycopg2.DataError:
+                # COPY does not coerce values like INSERT does (e.g. 1.0
+                # into an integer column), so save the rows with INSERT
+                logger.info("Could not copy rows to %s, inserting them instead",
+                            self.get_table().name, exc_info=True)
+
         # transform format from ColumnValue to dict
         formatted_rows = [
             {i.column.database_column_name.decode('utf-8'): i.value for i in row}
@@ -191,6 +249,86 @@ class IndicatorSqlAdapter(IndicatorAdapter):
             doc_ids=doc_ids,
         )
 
+    def copy_rows(self, rows, fresh_table=False):
+        """
+        Saves rows to a data source using PostgreSQL COPY, replacing the
+        existing rows of their documents.
+
+        Rows are copied into a temporary staging table and merged into the
+        data source table with a single statement.
+
+        :param fresh_table: The table was rebuilt and none of the documents
+            have been saved yet, so rows are copied straight into the table.
+            If any row does exist (e.g. it was saved by the pillow since the
+            rebuild started) the rows are merged as usual.
+        """
+        if not rows:
+            return
+
+        table = self.get_table()
+        column_names = [column.name for column in table.columns]
+        formatted_rows = [
+            {i.column.database_column_name.decode('utf-8'): i.value for i in row}
+            for row in rows
+        ]
+        doc_ids = set(row['doc_id'] for row in formatted_rows)
+        if self.supports_upsert():
+            # ON CONFLICT DO UPDATE can only update a row once per statement
+            formatted_rows = list({row['doc_id']: row for row in formatted_rows}.values())
+        data = _get_copy_data(column_names, formatted_rows)
+
+        if fresh_table:
+            try:
+                with self.session_context() as session:
+                    _copy_into(session, table.name, column_names, data)
+            except psycopg2.IntegrityError as e:
+                if e.pgcode != psycopg2.errorcodes.UNIQUE_VIOLATION:
+                    raise
+                fresh_table = False
+                data.seek(0)
+        if not fresh_table:
+            with self.session_context() as session:
+                self._copy_and_merge(session, table, column_names, data)
+
+        register_data_source_row_change(
+            domain=self.config.domain,
+            data_source_id=self.config._id,
+            doc_ids=doc_ids,
+        )
+
+    def _copy_and_merge(self, session, table, column_names, data):
+        staging_table = sql.Identifier(COPY_STAGING_TABLE)
+        target_table = sql.Identifier(table.name)
+        columns = sql.SQL(', ').join(sql.Identifier(name) for name in column_names)
+        with session.connection().connection.cursor() as cursor:
+            cursor.execute(sql.SQL(
+                'CREATE TEMPORARY TABLE {staging} (LIKE {target} INCLUDING DEFAULTS) ON COMMIT DROP'
+            ).format(staging=staging_table, target=target_table))
+            _copy_into(session, COPY_STAGING_TABLE, column_names, data)
+            if self.supports_upsert():
+                pk_columns = [column.name for column in table.primary_key.columns]
+                updates = sql.SQL(', ').join(
+                    sql.SQL('{0} = EXCLUDED.{0}').format(sql.Identifier(name))
+                    for name in column_names if name not in pk_columns
+                )
+                cursor.execute(sql.SQL(
+                    'INSERT INTO {target} ({columns}) SELECT {columns} FROM {staging} '
+                    'ON CONFLICT ({pk_columns}) DO UPDATE SET {updates}'
+                ).format(
+                    target=target_table,
+                    columns=columns,
+                    staging=staging_table,
+                    pk_columns=sql.SQL(', ').join(sql.Identifier(name) for name in pk_columns),
+                    updates=updates,
+                ))
+            else:
+                cursor.execute(sql.SQL(
+                    'DELETE FROM {target} WHERE doc_id IN (SELECT doc_id FROM {staging})'
+                ).format(target=target_table, staging=staging_table))
+                cursor.execute(sql.SQL(
+                    'INSERT INTO {target} ({columns}) SELECT {columns} FROM {staging}'
+                ).format(target=target_table, columns=columns, staging=staging_table))
+
     def supports_upsert(self):
         """Return True if supports UPSERTS else False
 
@@ -310,6 +448,10 @@ class MultiDBSqlAdapter(object):
         for adapter in self.all_adapters:
             adapter.rebuild_table(initiated_by=initiated_by, source=source, skip_log=skip_log, diffs=diffs)
 
+    def swap_table(self, staging_adapter):
+        for adapter, staging in zip(self.all_adapters, staging_adapter.all_adapters):
+            adapter.swap_table(staging)
+
     def drop_table(self, initiated_by=None, source=None, skip_log=False):
         for adapter in self.all_adapters:
             adapter.drop_table(initiated_by=initiated_by, source=source, skip_log=skip_log)
@@ -323,6 +465,10 @@ class MultiDBSqlAdapter(object):
         for adapter in self.all_adapters:
             adapter.save_rows(rows, use_shard_col)
 
+    def copy_rows(self, rows, fresh_table=False):
+        for adapter in self.all_adapters:
+            adapter.copy_rows(rows, fresh_table)
+
     def bulk_save(self, docs):
         for adapter in self.all_adapters:
             adapter.bulk_save(docs)
@@ -394,6 +540,13 @@ def get_indicator_table(indicator_config, metadata, override_table_name=None):
     )
 
 
+def _get_index_key(index):
+    # a column can have both an index from ``create_index`` and one from
+    # ``sql_column_indexes``
+    from_column = getattr(index, '_column_flag', False)
+    return tuple(column.name for column in index.columns), index.unique, from_column
+
+
 def _custom_index_name(table_name, column_ids):
     base_name = "ix_{}_{}".format(table_name, ','.join(column_ids))
     base_hash = hashlib.md5(base_name.encode('utf-8')).hexdigest()
@@ -409,3 +562,53 @@ def rebuild_table(engine, table):
 def build_table(engine, table):
     with engine.begin() as connection:
         table.create(connection, checkfirst=True)
+
+
+def _copy_into(session, table_name, column_names, data):
+    copy = sql.SQL('COPY {table} ({columns}) FROM STDIN').format(
+        table=sql.Identifier(table_name),
+        columns=sql.SQL(', ').join(sql.Identifier(name) for name in column_names),
+    )
+    dbapi_connection = session.connection().connection
+    with dbapi_connection.cursor() as cursor:
+        cursor.copy_expert(copy.as_string(cursor), data)
+
+
+def _get_copy_data(column_names, rows):
+    """Format rows in the text format of PostgreSQL COPY"""
+    data = io.StringIO()
+    for row in rows:
+        data.write('\t'.join(_copy_value(row.get(name)) for name in column_names))
+        data.write('\n')
+    data.seek(0)
+    return data
+
+
+def _copy_value(value):
+    if value is None:
+        return '\\N'
+    if isinstance(value, bool):
+        # boolean indicators are saved to integer columns
+        value = int(value)
+    elif isinstance(value, (date, datetime)):
+        value = value.isoformat()
+    elif isinstance(value, (list, tuple)):
+        value = _array_literal(value)
+    return _escape_copy_text(str(value))
+
+
+def _array_literal(values):
+    def _element(value):
+        if value is None:
+            return 'NULL'
+        return '"{}"'.format(str(value).replace('\\', '\\\\').replace('"', '\\"'))
+    return '{{{}}}'.format(','.join(_element(value) for value in values))
+
+
+def _escape_copy_text(value):
+    return (
+        value.replace('\\', '\\\\')
+        .replace('\t', '\\t')
+        .replace('\n', '\\n')
+        .replace('\r', '\\r')
+    )
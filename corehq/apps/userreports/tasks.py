@@ -12,16 +12,18 @@ from botocore.vendored.requests.exceptions import ReadTimeout
 from botocore.vendored.requests.packages.urllib3.exceptions import (
     ProtocolError,
 )
+from celery import chord
 from celery.schedules import crontab
 from couchdbkit import ResourceConflict, ResourceNotFound
 
 from couchexport.models import Format
 from dimagi.utils.chunked import chunked
-from dimagi.utils.couch import CriticalSection
+from dimagi.utils.couch import CriticalSection, get_redis_lock, release_lock
 from dimagi.utils.logging import notify_exception
 from pillowtop.dao.couch import ID_CHUNK_SIZE
 from soil.util import expose_download, get_download_file_path
 
+from corehq import toggles
 from corehq.apps.celery import periodic_task, task
 from corehq.apps.change_feed.data_sources import (
     get_document_store_for_doc_type,
@@ -42,7 +44,14 @@ from corehq.apps.userreports.models import (
     DataSourceActionLog,
     id_is_static,
 )
-from corehq.apps.userreports.rebuild import DataSourceResumeHelper
+from corehq.apps.userreports.rebuild import (
+    DataSourceResumeHelper,
+    get_rebuild_partitions,
+    get_staging_table_name,
+    iter_modified_ids,
+    iter_partition_ids,
+    supports_parallel_rebuild,
+)
 from corehq.apps.userreports.specs import EvaluationContext
 from corehq.apps.userreports.util import (
     get_async_indicator_modify_lock_key,
@@ -65,9 +74,22 @@ from corehq.util.view_utils import reverse
 
 celery_task_logger = logging.getLogger('celery.task')
 
+# the number of id ranges the documents in each form processing database
+# are split into for parallel rebuilds
+REBUILD_RANGES_PER_DB = 4
+# how long starting a parallel rebuild, i.e. rebuilding the staging table
+# and splitting the data source into partitions, may take
+PARALLEL_REBUILD_LOCK_TIMEOUT = 30 * 60
+
+
+def _build_indicators(config, document_store, relevant_ids, fresh_table=False, override_table_name=None):
+    adapter = get_indicator_adapter(
+        config, raise_errors=True, load_source='build_indicators', override_table_name=override_table_name
+    )
 
-def _build_indicators(config, document_store, relevant_ids):
-    adapter = get_indicator_adapter(config, raise_errors=True, load_source='build_indicators')
+    if not config.asynchronous and toggles.UCR_COPY_LOADER.enabled(config.domain):
+        _copy_indicators(adapter, document_store.iter_documents(relevant_ids), fresh_table)
+        return
 
     for doc in document_store.iter_documents(relevant_ids):
         if config.asynchronous:
@@ -79,6 +101,37 @@ def _build_indicators(config, document_store, relevant_ids):
             adapter.best_effort_save(doc)
 
 
+def _copy_indicators(adapter, docs, fresh_table):
+    """Save the rows of a chunk of documents with one COPY
+
+    If the rows can't be saved together the rows of each document are
+    saved separately, so that errors are handled for each document as
+    usual.
+
+    :param adapter: An ``IndicatorAdapterLoadTracker``. The load of the
+        rows is tracked once, when they are copied.
+    """
+    rows = []
+    rows_by_doc = []
+    for doc in docs:
+        try:
+            doc_rows = adapter.get_all_values(doc)
+        except Exception as e:
+            adapter.handle_exception(doc, e)
+        else:
+            if doc_rows:
+                rows.extend(doc_rows)
+                rows_by_doc.append((doc, doc_rows))
+    try:
+        adapter.copy_rows(rows, fresh_table)
+    except Exception:
+        for doc, doc_rows in rows_by_doc:
+            try:
+                adapter.adapter.save_rows(doc_rows)
+            except Exception as e:
+                adapter.handle_exception(doc, e)
+
+
 @serial_task('{indicator_config_id}', default_retry_delay=60 * 10, timeout=3 * 60 * 60, max_retries=20,
              queue=UCR_CELERY_QUEUE, ignore_result=True, serializer='pickle')
 def rebuild_indicators(
@@ -123,7 +176,9 @@ def rebuild_indicators(
         rows_count_before_rebuild = _get_rows_count_from_existing_table(adapter)
         try:
             adapter.rebuild_table(initiated_by=initiated_by, source=source, skip_log=skip_log, diffs=diffs)
-            _iteratively_build_table(config, limit=limit)
+            # the table of a single engine of a mirrored data source is
+            # rebuilt, but rows are saved to all of them
+            _iteratively_build_table(config, limit=limit, fresh_table=not engine_id)
         except Exception:
             _report_ucr_rebuild_metrics(config, source, 'rebuild_datasource', adapter,
                                         rows_count_before_rebuild, error=True)
@@ -160,6 +215,141 @@ def rebuild_indicators_in_place(indicator_config_id, initiated_by=None, source=N
                                     rows_count_before_rebuild)
 
 
+@task(queue=UCR_CELERY_QUEUE, ignore_result=True)
+def rebuild_indicators_in_parallel(indicator_config_id, initiated_by=None, source=None,
+                                   ranges_per_db=REBUILD_RANGES_PER_DB):
+    """
+    Rebuilds a data source into a staging table, split into partitions by
+    form processing database and id range which are built by separate
+    tasks. Once all partitions are built the staging table replaces the
+    data source table.
+
+    Calling this again for a data source whose rebuild did not finish
+    resumes building the partitions that are not complete. If the rebuild
+    of the data source is being started by another task, this does
+    nothing.
+    """
+    config = get_ucr_datasource_config_by_id(indicator_config_id)
+    if not supports_parallel_rebuild(config):
+        rebuild_indicators(indicator_config_id, initiated_by=initiated_by, source=source)
+        return
+
+    lock = get_redis_lock(
+        f'ucr-parallel-rebuild-{indicator_config_id}',
+        timeout=PARALLEL_REBUILD_LOCK_TIMEOUT,
+        name='ucr_parallel_rebuild',
+    )
+    if not lock.acquire(blocking=False):
+        celery_task_logger.info("Rebuild of %s is already being started", indicator_config_id)
+        return
+    try:
+        _start_parallel_rebuild(config, initiated_by, source, ranges_per_db)
+    finally:
+        release_lock(lock, True)
+
+
+def _start_parallel_rebuild(config, initiated_by, source, ranges_per_db):
+    indicator_config_id = config._id
+    resume_helper = DataSourceResumeHelper(config)
+    if not resume_helper.has_partitions():
+        adapter = get_indicator_adapter(config)
+        adapter.log_table_rebuild(initiated_by, source)
+        _get_staging_adapter(config).rebuild_table(initiated_by=initiated_by, source=source, skip_log=True)
+
+        started_on = datetime.utcnow()
+        partitions = get_rebuild_partitions(config, ranges_per_db)
+        if not id_is_static(indicator_config_id):
+            config.meta.build.awaiting = False
+            config.meta.build.initiated = started_on
+            config.meta.build.finished = False
+            config.meta.build.rebuilt_asynchronously = False
+            config.save()
+            # the resume info is keyed on the revision of the config
+            resume_helper = DataSourceResumeHelper(config)
+        resume_helper.set_partitions(partitions, started_on)
+
+    header = [
+        build_rebuild_partition.s(indicator_config_id, partition.id)
+        for partition in resume_helper.get_partitions()
+        if not partition.complete
+    ]
+    callback = finish_parallel_rebuild.si(indicator_config_id, initiated_by, source)
+    if header:
+        chord(header, callback)()
+    else:
+        callback.delay()
+
+
+@task(queue=UCR_CELERY_QUEUE, acks_late=True)
+def build_rebuild_partition(indicator_config_id, partition_id):
+    config = get_ucr_datasource_config_by_id(indicator_config_id)
+    resume_helper = DataSourceResumeHelper(config)
+    partition = resume_helper.get_partition(partition_id)
+    if partition is None:
+        # the rebuild finished, or was restarted with a new revision
+        return
+    document_store = get_document_store_for_doc_type(
+        partition.domain, config.referenced_doc_type,
+        case_type_or_xmlns=partition.case_type_or_xmlns,
+        load_source="build_indicators",
+    )
+    staging_table_name = get_staging_table_name(config)
+    for doc_ids, last_pk in iter_partition_ids(config, partition):
+        _build_indicators(
+            config, document_store, doc_ids, fresh_table=True, override_table_name=staging_table_name
+        )
+        partition = resume_helper.set_partition_progress(partition, last_pk)
+    resume_helper.set_partition_progress(partition, partition.last_pk, complete=True)
+
+
+@task(queue=UCR_CELERY_QUEUE, ignore_result=True)
+def finish_parallel_rebuild(indicator_config_id, initiated_by=None, source=None):
+    config = get_ucr_datasource_config_by_id(indicator_config_id)
+    success = _('Your UCR table {} has finished rebuilding in {}').format(config.table_id, config.domain)
+    failure = _('There was an error rebuilding Your UCR table {} in {}.').format(config.table_id, config.domain)
+    with notify_someone(initiated_by, success_message=success, error_message=failure, send=True):
+        resume_helper = DataSourceResumeHelper(config)
+        started_on = resume_helper.get_partitions_started_on()
+        if started_on is None:
+            # already finished
+            return
+        incomplete = [partition.id for partition in resume_helper.get_partitions() if not partition.complete]
+        if incomplete:
+            raise ValueError(f'Partitions of {indicator_config_id} are not complete: {incomplete}')
+
+        adapter = get_indicator_adapter(config, raise_errors=True, load_source='build_indicators')
+        adapter.swap_table(_get_staging_adapter(config))
+        # the pillow saved changes made during the rebuild to the table
+        # that was replaced
+        _build_modified_indicators(config, adapter, started_on)
+        resume_helper.clear_resume_info()
+        _set_build_finished(config)
+
+
+def _get_staging_adapter(config):
+    return get_indicator_adapter(
+        config, raise_errors=True, load_source='build_indicators',
+        override_table_name=get_staging_table_name(config),
+    )
+
+
+def _build_modified_indicators(config, adapter, since):
+    for domain, case_type_or_xmlns in itertools.product(config.data_domains,
+                                                         config.get_case_type_or_xmlns_filter()):
+        document_store = get_document_store_for_doc_type(
+            domain, config.referenced_doc_type,
+            case_type_or_xmlns=case_type_or_xmlns,
+            load_source="build_indicators",
+        )
+        for doc_ids in iter_modified_ids(config, domain, case_type_or_xmlns, since):
+            # rows of documents which no longer match the filter are
+            # deleted, like the pillow does
+            adapter.bulk_delete([{'_id': doc_id} for doc_id in doc_ids])
+            _build_indicators(config, document_store, doc_ids)
+        for doc_ids in iter_modified_ids(config, domain, case_type_or_xmlns, since, deleted=True):
+            adapter.bulk_delete([{'_id': doc_id} for doc_id in doc_ids])
+
+
 def _get_rows_count_from_existing_table(adapter):
     table = adapter.get_existing_table_from_db()
     if table is not None:
@@ -231,9 +421,8 @@ def resume_building_indicators(indicator_config_id, initiated_by=None):
         _iteratively_build_table(config, resume_helper)
 
 
-def _iteratively_build_table(config, resume_helper=None, in_place=False, limit=-1):
+def _iteratively_build_table(config, resume_helper=None, in_place=False, limit=-1, fresh_table=False):
     resume_helper = resume_helper or DataSourceResumeHelper(config)
-    indicator_config_id = config._id
     case_type_or_xmlns_list = config.get_case_type_or_xmlns_filter()
     domains = config.data_domains
 
@@ -255,16 +444,20 @@ def _iteratively_build_table(config, resume_helper=None, in_place=False, limit=-
                 break
             relevant_ids.append(relevant_id)
             if len(relevant_ids) >= ID_CHUNK_SIZE:
-                _build_indicators(config, document_store, relevant_ids)
+                _build_indicators(config, document_store, relevant_ids, fresh_table)
                 relevant_ids = []
 
         if relevant_ids:
-            _build_indicators(config, document_store, relevant_ids)
+            _build_indicators(config, document_store, relevant_ids, fresh_table)
 
         resume_helper.add_completed_iteration(domain, case_type_or_xmlns)
 
     resume_helper.clear_resume_info()
-    if not id_is_static(indicator_config_id):
+    _set_build_finished(config, in_place)
+
+
+def _set_build_finished(config, in_place=False):
+    if not id_is_static(config._id):
         if in_place:
             config.meta.build.finished_in_place = True
         else:
@@ -1,9 +1,17 @@
-from django.test import TestCase
-from unittest.mock import patch
+from datetime import date
+from unittest.mock import Mock, patch
 
-from corehq.apps.userreports.sql.adapter import IndicatorSqlAdapter
+from django.test import SimpleTestCase, TestCase
+
+import psycopg2
+import sqlalchemy
+
+from corehq.apps.userreports.adapter import IndicatorAdapterLoadTracker
+from corehq.apps.userreports.rebuild import get_staging_table_name
+from corehq.apps.userreports.sql.adapter import IndicatorSqlAdapter, _get_copy_data
 from corehq.apps.userreports.models import DataSourceConfiguration
 from corehq.apps.userreports.app_manager.helpers import clean_table_name
+from corehq.util.test_utils import flag_enabled
 
 
 class TestIndicatorSqlAdapter(TestCase):
@@ -51,3 +59,104 @@ class TestIndicatorSqlAdapter(TestCase):
 
         adapter.bulk_delete(docs)
         register_data_source_row_change_mock.assert_called()
+
+    @patch("corehq.apps.userreports.sql.adapter.register_data_source_row_change")
+    def test_copy_rows(self, register_data_source_row_change_mock):
+        config = self._create_data_source_config("test-domain3")
+        adapter = IndicatorSqlAdapter(config)
+        adapter.build_table()
+        self.addCleanup(adapter.drop_table)
+
+        adapter.save_rows(self._get_rows(config, {'1': 'one', '2': 'two'}))
+        adapter.copy_rows(self._get_rows(config, {'2': 'two\tor\\three', '3': None}))
+
+        self.assertEqual(self._get_names(adapter), {'1': 'one', '2': 'two\tor\\three', '3': None})
+        register_data_source_row_change_mock.assert_called_with(
+            domain="test-domain3",
+            data_source_id=config._id,
+            doc_ids={'2', '3'},
+        )
+
+    @patch("corehq.apps.userreports.sql.adapter.register_data_source_row_change")
+    def test_copy_rows_to_fresh_table(self, register_data_source_row_change_mock):
+        config = self._create_data_source_config("test-domain4")
+        adapter = IndicatorSqlAdapter(config)
+        adapter.build_table()
+        self.addCleanup(adapter.drop_table)
+
+        adapter.copy_rows(self._get_rows(config, {'1': 'one'}), fresh_table=True)
+        # rows which exist are merged
+        adapter.copy_rows(self._get_rows(config, {'1': 'uno', '2': 'dos'}), fresh_table=True)
+
+        self.assertEqual(self._get_names(adapter), {'1': 'uno', '2': 'dos'})
+
+    @flag_enabled('UCR_COPY_LOADER')
+    @patch("corehq.apps.userreports.sql.adapter.COPY_MIN_ROWS", 1)
+    @patch("corehq.apps.userreports.sql.adapter.register_data_source_row_change")
+    def test_save_rows_inserts_rows_that_cannot_be_copied(self, register_data_source_row_change_mock):
+        config = self._create_data_source_config("test-domain6")
+        adapter = IndicatorSqlAdapter(config)
+        adapter.build_table()
+        self.addCleanup(adapter.drop_table)
+
+        track_load = Mock()
+        rows = self._get_rows(config, {'1': 'one', '2': 'two'})
+        with patch.object(adapter, 'copy_rows', side_effect=psycopg2.DataError) as copy_rows:
+            IndicatorAdapterLoadTracker(adapter, track_load).save_rows(rows)
+
+        copy_rows.assert_called_once()
+        track_load.assert_called_once_with(len(rows))
+        self.assertEqual(self._get_names(adapter), {'1': 'one', '2': 'two'})
+
+    @patch("corehq.apps.userreports.sql.adapter.register_data_source_row_change")
+    def test_swap_table(self, register_data_source_row_change_mock):
+        config = self._create_data_source_config("test-domain5")
+        adapter = IndicatorSqlAdapter(config)
+        adapter.build_table()
+        self.addCleanup(adapter.drop_table)
+        adapter.save_rows(self._get_rows(config, {'1': 'old'}))
+
+        staging_adapter = IndicatorSqlAdapter(config, override_table_name=get_staging_table_name(config))
+        staging_adapter.rebuild_table()
+        staging_adapter.save_rows(self._get_rows(config, {'1': 'new', '2': 'two'}))
+        adapter.swap_table(staging_adapter)
+
+        self.assertEqual(self._get_names(adapter), {'1': 'new', '2': 'two'})
+        self.assertFalse(IndicatorSqlAdapter(config, override_table_name=staging_adapter.get_table().name)
+                         .table_exists)
+        inspector = sqlalchemy.inspect(adapter.engine)
+        self.assertEqual(
+            inspector.get_pk_constraint(adapter.get_table().name)['name'],
+            f'{adapter.get_table().name}_pkey',
+        )
+        [index] = inspector.get_indexes(adapter.get_table().name)
+        self.assertEqual(index['column_names'], ['inserted_at'])
+        self.assertNotIn(staging_adapter.get_table().name, index['name'])
+        # the staging table can be built again
+        staging_adapter.rebuild_table()
+        self.addCleanup(staging_adapter.drop_table)
+
+    @staticmethod
+    def _get_rows(config, names_by_id):
+        rows = []
+        for doc_id, name in names_by_id.items():
+            doc = {'_id': doc_id, 'domain': config.domain, 'doc_type': 'CommCareCase', 'name': name}
+            rows.extend(config.get_all_values(doc))
+        return rows
+
+    @staticmethod
+    def _get_names(adapter):
+        return {row.doc_id: row.name for row in adapter.get_query_object()}
+
+
+class TestCopyData(SimpleTestCase):
+
+    def test_get_copy_data(self):
+        data = _get_copy_data(['doc_id', 'name', 'count', 'dob', 'tags'], [
+            {'doc_id': 'a', 'name': 'line\nbreak', 'count': True, 'dob': date(2020, 1, 2), 'tags': ['x', 'y"z']},
+            {'doc_id': 'b', 'name': None, 'count': 3, 'dob': None, 'tags': [None]},
+        ])
+        self.assertEqual(data.read(), (
+            'a\tline\\nbreak\t1\t2020-01-02\t{"x","y\\\\"z"}\n'
+            'b\t\\N\t3\t\\N\t{NULL}\n'
+        ))
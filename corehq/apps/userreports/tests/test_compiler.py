@@ -0,0 +1,158 @@
+import datetime
+from unittest.mock import MagicMock, patch
+
+from django.test import SimpleTestCase
+
+from corehq.apps.userreports.compiler import CompiledDataSource
+from corehq.apps.userreports.expressions.getters import safe_recursive_lookup
+from corehq.apps.userreports.models import DataSourceConfiguration
+from corehq.apps.userreports.specs import EvaluationContext
+from corehq.apps.userreports.tests.utils import (
+    get_data_source_with_repeat,
+    get_sample_data_source,
+    get_sample_doc_and_indicators,
+)
+from corehq.util.test_utils import flag_enabled
+
+
+@patch('corehq.apps.userreports.models.AllowedUCRExpressionSettings.disallowed_ucr_expressions',
+       MagicMock(return_value=[]))
+class CompiledDataSourceTest(SimpleTestCase):
+
+    def test_sample_data_source(self):
+        config = get_sample_data_source()
+        doc, _ = get_sample_doc_and_indicators()
+        not_matching = dict(doc, type='not-ticket')
+        self._assert_same_values(config, doc)
+        self._assert_same_values(config, not_matching)
+        self.assertTrue(CompiledDataSource(config).filter(doc, EvaluationContext(doc)))
+        self.assertFalse(CompiledDataSource(config).filter(not_matching, EvaluationContext(not_matching)))
+
+    def test_repeat_data_source(self):
+        now = datetime.datetime.utcnow()
+        doc = {
+            "_id": "repeat-id",
+            "domain": "user-reports",
+            "doc_type": "XFormInstance",
+            "created": "monday",
+            "form": {"time_logs": [
+                {"start_time": now, "end_time": now, "person": "al"},
+                {"start_time": now, "end_time": now, "person": "chris"},
+            ]},
+        }
+        self._assert_same_values(get_data_source_with_repeat(), doc)
+
+    def test_expressions(self):
+        config = self._get_config([
+            {
+                "type": "conditional",
+                "test": {
+                    "type": "and",
+                    "filters": [
+                        {"type": "named", "name": "is_adult"},
+                        {"type": "not", "filter": {
+                            "type": "boolean_expression",
+                            "expression": {"type": "property_name", "property_name": "name"},
+                            "operator": "in",
+                            "property_value": ["bob", "alice"],
+                        }},
+                    ],
+                },
+                "expression_if_true": {"type": "named", "name": "age"},
+                "expression_if_false": {"type": "constant", "constant": 0},
+            },
+            {
+                "type": "switch",
+                "switch_on": {"type": "property_path", "property_path": ["address", "city"]},
+                "cases": {
+                    "Cape Town": {"type": "constant", "constant": "ZA"},
+                    "Boston": {"type": "constant", "constant": "US"},
+                },
+                "default": {"type": "constant", "constant": None},
+            },
+            {"type": "root_doc", "expression": {"type": "property_name", "property_name": "name"}},
+            {"type": "array_index", "array_expression": {"type": "property_name", "property_name": "tags"},
+             "index_expression": {"type": "constant", "constant": 1}},
+        ])
+        docs = [
+            {"name": "carol", "age": "42", "address": {"city": "Boston"}, "tags": ["a", "b"]},
+            {"name": "bob", "age": "42", "address": {"city": "Cape Town"}},
+            {"name": "dave", "age": "12", "address": {}, "tags": "a"},
+            {"name": "erin"},
+        ]
+        for doc in docs:
+            self._assert_same_values(config, self._doc(doc))
+
+    def test_shared_subexpression_evaluated_once(self):
+        config = self._get_config([
+            {"type": "property_path", "property_path": ["form", "dob"], "datatype": "date"},
+            {"type": "property_path", "property_path": ["form", "dob"], "datatype": "date"},
+            {"type": "property_path", "property_path": ["form", "name"]},
+        ])
+        doc = self._doc({"form": {"dob": "2000-01-01", "name": "carol"}})
+        lookup = MagicMock(side_effect=safe_recursive_lookup)
+        with patch('corehq.apps.userreports.compiler.safe_recursive_lookup', lookup):
+            [values] = self._get_compiled_values(config, doc)
+        self.assertEqual(lookup.call_count, 2)
+        self.assertEqual(
+            [value.value for value in values[2:]],
+            ["2000-01-01", "2000-01-01", "carol"],
+        )
+
+    def test_uses_compiled_data_source_when_enabled(self):
+        config = get_sample_data_source()
+        doc, _ = get_sample_doc_and_indicators()
+        with flag_enabled('UCR_COMPILED_EXPRESSIONS'):
+            self.assertTrue(config.filter(doc))
+            self.assertIsInstance(config._get_compiled_data_source(), CompiledDataSource)
+
+    def _assert_same_values(self, config, doc):
+        self.assertEqual(
+            self._get_values(self._get_compiled_values(config, doc)),
+            self._get_values(config.get_all_values(doc, EvaluationContext(doc))),
+        )
+
+    def _get_compiled_values(self, config, doc):
+        with patch.object(DataSourceConfiguration, '_get_compiled_data_source',
+                          return_value=CompiledDataSource(config)):
+            return config.get_all_values(doc, EvaluationContext(doc))
+
+    @staticmethod
+    def _get_values(rows):
+        # inserted_at is the time the evaluation context was created
+        return [
+            [(value.column.id, value.value) for value in row if value.column.id != 'inserted_at']
+            for row in rows
+        ]
+
+    @staticmethod
+    def _get_config(expressions):
+        return DataSourceConfiguration(
+            domain='test',
+            referenced_doc_type='CommCareCase',
+            table_id='compiled',
+            named_expressions={
+                "age": {"type": "property_name", "property_name": "age", "datatype": "integer"},
+            },
+            named_filters={
+                "is_adult": {
+                    "type": "boolean_expression",
+                    "expression": {"type": "named", "name": "age"},
+                    "operator": "gte",
+                    "property_value": 18,
+                },
+            },
+            configured_indicators=[
+                {
+                    "type": "expression",
+                    "column_id": "col_{}".format(i),
+                    "datatype": "string",
+                    "expression": expression,
+                }
+                for i, expression in enumerate(expressions)
+            ],
+        )
+
+    @staticmethod
+    def _doc(doc):
+        return dict(doc, _id="doc-id", domain="test", doc_type="CommCareCase")
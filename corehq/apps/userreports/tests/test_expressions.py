@@ -1861,6 +1861,18 @@ class TestEvaluationContext(SimpleTestCase):
         fn_that_should_be_cached(3, context)
         self.assertEqual(counter.call_count, 3)
 
+    def test_seeded_cache(self):
+        counter = MagicMock()
+
+        @ucr_context_cache(vary_on=('arg1',))
+        def fn_that_should_be_cached(arg1, evaluation_context):
+            counter()
+
+        context = EvaluationContext({})
+        context.set_cache_value(fn_that_should_be_cached.get_cache_key(2), 'seeded')
+        self.assertEqual(fn_that_should_be_cached(2, context), 'seeded')
+        self.assertEqual(counter.call_count, 0)
+
 
 class SplitStringExpressionTest(SimpleTestCase):
 
@@ -0,0 +1,137 @@
+from unittest.mock import MagicMock, patch
+
+from django.test import SimpleTestCase
+
+from corehq.apps.userreports.models import DataSourceConfiguration
+from corehq.apps.userreports.prefetch import (
+    RELATED_CASE,
+    RELATED_DOC,
+    RelatedDocPrefetcher,
+    get_prefetch_lookups,
+)
+from corehq.apps.userreports.specs import EvaluationContext
+
+DOMAIN = 'prefetch-test'
+
+
+def _related_doc(doc_type, doc_id_expression, property_name='name'):
+    return {
+        "type": "related_doc",
+        "related_doc_type": doc_type,
+        "doc_id_expression": doc_id_expression,
+        "value_expression": {"type": "property_name", "property_name": property_name},
+    }
+
+
+def _get_config(expressions, named_expressions=None):
+    return DataSourceConfiguration(
+        domain=DOMAIN,
+        referenced_doc_type='CommCareCase',
+        table_id='prefetch',
+        named_expressions=named_expressions or {},
+        configured_indicators=[
+            {
+                "type": "expression",
+                "column_id": "col_{}".format(i),
+                "datatype": "string",
+                "expression": expression,
+            }
+            for i, expression in enumerate(expressions)
+        ],
+    )
+
+
+class GetPrefetchLookupsTest(SimpleTestCase):
+
+    def test_lookups(self):
+        config = _get_config([
+            _related_doc('CommCareCase', {"type": "property_name", "property_name": "parent_id"}),
+            {
+                "type": "related_case",
+                "case_id_expression": {"type": "named", "name": "host_id"},
+                "value_expression": {"type": "property_name", "property_name": "name"},
+            },
+        ], named_expressions={
+            "host_id": {"type": "property_path", "property_path": ["indices", "host"]},
+        })
+        lookups = get_prefetch_lookups(config)
+        self.assertEqual(
+            [(lookup.kind, lookup.doc_type) for lookup in lookups],
+            [(RELATED_DOC, 'CommCareCase'), (RELATED_CASE, None)],
+        )
+        doc = {"parent_id": "abc", "indices": {"host": "def"}}
+        self.assertEqual(
+            [lookup.id_expression(doc, EvaluationContext(doc)) for lookup in lookups],
+            ["abc", "def"],
+        )
+
+    def test_skips_ids_which_need_lookups(self):
+        config = _get_config([
+            _related_doc('CommCareCase', _related_doc(
+                'CommCareCase',
+                {"type": "property_name", "property_name": "parent_id"},
+                property_name='parent_id',
+            )),
+            _related_doc('CommCareCase', {"type": "named", "name": "from_registry"}),
+        ])
+        lookups = get_prefetch_lookups(config)
+        # only the inner lookup of the nested expression can be prefetched
+        self.assertEqual(len(lookups), 1)
+        doc = {"parent_id": "abc"}
+        self.assertEqual(lookups[0].id_expression(doc, EvaluationContext(doc)), "abc")
+
+    def test_skips_unsupported_doc_types(self):
+        config = _get_config([
+            _related_doc('CommCareUser', {"type": "property_name", "property_name": "user_id"}),
+        ])
+        self.assertEqual(get_prefetch_lookups(config), [])
+
+
+class RelatedDocPrefetcherTest(SimpleTestCase):
+
+    def test_prefetch(self):
+        config = _get_config([
+            _related_doc('CommCareCase', {"type": "property_name", "property_name": "parent_id"}),
+        ])
+        docs = [
+            {"_id": "child1", "domain": DOMAIN, "doc_type": "CommCareCase", "parent_id": "parent1"},
+            {"_id": "child2", "domain": DOMAIN, "doc_type": "CommCareCase", "parent_id": "parent2"},
+            {"_id": "child3", "domain": DOMAIN, "doc_type": "CommCareCase", "parent_id": "missing"},
+        ]
+        related_docs = [
+            {"_id": "parent1", "domain": DOMAIN, "name": "Parent 1"},
+            {"_id": "parent2", "domain": "other-domain", "name": "Parent 2"},
+        ]
+        store = MagicMock()
+        store.iter_documents.return_value = related_docs
+        with patch('corehq.apps.userreports.prefetch.get_document_store_for_doc_type',
+                   return_value=store) as get_store:
+            prefetcher = RelatedDocPrefetcher(DOMAIN, [config])
+            prefetcher.prefetch(docs)
+
+        get_store.assert_called_once_with(DOMAIN, 'CommCareCase', load_source='related_doc_expression')
+        self.assertEqual(
+            sorted(store.iter_documents.call_args[0][0]),
+            ['missing', 'parent1', 'parent2'],
+        )
+
+        indicator = config.indicators.indicators[-1]
+        context = EvaluationContext(docs[0])
+        prefetcher.seed(context)
+        with patch('corehq.apps.userreports.expressions.specs._get_doc') as get_doc:
+            [value] = indicator.get_values(docs[0], context)
+        get_doc.assert_not_called()
+        self.assertEqual(value.value, "Parent 1")
+
+        # documents which were not loaded are looked up as before
+        context = EvaluationContext(docs[1])
+        prefetcher.seed(context)
+        with patch('corehq.apps.userreports.expressions.specs._get_doc', return_value=None) as get_doc:
+            indicator.get_values(docs[1], context)
+        get_doc.assert_called_once_with(DOMAIN, 'CommCareCase', 'parent2')
+
+    def test_no_lookups(self):
+        config = _get_config([{"type": "property_name", "property_name": "name"}])
+        with patch('corehq.apps.userreports.prefetch.get_document_store_for_doc_type') as get_store:
+            RelatedDocPrefetcher(DOMAIN, [config]).prefetch([{"_id": "doc1", "domain": DOMAIN}])
+        get_store.assert_not_called()
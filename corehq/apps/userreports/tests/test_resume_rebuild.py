@@ -1,6 +1,12 @@
+from datetime import datetime
+
 from django.test import SimpleTestCase
 
-from corehq.apps.userreports.rebuild import DataSourceResumeHelper
+from corehq.apps.userreports.rebuild import (
+    DataSourceResumeHelper,
+    RebuildPartition,
+    _split_range,
+)
 from corehq.apps.userreports.tests.utils import get_sample_data_source
 from corehq.tests.locks import real_redis_client
 
@@ -43,3 +49,37 @@ class DataSourceResumeBuildTest(SimpleTestCase):
     def test_has_resume_info_true(self):
         self._resume_helper.add_completed_iteration("domain1", 'type1')
         self.assertEqual(True, self._resume_helper.has_resume_info())
+
+    def test_partitions(self):
+        self.assertFalse(self._resume_helper.has_partitions())
+        started_on = datetime(2020, 1, 1, 12)
+        partitions = [
+            RebuildPartition("domain1", "type1", "p1", 0, 100),
+            RebuildPartition("domain1", "type1", "p2", 100, 200),
+        ]
+        self._resume_helper.set_partitions(partitions, started_on)
+        self.assertTrue(self._resume_helper.has_partitions())
+        self.assertEqual(self._resume_helper.get_partitions_started_on(), started_on)
+        self.assertEqual(self._resume_helper.get_partitions(), partitions)
+        self.assertEqual(self._resume_helper.get_partition(partitions[1].id), partitions[1])
+        self.assertIsNone(self._resume_helper.get_partition('unknown'))
+
+        self._resume_helper.set_partition_progress(partitions[1], 150)
+        self._resume_helper.set_partition_progress(partitions[0], 100, complete=True)
+        self.assertEqual(self._resume_helper.get_partitions(), [
+            RebuildPartition("domain1", "type1", "p1", 0, 100, last_pk=100, complete=True),
+            RebuildPartition("domain1", "type1", "p2", 100, 200, last_pk=150),
+        ])
+
+        self._resume_helper.clear_resume_info()
+        self.assertFalse(self._resume_helper.has_partitions())
+        self.assertEqual(self._resume_helper.get_partitions(), [])
+
+
+class SplitRangeTest(SimpleTestCase):
+
+    def test_split_range(self):
+        self.assertEqual(_split_range(0, 10, 4), [(0, 3), (3, 6), (6, 9), (9, 10)])
+
+    def test_split_small_range(self):
+        self.assertEqual(_split_range(4, 6, 4), [(4, 5), (5, 6)])
@@ -3,8 +3,11 @@ from unittest.mock import Mock, call, patch
 
 from django.test import SimpleTestCase, TestCase
 
+from corehq.apps.userreports.adapter import IndicatorAdapterLoadTracker
 from corehq.apps.userreports.tasks import (
+    _copy_indicators,
     rebuild_indicators,
+    rebuild_indicators_in_parallel,
     rebuild_indicators_in_place,
     resume_building_indicators,
     time_in_range,
@@ -39,6 +42,47 @@ class TimeInRange(SimpleTestCase):
             self.assertTrue(time_in_range(time, TEST_SETTINGS))
 
 
+class TestCopyIndicators(SimpleTestCase):
+
+    def test_rows_of_each_doc_are_saved_if_copy_fails(self):
+        docs = [{'_id': 'doc1'}, {'_id': 'doc2'}]
+        rows_by_id = {'doc1': ['row1a', 'row1b'], 'doc2': ['row2']}
+        error = ValueError('bad row')
+        wrapped = Mock()
+        wrapped.get_all_values.side_effect = lambda doc: rows_by_id[doc['_id']]
+        wrapped.copy_rows.side_effect = ValueError('copy failed')
+        wrapped.save_rows.side_effect = [None, error]
+        track_load = Mock()
+
+        _copy_indicators(IndicatorAdapterLoadTracker(wrapped, track_load), docs, fresh_table=True)
+
+        wrapped.copy_rows.assert_called_once_with(['row1a', 'row1b', 'row2'], True)
+        self.assertEqual(wrapped.save_rows.call_args_list, [call(['row1a', 'row1b']), call(['row2'])])
+        wrapped.handle_exception.assert_called_once_with(docs[1], error)
+        wrapped.best_effort_save.assert_not_called()
+        track_load.assert_called_once_with(3)
+
+
+@patch('corehq.apps.userreports.tasks.supports_parallel_rebuild', return_value=True)
+@patch('corehq.apps.userreports.tasks.get_ucr_datasource_config_by_id')
+@patch('corehq.apps.userreports.tasks._start_parallel_rebuild')
+class TestRebuildIndicatorsInParallelLock(SimpleTestCase):
+
+    def test_rebuild_is_started(self, start_rebuild, *args):
+        lock = Mock(acquire=Mock(return_value=True))
+        with patch('corehq.apps.userreports.tasks.get_redis_lock', return_value=lock):
+            rebuild_indicators_in_parallel('abc123')
+        start_rebuild.assert_called_once()
+        lock.release.assert_called_once_with()
+
+    def test_rebuild_being_started_is_not_started_again(self, start_rebuild, *args):
+        lock = Mock(acquire=Mock(return_value=False))
+        with patch('corehq.apps.userreports.tasks.get_redis_lock', return_value=lock):
+            rebuild_indicators_in_parallel('abc123')
+        start_rebuild.assert_not_called()
+        lock.release.assert_not_called()
+
+
 class BaseTestRebuildIndicators(ConfigurableReportTestMixin, TestCase):
     @classmethod
     def tearDownClass(cls):
@@ -9,10 +9,12 @@ def get_blob_db():
         db = _get_s3_db(settings)
         if db is None:
             db = _get_fs_db(settings)
-        elif getattr(settings, "BLOB_DB_MIGRATING_FROM_FS_TO_S3", False):
-            db = _get_migrating_db(db, _get_fs_db(settings))
-        elif getattr(settings, "BLOB_DB_MIGRATING_FROM_S3_TO_S3", False):
-            db = _get_migrating_db(db, _get_s3_db(settings, "OLD_S3_BLOB_DB_SETTINGS"))
+        else:
+            db = _get_caching_db(db, settings)
+            if getattr(settings, "BLOB_DB_MIGRATING_FROM_FS_TO_S3", False):
+                db = _get_migrating_db(db, _get_fs_db(settings))
+            elif getattr(settings, "BLOB_DB_MIGRATING_FROM_S3_TO_S3", False):
+                db = _get_migrating_db(db, _get_s3_db(settings, "OLD_S3_BLOB_DB_SETTINGS"))
         _db.append(db)
     return _db[-1]
 
@@ -32,6 +34,14 @@ def _get_fs_db(settings):
     return FilesystemBlobDB(blob_dir)
 
 
+def _get_caching_db(db, settings):
+    config = getattr(settings, "BLOB_DB_CACHE", None)
+    if not config:
+        return db
+    from .cachingdb import CachingBlobDB
+    return CachingBlobDB(db, **config)
+
+
 def _get_migrating_db(new_db, old_db):
     from .migratingdb import MigratingBlobDB
     return MigratingBlobDB(new_db, old_db)
@@ -0,0 +1,310 @@
+"""Read-through cache of blobs on local disk
+
+Form XML and most attachments are never changed after they are written,
+but they are read many times, by pillows, UCR rebuilds, exports,
+repeaters and reprocessing. `CachingBlobDB` wraps a blob db and keeps a
+copy of each blob it gets, of the configured type codes, in a directory
+on local disk. The copies are read with `mmap`, so repeated reads of a
+blob on the same host do not make a request to S3, and compressed blobs
+are not decompressed again.
+
+Only type codes of blobs that are never changed should be cached. A blob
+that is changed or deleted is removed from the cache on the host that
+changed or deleted it, but other hosts may keep their copies until they
+are evicted.
+
+The cache is bounded by size. Blobs that were read least recently are
+evicted first. Each process checks the size of the cache after it has
+added `max_size / EVICTION_CHECK_RATIO` bytes to it, so the cache can
+briefly be larger than `max_size` when many processes fill it at the
+same time. Blobs are written to a temporary file and then renamed, so
+concurrent fills of the same blob are safe.
+"""
+import hashlib
+import logging
+import mmap
+import os
+import threading
+import time
+from functools import partial
+from io import BytesIO
+from tempfile import mkstemp
+
+from corehq.blobs import CODES
+from corehq.blobs.util import BlobStream
+from corehq.util.metrics import metrics_counter
+
+DEFAULT_TYPE_CODES = ("form_xml",)
+DEFAULT_MAX_BLOB_SIZE = 5 * 1024 * 1024
+CHUNK_SIZE = 64 * 1024
+EVICTION_CHECK_RATIO = 20
+# fraction of max_size that eviction reduces the cache to
+EVICTION_TARGET = 0.9
+# how long to wait before updating the last read time of a cached blob
+TOUCH_INTERVAL = 60
+TEMP_PREFIX = ".tmp-"
+# temporary files older than this were left by processes that died
+STALE_TEMP_AGE = 60 * 60
+
+log = logging.getLogger(__name__)
+
+
+class CachingBlobDB(object):
+    """Adaptor that caches blobs of some type codes on local disk
+
+    :param backend_db: The blob db to cache blobs from.
+    :param path: Directory of the cache.
+    :param max_size: Maximum size of the cache in bytes.
+    :param type_codes: Names or values of the type codes to cache.
+    :param max_blob_size: Blobs larger than this are not cached.
+    """
+
+    def __init__(self, backend_db, path, max_size, type_codes=DEFAULT_TYPE_CODES,
+                 max_blob_size=DEFAULT_MAX_BLOB_SIZE):
+        self.backend_db = backend_db
+        self.metadb = backend_db.metadb
+        self.cache = DiskLRUCache(path, max_size)
+        self.type_codes = {
+            getattr(CODES, code) if isinstance(code, str) else code
+            for code in type_codes
+        }
+        self.max_blob_size = max_blob_size
+
+    def __getattr__(self, name):
+        # backend-specific attributes, like `s3_bucket_name`
+        if name == "backend_db":
+            raise AttributeError(name)
+        return getattr(self.backend_db, name)
+
+    def put(self, *args, **kw):
+        meta = self.backend_db.put(*args, **kw)
+        self._discard(meta.key)
+        return meta
+
+    def get(self, key=None, type_code=None, meta=None):
+        blob_key, blob_type_code = (key, type_code) if meta is None else (meta.key, meta.type_code)
+        if blob_key is None or blob_type_code not in self.type_codes:
+            return self.backend_db.get(key=key, type_code=type_code, meta=meta)
+        cached = self._get_cached(blob_key, blob_type_code, meta)
+        if cached is not None:
+            return cached
+        get_content = partial(self.backend_db.get, key=key, type_code=type_code, meta=meta)
+        return self._add_to_cache(blob_key, blob_type_code, meta, get_content(), get_again=get_content)
+
+    def get_many(self, metas, maybe_compressed=False):
+        if maybe_compressed:
+            # stored bytes are not cached
+            yield from self.backend_db.get_many(metas, maybe_compressed=True)
+            return
+        not_cached = []
+        for meta in metas:
+            cached = None
+            if meta.type_code in self.type_codes:
+                cached = self._get_cached(meta.key, meta.type_code, meta)
+            if cached is None:
+                not_cached.append(meta)
+            else:
+                yield meta, cached
+        for meta, content in self.backend_db.get_many(not_cached):
+            if content is not None and meta.type_code in self.type_codes:
+                content = self._add_to_cache(
+                    meta.key, meta.type_code, meta, content,
+                    get_again=partial(self.backend_db.get, meta=meta),
+                )
+            yield meta, content
+
+    def _get_cached(self, blob_key, type_code, meta):
+        name, compressed_length = _cache_entry(blob_key, meta)
+        cached = self.cache.open(name)
+        if cached is None:
+            return None
+        metrics_counter('commcare.blobdb.cache', tags={
+            'type_code': CODES.name_of(type_code),
+            'result': 'hit',
+        })
+        fileobj, size = cached
+        return BlobStream(fileobj, self.backend_db, blob_key, size, compressed_length)
+
+    def _add_to_cache(self, blob_key, type_code, meta, content, get_again):
+        """Add content to the cache, and get it from the cache
+
+        :param get_again: A function to get the content from the backend
+        db if it cannot be added to the cache.
+        """
+        tags = {'type_code': CODES.name_of(type_code)}
+        if content.content_length is None or content.content_length > self.max_blob_size:
+            metrics_counter('commcare.blobdb.cache', tags={**tags, 'result': 'skip'})
+            return content
+        metrics_counter('commcare.blobdb.cache', tags={**tags, 'result': 'miss'})
+        name, compressed_length = _cache_entry(blob_key, meta)
+        with content:
+            try:
+                self.cache.fill(name, content)
+            except OSError:
+                log.exception("Could not add blob %s to the cache", blob_key)
+        cached = self.cache.open(name)
+        if cached is None:
+            # the fill failed, or the blob was evicted already
+            return get_again()
+        fileobj, size = cached
+        return BlobStream(fileobj, self.backend_db, blob_key, size, compressed_length)
+
+    def size(self, *args, **kw):
+        return self.backend_db.size(*args, **kw)
+
+    def exists(self, *args, **kw):
+        return self.backend_db.exists(*args, **kw)
+
+    def delete(self, key):
+        result = self.backend_db.delete(key)
+        self._discard(key)
+        return result
+
+    def bulk_delete(self, metas):
+        result = self.backend_db.bulk_delete(metas)
+        for meta in metas:
+            self._discard(meta.key)
+        return result
+
+    def expire(self, *args, **kw):
+        self.metadb.expire(*args, **kw)
+
+    def copy_blob(self, content, key):
+        self.backend_db.copy_blob(content, key)
+        self._discard(key)
+
+    def _discard(self, key):
+        for decompressed in (False, True):
+            self.cache.discard(_cache_name(key, decompressed))
+
+
+def _cache_name(key, decompressed):
+    # The same blob is cached separately as it is stored and decompressed
+    suffix = ":decompressed" if decompressed else ""
+    return hashlib.sha1((key + suffix).encode('utf-8')).hexdigest()
+
+
+def _cache_entry(blob_key, meta):
+    """Get the cache name and compressed length of a blob"""
+    decompressed = meta is not None and meta.is_compressed
+    compressed_length = meta.compressed_length if decompressed else None
+    return _cache_name(blob_key, decompressed), compressed_length
+
+
+class DiskLRUCache(object):
+    """Size-bounded cache of files in a directory, evicted by last read time
+
+    Files are stored in subdirectories named by the first two characters
+    of their names, which should be hex digests.
+    """
+
+    def __init__(self, path, max_size):
+        self.path = path
+        self.max_size = max_size
+        self._added_since_check = None  # check on first fill
+        self._eviction_lock = threading.Lock()
+
+    def open(self, name):
+        """Get a memory-mapped file object, and its size
+
+        :returns: A `(fileobj, size)` tuple, or `None` if the file is not cached.
+        """
+        path = self._get_path(name)
+        try:
+            with open(path, 'rb') as fh:
+                stat = os.fstat(fh.fileno())
+                if stat.st_size:
+                    fileobj = mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ)
+                else:
+                    # empty files cannot be mapped
+                    fileobj = BytesIO()
+        except FileNotFoundError:
+            return None
+        if time.time() - stat.st_mtime > TOUCH_INTERVAL:
+            try:
+                os.utime(path)
+            except FileNotFoundError:
+                pass
+        return fileobj, stat.st_size
+
+    def fill(self, name, content):
+        """Add a file to the cache with the content of a file-like object"""
+        path = self._get_path(name)
+        dirpath = os.path.dirname(path)
+        os.makedirs(dirpath, exist_ok=True)
+        fd, temp_path = mkstemp(dir=dirpath, prefix=TEMP_PREFIX)
+        size = 0
+        try:
+            with os.fdopen(fd, 'wb') as fh:
+                for chunk in iter(lambda: content.read(CHUNK_SIZE), b''):
+                    fh.write(chunk)
+                    size += len(chunk)
+            os.replace(temp_path, path)
+        except BaseException:
+            _remove(temp_path)
+            raise
+        self._added(size)
+
+    def discard(self, name):
+        _remove(self._get_path(name))
+
+    def _get_path(self, name):
+        return os.path.join(self.path, name[:2], name)
+
+    def _added(self, size):
+        if self._added_since_check is not None:
+            self._added_since_check += size
+            if self._added_since_check < self.max_size / EVICTION_CHECK_RATIO:
+                return
+        if self._eviction_lock.acquire(blocking=False):
+            try:
+                self._added_since_check = 0
+                self.evict()
+            finally:
+                self._eviction_lock.release()
+
+    def evict(self):
+        """Remove the least recently read files until the cache fits in
+        `EVICTION_TARGET` of its maximum size
+        """
+        files = []
+        total_size = 0
+        now = time.time()
+        for subdir in _scandir(self.path):
+            if not subdir.is_dir():
+                continue
+            for entry in _scandir(subdir.path):
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                if entry.name.startswith(TEMP_PREFIX):
+                    if now - stat.st_mtime > STALE_TEMP_AGE:
+                        _remove(entry.path)
+                    continue
+                files.append((stat.st_mtime, stat.st_size, entry.path))
+                total_size += stat.st_size
+        if total_size <= self.max_size:
+            return
+        target_size = self.max_size * EVICTION_TARGET
+        files.sort()
+        for __, size, path in files:
+            if total_size <= target_size:
+                break
+            _remove(path)
+            total_size -= size
+
+
+def _scandir(path):
+    try:
+        with os.scandir(path) as entries:
+            return list(entries)
+    except FileNotFoundError:
+        return []
+
+
+def _remove(path):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
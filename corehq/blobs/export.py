@@ -1,11 +1,13 @@
 import os
 
+from dimagi.utils.chunked import chunked
+
 from corehq.apps.dump_reload.sql.dump import (
     APP_LABELS_WITH_FILTER_KWARGS_TO_DUMP,
     get_all_model_iterators_builders_for_domain,
 )
 
-from . import NotFound, get_blob_db, CODES
+from . import get_blob_db
 from .migrate import PROCESSING_COMPLETE_MESSAGE
 from .models import BlobMeta
 from .targzipdb import TarGzipBlobDB
@@ -28,19 +30,21 @@ class BlobDbBackendExporter(object):
         if self.not_found:
             print(PROCESSING_COMPLETE_MESSAGE.format(self.not_found, self.total_blobs))
 
-    def process_object(self, meta):
-        self.total_blobs += 1
-        if meta.key in self._already_exported:
-            # This object is already in an another dump
-            return
+    def process_objects(self, metas):
+        metas_to_export = []
+        for meta in metas:
+            self.total_blobs += 1
+            if meta.key in self._already_exported:
+                # This object is already in an another dump
+                continue
+            metas_to_export.append(meta)
 
-        try:
-            content = self.src_db.get(meta.key, CODES.maybe_compressed)
-        except NotFound:
-            self.not_found += 1
-        else:
-            with content:
-                self.db.copy_blob(content, key=meta.key)
+        for meta, content in self.src_db.get_many(metas_to_export, maybe_compressed=True):
+            if content is None:
+                self.not_found += 1
+            else:
+                with content:
+                    self.db.copy_blob(content, key=meta.key)
 
 
 class BlobExporter:
@@ -66,10 +70,9 @@ class BlobExporter:
             )
             for model_class, builder in builders:
                 for iterator in builder.iterators():
-                    for obj in iterator:
-                        migrator.process_object(obj)
-                        if migrator.total_blobs % chunk_size == 0:
-                            print("Processed {} objects".format(migrator.total_blobs))
+                    for chunk in chunked(iterator, chunk_size, list):
+                        migrator.process_objects(chunk)
+                        print("Processed {} objects".format(migrator.total_blobs))
 
         print("Processed {} total objects".format(migrator.total_blobs))
         return migrator.total_blobs, 0
@@ -1,6 +1,7 @@
 from abc import ABCMeta, abstractmethod
 
 from . import CODES
+from .exceptions import NotFound
 from .metadata import MetaDB
 
 NOT_SET = object()
@@ -69,6 +70,33 @@ class AbstractBlobDB(metaclass=ABCMeta):
         """
         raise NotImplementedError
 
+    def get_many(self, metas, maybe_compressed=False):
+        """Get many blobs.
+
+        :param metas: An iterable of `BlobMeta` objects.
+        :param maybe_compressed: Get blobs as they are stored, like
+        `get(meta.key, CODES.maybe_compressed)`, instead of like
+        `get(meta=meta)`.
+
+        Backends may get blobs concurrently, so they are not necessarily
+        returned in the order of `metas`.
+
+        :returns: An iterator of `(meta, content)` tuples, where content
+        is a BlobStream object in binary read mode, or `None` if the blob
+        was not found. Content objects should be closed when finished
+        reading.
+        """
+        for meta in metas:
+            yield meta, self._get_or_none(meta, maybe_compressed)
+
+    def _get_or_none(self, meta, maybe_compressed=False):
+        try:
+            if maybe_compressed:
+                return self.get(meta.key, CODES.maybe_compressed)
+            return self.get(meta=meta)
+        except NotFound:
+            return None
+
     @staticmethod
     def _validate_get_args(key, type_code, meta):
         if key is not None or type_code is not None:
@@ -25,6 +25,15 @@ class MigratingBlobDB(object):
         except NotFound:
             return self.old_db.get(*args, **kw)
 
+    def get_many(self, metas, **kw):
+        not_found = []
+        for meta, content in self.new_db.get_many(metas, **kw):
+            if content is None:
+                not_found.append(meta)
+            else:
+                yield meta, content
+        yield from self.old_db.get_many(not_found, **kw)
+
     def size(self, *args, **kw):
         try:
             return self.new_db.size(*args, **kw)
@@ -1,5 +1,7 @@
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 from contextlib import contextmanager
 from gzip import GzipFile
+from io import BytesIO
 
 import boto3
 from botocore.client import Config
@@ -22,6 +24,8 @@ from corehq.util.metrics import metrics_counter, metrics_histogram_timer
 
 DEFAULT_S3_BUCKET = "blobdb"
 DEFAULT_BULK_DELETE_CHUNKSIZE = 1000
+# get_many() streams larger blobs instead of reading them into memory
+MAX_BUFFERED_BLOB_SIZE = 1024 * 1024
 
 
 class S3BlobDB(AbstractBlobDB):
@@ -107,6 +111,59 @@ class S3BlobDB(AbstractBlobDB):
             content_length, compressed_length = reported_content_length, None
         return BlobStream(body, self, key, content_length, compressed_length)
 
+    def get_many(self, metas, maybe_compressed=False):
+        """Get many blobs concurrently
+
+        Up to `max_pool_connections` blobs are fetched at a time, using
+        the connection pool of the S3 client. The content of each blob
+        is read into memory before it is returned, so that connections
+        are released for other requests. Blobs larger than
+        `MAX_BUFFERED_BLOB_SIZE` are not read into memory; they are
+        returned as streams, like `get()` returns them, as they are
+        reached in `metas`.
+
+        See `AbstractBlobDB.get_many` for parameters.
+        """
+        metas = iter(metas)
+        max_workers = self.db.meta.client.meta.config.max_pool_connections
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = set()
+            while True:
+                # keep the workers busy without fetching more blobs than
+                # the caller has consumed
+                while len(futures) < max_workers * 2:
+                    meta = next(metas, None)
+                    if meta is None:
+                        break
+                    if _should_buffer(meta):
+                        futures.add(executor.submit(self._get_for_many, meta, maybe_compressed))
+                    else:
+                        yield meta, self._get_or_none(meta, maybe_compressed)
+                if not futures:
+                    break
+                done, futures = wait(futures, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield future.result()
+
+    @retry_on_slow_down
+    def _get_for_many(self, meta, maybe_compressed):
+        key = meta.key
+        check_safe_key(key)
+        try:
+            with maybe_not_found(throw=NotFound(key)), self.report_timing('get', key):
+                # boto3 clients are thread safe, resources are not
+                resp = self.db.meta.client.get_object(Bucket=self.s3_bucket_name, Key=key)
+                body = BytesIO(resp["Body"].read())
+        except NotFound:
+            return meta, None
+
+        if meta.is_compressed and not maybe_compressed:
+            content_length, compressed_length = meta.content_length, meta.compressed_length
+            body = GzipFile(key, mode='rb', fileobj=body)
+        else:
+            content_length, compressed_length = resp['ContentLength'], None
+        return meta, BlobStream(body, self, key, content_length, compressed_length)
+
     def size(self, key):
         check_safe_key(key)
         with maybe_not_found(throw=NotFound(key)), self.report_timing('size', key):
@@ -164,6 +221,11 @@ class S3BlobDB(AbstractBlobDB):
         return self.db.Bucket(self.s3_bucket_name)
 
 
+def _should_buffer(meta):
+    size = meta.stored_content_length
+    return size is not None and size <= MAX_BUFFERED_BLOB_SIZE
+
+
 def is_not_found(err, not_found_codes=["NoSuchKey", "NoSuchBucket", "404"]):
     return (err.response["Error"]["Code"] in not_found_codes or
         err.response.get("Errors", {}).get("Error", {}).get("Code") in not_found_codes)
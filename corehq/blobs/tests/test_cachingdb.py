@@ -0,0 +1,156 @@
+import os
+from io import BytesIO
+from shutil import rmtree
+from tempfile import mkdtemp
+
+from django.test import TestCase
+from unittest.mock import patch
+from testil import eq, tempdir
+
+import corehq.blobs.cachingdb as mod
+from corehq.blobs import CODES
+from corehq.blobs.fsdb import FilesystemBlobDB
+from corehq.blobs.tests.test_fsdb import _BlobDBTests
+from corehq.util.metrics.tests.utils import capture_metrics
+
+
+class TestCachingBlobDB(TestCase, _BlobDBTests):
+
+    @classmethod
+    def setUpClass(cls):
+        super(TestCachingBlobDB, cls).setUpClass()
+        cls.rootdir = mkdtemp(prefix="blobdb")
+        cls.cachedir = mkdtemp(prefix="blobcache")
+        cls.fsdb = FilesystemBlobDB(cls.rootdir)
+        cls.db = mod.CachingBlobDB(
+            cls.fsdb,
+            cls.cachedir,
+            max_size=1024 * 1024,
+            type_codes=["tempfile", CODES.form_xml],
+            max_blob_size=100,
+        )
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.db = cls.fsdb = None
+        rmtree(cls.rootdir)
+        rmtree(cls.cachedir)
+        cls.rootdir = cls.cachedir = None
+        super(TestCachingBlobDB, cls).tearDownClass()
+
+    def test_get_from_cache(self):
+        meta = self.db.put(BytesIO(b"content"), meta=self.new_meta())
+        with capture_metrics() as metrics:
+            with self.db.get(meta=meta) as fh:
+                self.assertEqual(fh.read(), b"content")
+            with patch.object(self.fsdb, "get", blow_up):
+                with self.db.get(meta=meta) as fh:
+                    self.assertEqual(fh.content_length, 7)
+                    self.assertIs(fh.blob_db, self.fsdb)
+                    self.assertEqual(fh.read(), b"content")
+        self.assertEqual(metrics.sum('commcare.blobdb.cache', result='miss'), 1)
+        self.assertEqual(metrics.sum('commcare.blobdb.cache', result='hit'), 1)
+
+    def test_get_many_from_cache(self):
+        cached = self.db.put(BytesIO(b"cached"), meta=self.new_meta())
+        with self.db.get(meta=cached):
+            pass
+        not_cached = self.db.put(BytesIO(b"not cached"), meta=self.new_meta())
+        with patch.object(self.fsdb, "get", blow_up):
+            with self.assertRaises(Boom):
+                dict(self.db.get_many([cached, not_cached]))
+        contents = {}
+        for meta, content in self.db.get_many([cached, not_cached]):
+            with content:
+                contents[meta.key] = content.read()
+        self.assertEqual(contents, {cached.key: b"cached", not_cached.key: b"not cached"})
+        with patch.object(self.fsdb, "get", blow_up):
+            self.assertEqual(len(list(self.db.get_many([cached, not_cached]))), 2)
+
+    def test_get_empty_blob(self):
+        meta = self.db.put(BytesIO(b""), meta=self.new_meta())
+        for __ in range(2):
+            with self.db.get(meta=meta) as fh:
+                self.assertEqual(fh.read(), b"")
+
+    def test_put_replaces_cached_blob(self):
+        meta = self.db.put(BytesIO(b"bing"), meta=self.new_meta())
+        with self.db.get(meta=meta) as fh:
+            self.assertEqual(fh.read(), b"bing")
+        self.db.put(BytesIO(b"bang"), meta=meta)
+        with self.db.get(meta=meta) as fh:
+            self.assertEqual(fh.read(), b"bang")
+
+    def test_uncached_type_code(self):
+        meta = self.db.put(BytesIO(b"content"), meta=self.new_meta(type_code=CODES.data_export))
+        with self.db.get(meta=meta) as fh:
+            self.assertEqual(fh.read(), b"content")
+        with patch.object(self.fsdb, "get", blow_up), self.assertRaises(Boom):
+            self.db.get(meta=meta)
+
+    def test_large_blob_is_not_cached(self):
+        meta = self.db.put(BytesIO(b"x" * 101), meta=self.new_meta())
+        with self.db.get(meta=meta) as fh:
+            self.assertEqual(fh.read(), b"x" * 101)
+        with patch.object(self.fsdb, "get", blow_up), self.assertRaises(Boom):
+            self.db.get(meta=meta)
+
+    def test_backend_attributes(self):
+        self.assertEqual(self.db.rootdir, self.rootdir)
+
+
+class TestCachingBlobDBCompressed(TestCachingBlobDB):
+    meta_kwargs = {'compressed_length': -1}
+
+    def test_get_by_key_is_cached_separately(self):
+        meta = self.db.put(BytesIO(b"content"), meta=self.new_meta())
+        with self.db.get(meta=meta) as fh:
+            self.assertEqual(fh.read(), b"content")
+        with self.db.get(key=meta.key, type_code=CODES.tempfile) as fh:
+            self.assertNotEqual(fh.read(), b"content")  # compressed
+
+
+def test_evict_least_recently_read():
+    with tempdir() as tmp:
+        cache = mod.DiskLRUCache(tmp, max_size=100)
+        for i, name in enumerate(["aa1", "bb2", "cc3"]):
+            with patch.object(cache, "evict"):
+                cache.fill(name, BytesIO(b"x" * 40))
+            path = cache._get_path(name)
+            os.utime(path, (1000 + i, 1000 + i))
+        cache.open("aa1")  # read aa1 most recently
+
+        cache.evict()
+
+        eq(cache.open("bb2"), None)
+        eq(cache.open("cc3")[1], 40)
+        eq(cache.open("aa1")[1], 40)
+
+
+def test_evict_after_fills():
+    with tempdir() as tmp:
+        cache = mod.DiskLRUCache(tmp, max_size=mod.EVICTION_CHECK_RATIO * 10)
+        with patch.object(cache, "evict") as evict:
+            cache.fill("aa1", BytesIO(b"x" * 5))  # first fill checks the size
+            eq(evict.call_count, 1)
+            cache.fill("aa2", BytesIO(b"x" * 5))
+            eq(evict.call_count, 1)
+            cache.fill("aa3", BytesIO(b"x" * 5))
+            eq(evict.call_count, 2)
+
+
+def test_discard():
+    with tempdir() as tmp:
+        cache = mod.DiskLRUCache(tmp, max_size=100)
+        cache.fill("aa1", BytesIO(b"content"))
+        cache.discard("aa1")
+        cache.discard("aa1")  # should not raise error
+        eq(cache.open("aa1"), None)
+
+
+def blow_up(*args, **kw):
+    raise Boom("should not be called")
+
+
+class Boom(Exception):
+    pass
@@ -74,6 +74,36 @@ class _BlobDBTests(object):
         with self.db.get(meta=new) as fh:
             self.assertEqual(fh.read(), b"content")
 
+    def test_get_many(self):
+        metas = [
+            self.db.put(BytesIO("content-{}".format(i).encode('utf-8')), meta=self.new_meta())
+            for i in range(3)
+        ]
+        missing = self.new_meta()
+        contents = {}
+        for meta, content in self.db.get_many(metas + [missing]):
+            if content is None:
+                contents[meta.key] = None
+                continue
+            with content:
+                self.assertEqual(content.content_length, meta.content_length)
+                contents[meta.key] = content.read()
+        self.assertEqual(contents, {
+            metas[0].key: b"content-0",
+            metas[1].key: b"content-1",
+            metas[2].key: b"content-2",
+            missing.key: None,
+        })
+
+    def test_get_many_maybe_compressed(self):
+        meta = self.db.put(BytesIO(b"content"), meta=self.new_meta())
+        with self.db.get(meta.key, CODES.maybe_compressed) as fh:
+            stored = fh.read()
+        [(result_meta, content)] = self.db.get_many([meta], maybe_compressed=True)
+        with content:
+            self.assertEqual(content.read(), stored)
+        self.assertIs(result_meta, meta)
+
     def test_exists(self):
         meta = self.db.put(BytesIO(b"content"), meta=self.new_meta())
         self.assertTrue(self.db.exists(key=meta.key), 'not found')
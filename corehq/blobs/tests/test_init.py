@@ -34,3 +34,17 @@ def test_get_blobdb(self, msg, root=True, blob_dir=None):
             with override_settings(SHARED_DRIVE_CONF=conf, S3_BLOB_DB_SETTINGS=None):
                 with assert_raises(mod.Error, msg=re.compile(msg)):
                     mod.get_blob_db()
+
+
+def test_get_caching_blobdb():
+    from corehq.blobs.cachingdb import CachingBlobDB
+    from corehq.blobs.fsdb import FilesystemBlobDB
+    with tempdir() as tmp:
+        s3db = FilesystemBlobDB(tmp)
+        cache = {"path": join(tmp, "cache"), "max_size": 1024, "type_codes": ["form_xml"]}
+        with patch("corehq.blobs._db", new=[]), patch("corehq.blobs._get_s3_db", return_value=s3db):
+            with override_settings(BLOB_DB_CACHE=cache):
+                db = mod.get_blob_db()
+    assert isinstance(db, CachingBlobDB), db
+    assert db.backend_db is s3db, db.backend_db
+    assert db.type_codes == {mod.CODES.form_xml}, db.type_codes
@@ -51,6 +51,15 @@ class TestMigratingBlobDB(get_base_class()):
         with self.assertRaises(mod.NotFound):
             self.db.get(meta=meta)
 
+    def test_get_many_falls_back_to_fsdb(self):
+        s3_meta = self.s3db.put(BytesIO(b"s3 content"), meta=new_meta())
+        fs_meta = self.fsdb.put(BytesIO(b"fs content"), meta=new_meta())
+        contents = {}
+        for meta, content in self.db.get_many([s3_meta, fs_meta]):
+            with content:
+                contents[meta.key] = content.read()
+        self.assertEqual(contents, {s3_meta.key: b"s3 content", fs_meta.key: b"fs content"})
+
     def assertEndsWith(self, a, b):
         assert a.endswith(b), (a, b)
 
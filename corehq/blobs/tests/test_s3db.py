@@ -60,7 +60,9 @@ Finally, add the following to `localsettings.py`:
         }
 
 """  # noqa: W605
+import os
 from io import BytesIO, SEEK_SET, TextIOWrapper
+from unittest.mock import patch
 
 from django.conf import settings
 from django.test import TestCase
@@ -97,6 +99,19 @@ class TestS3BlobDB(TestCase, _BlobDBTests):
         with db2.get(meta=meta2) as blob2:
             self.assertEqual(blob2.read(), b"content")
 
+    def test_get_many_streams_large_blobs(self):
+        small = self.db.put(BytesIO(b"small"), meta=self.new_meta())
+        large_content = os.urandom(500)  # too random to compress
+        large = self.db.put(BytesIO(large_content), meta=self.new_meta())
+        with patch("corehq.blobs.s3db.MAX_BUFFERED_BLOB_SIZE", 100), \
+                patch.object(self.db, "_get_for_many", wraps=self.db._get_for_many) as get_for_many:
+            contents = {}
+            for meta, content in self.db.get_many([large, small]):
+                with content:
+                    contents[meta.key] = content.read()
+        self.assertEqual(contents, {small.key: b"small", large.key: large_content})
+        self.assertEqual([c.args[0].key for c in get_for_many.call_args_list], [small.key])
+
 
 class TestS3BlobDBCompressed(TestS3BlobDB):
     meta_kwargs = {'compressed_length': -1}
@@ -1,10 +1,7 @@
 import hashlib
-import binascii
-from copy import copy
+from itertools import chain
 import six
 from six.moves import zip
-from functools import reduce
-from six.moves import map
 
 
 EMPTY_HASH = ""
@@ -30,6 +27,67 @@ class CaseStateHash(object):
     __hash__ = None
 
 
+class IncrementalChecksum(object):
+    """Order independent checksum of a set of ids that can be updated in place
+
+    MD5 digests are combined as 128-bit integers with XOR, so removing
+    an id is the same operation as adding it. The result is the same as
+    `Checksum(ids).hexdigest()`.
+
+    >>> c = IncrementalChecksum()
+    >>> c.update(['abc123', '123abc', 'xyz'])
+    >>> c.update([], removed=['xyz'])
+    >>> c.hexdigest()
+    '409c5c597fa2c2a693b769f0d2ad432b'
+    >>> c.count
+    2
+    """
+
+    def __init__(self, value=0, count=0):
+        self.value = value
+        self.count = count
+
+    @classmethod
+    def from_ids(cls, ids):
+        ids = list(ids)
+        return cls(cls.digest_ids(ids), len(ids))
+
+    @classmethod
+    def from_hexdigest(cls, hexdigest, count):
+        return cls(int(hexdigest, 16) if hexdigest else 0, count)
+
+    @staticmethod
+    def digest_ids(ids):
+        """Get the XOR of the MD5 digests of `ids` as an integer"""
+        from_bytes = int.from_bytes
+        md5 = hashlib.md5
+        value = 0
+        for id in ids:
+            if isinstance(id, six.text_type):
+                id = id.encode('utf-8')
+            value ^= from_bytes(md5(id).digest(), 'big')
+        return value
+
+    def update(self, added, removed=()):
+        """Update checksum with changes to the set of ids
+
+        :param added: Ids that were not previously included.
+        :param removed: Ids that were previously included.
+        """
+        added = list(added)
+        removed = list(removed)
+        self.value ^= self.digest_ids(chain(added, removed))
+        self.count += len(added) - len(removed)
+
+    def copy(self):
+        return IncrementalChecksum(self.value, self.count)
+
+    def hexdigest(self):
+        if not self.count:
+            return EMPTY_HASH
+        return '%032x' % self.value
+
+
 class Checksum(object):
     """
     >>> Checksum(['abc123', '123abc']).hexdigest()
@@ -69,8 +127,4 @@ class Checksum(object):
     def hexdigest(self):
         if not self._list:
             return EMPTY_HASH
-        x = copy(self._list)
-        x = list(map(Checksum.hash, x))
-        x = reduce(Checksum.xor, x)
-        x = binascii.hexlify(bytes(x)).decode('utf-8')
-        return x
+        return '%032x' % IncrementalChecksum.digest_ids(self._list)
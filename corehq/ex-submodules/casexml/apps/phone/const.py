@@ -18,3 +18,8 @@ RESTORE_CACHE_KEY_PREFIX = "ota-restore"
 
 # case sync algorithms
 LIVEQUERY = 'livequery'
+
+# pipelined livequery restore: number of case batches fetched ahead of
+# serialization, and number of threads serializing case XML
+LIVEQUERY_PREFETCH_BATCHES = 2
+LIVEQUERY_SERIALIZATION_WORKERS = 4
@@ -0,0 +1,129 @@
+"""Persisted live case closure index for livequery restores
+
+Computing the set of live cases for a restore user walks the case graph
+outward from the owned cases one level of indices at a time. The result
+only changes when a case in the walked graph changes, so it is stored
+in redis keyed by domain and owner ids, along with:
+
+- a generation counter, which is incremented by
+  :py:class:`corehq.pillows.case.CaseClosureIndexProcessor` whenever a
+  case in the closure (or a case indexing one) changes, or when a case
+  owned by one of the owners changes.
+- the set of owned open case ids it was computed from. This is compared
+  with the owned ids queried at restore time, which guards against
+  change feed lag for the most common change: cases being created or
+  closed by the restore user.
+
+A closure is only used while its generation matches the current
+generation, otherwise the graph is walked again and the closure is
+replaced. Incremental syncs for users whose cases have not changed
+since the last sync therefore skip the index walk entirely.
+"""
+import hashlib
+import pickle
+from collections import defaultdict
+
+from django_redis import get_redis_connection
+
+CLOSURE_TIMEOUT = 7 * 24 * 60 * 60  # 1 week
+KEY_PREFIX = "livequery-closure"
+
+
+class CaseClosureIndex:
+
+    def __init__(self, domain, owner_ids):
+        self.domain = domain
+        self.owner_ids = sorted(owner_ids)
+        owners_hash = hashlib.md5(",".join(self.owner_ids).encode("utf-8")).hexdigest()
+        self.key = f"{KEY_PREFIX}:{domain}:{owners_hash}"
+        self.client = get_redis_connection()
+
+    @property
+    def generation_key(self):
+        return generation_key(self.key)
+
+    def get_generation(self):
+        return int(self.client.get(self.generation_key) or 0)
+
+    def get(self, owned_ids, generation):
+        """Get live case ids and indices if the stored closure is current
+
+        :param owned_ids: Owned open case ids queried for this restore.
+        :param generation: Result of `get_generation()` obtained before
+        the owned case ids were queried.
+        :returns: A tuple `(live_ids, indices)` or `None`.
+        """
+        value = self.client.get(self.key)
+        if value is None:
+            return None
+        closure = pickle.loads(value)
+        if closure["generation"] != generation or closure["owned_ids"] != set(owned_ids):
+            return None
+        return closure["live_ids"], defaultdict(list, closure["indices"])
+
+    def set(self, owned_ids, walked_ids, live_ids, indices, generation):
+        """Store a closure and register it for invalidation
+
+        :param walked_ids: All case ids visited while walking the case
+        graph. A change to any of these (or a new index referencing one
+        of them) invalidates the closure.
+        :param generation: Result of `get_generation()` obtained before
+        the case graph was walked. If the generation has been
+        incremented in the mean time the closure is stored but will
+        never be used.
+        """
+        closure = {
+            "generation": generation,
+            "owned_ids": set(owned_ids),
+            "live_ids": live_ids,
+            "indices": dict(indices),
+        }
+        pipe = self.client.pipeline(transaction=False)
+        for case_id in walked_ids:
+            case_key = case_closures_key(self.domain, case_id)
+            pipe.sadd(case_key, self.key)
+            pipe.expire(case_key, CLOSURE_TIMEOUT)
+        for owner_id in self.owner_ids:
+            owner_key = owner_closures_key(self.domain, owner_id)
+            pipe.sadd(owner_key, self.key)
+            pipe.expire(owner_key, CLOSURE_TIMEOUT)
+        # the generation must not expire before the closure, otherwise
+        # it could be reset and count back up to the stored value
+        pipe.set(self.generation_key, generation, ex=CLOSURE_TIMEOUT, nx=True)
+        pipe.expire(self.generation_key, CLOSURE_TIMEOUT)
+        pipe.set(self.key, pickle.dumps(closure, pickle.HIGHEST_PROTOCOL), ex=CLOSURE_TIMEOUT)
+        pipe.execute()
+
+
+def invalidate_case_closures(domain, case_ids, owner_ids):
+    """Invalidate closures affected by changes to the given cases
+
+    :param case_ids: Ids of changed cases and the cases they reference.
+    :param owner_ids: Owners of the changed cases.
+    """
+    client = get_redis_connection()
+    keys = [case_closures_key(domain, case_id) for case_id in case_ids]
+    keys.extend(owner_closures_key(domain, owner_id) for owner_id in owner_ids)
+    if not keys:
+        return
+    closure_keys = client.sunion(keys)
+    if not closure_keys:
+        return
+    pipe = client.pipeline(transaction=False)
+    for closure_key in closure_keys:
+        gen_key = generation_key(closure_key.decode("utf-8"))
+        pipe.incr(gen_key)
+        pipe.expire(gen_key, CLOSURE_TIMEOUT)
+    pipe.execute()
+
+
+def generation_key(closure_key):
+    return f"{closure_key}:generation"
+
+
+def case_closures_key(domain, case_id):
+    return f"{KEY_PREFIX}:case:{domain}:{case_id}"
+
+
+def owner_closures_key(domain, owner_id):
+    return f"{KEY_PREFIX}:owner:{domain}:{owner_id}"
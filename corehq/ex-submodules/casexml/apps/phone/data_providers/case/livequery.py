@@ -22,21 +22,40 @@ Example case graphs with outcomes:
    a(closed) <--ext-- b <--chi-- c(owned) >> []
 """
 import logging
-from collections import defaultdict
+import queue
+import threading
+from collections import defaultdict, deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
 from functools import partial, wraps
 from itertools import chain, islice
 
+from django.db import connections
+
 from casexml.apps.case.const import CASE_INDEX_EXTENSION as EXTENSION
-from casexml.apps.phone.const import ASYNC_RETRY_AFTER
+from casexml.apps.phone.const import (
+    ASYNC_RETRY_AFTER,
+    LIVEQUERY_PREFETCH_BATCHES,
+    LIVEQUERY_SERIALIZATION_WORKERS,
+)
 from casexml.apps.phone.tasks import ASYNC_RESTORE_SENT
 
 from corehq.form_processor.models import CommCareCase, CommCareCaseIndex
-from corehq.sql_db.routers import read_from_plproxy_standbys
-from corehq.toggles import LIVEQUERY_READ_FROM_STANDBYS, NAMESPACE_USER
+from corehq.sql_db.routers import (
+    allow_read_from_plproxy_standby,
+    read_from_plproxy_standbys,
+)
+from corehq.toggles import (
+    LIVEQUERY_CLOSURE_INDEX,
+    LIVEQUERY_PIPELINED_RESTORE,
+    LIVEQUERY_READ_FROM_STANDBYS,
+    NAMESPACE_USER,
+)
 from corehq.util.metrics import metrics_counter, metrics_histogram
 from corehq.util.metrics.load_counters import case_load_counter
 from corehq.util.timer import TimingContext
 
+from .closure import CaseClosureIndex
 from .load_testing import get_xml_for_response
 from .stock import get_stock_payload
 from .utils import get_case_sync_updates
@@ -69,12 +88,23 @@ def do_livequery(timing_context, restore_state, response, async_task=None):
 
     debug("sync %s for %r", restore_state.current_sync_log._id, owner_ids)
     with timing_context("livequery"):
+        if LIVEQUERY_CLOSURE_INDEX.enabled(domain):
+            closure_index = CaseClosureIndex(domain, owner_ids)
+            # get generation before querying so concurrent changes invalidate the result
+            generation = closure_index.get_generation()
+        else:
+            closure_index = None
+
         with timing_context("get_case_ids_by_owners"):
             owned_ids = CommCareCase.objects.get_case_ids_in_domain_by_owners(
                 domain, owner_ids, closed=False)
             debug("owned: %r", owned_ids)
 
-        live_ids, indices = get_live_case_ids_and_indices(domain, owned_ids, timing_context)
+        if closure_index is not None:
+            live_ids, indices = get_indexed_live_case_ids_and_indices(
+                closure_index, generation, owned_ids, timing_context)
+        else:
+            live_ids, indices = get_live_case_ids_and_indices(domain, owned_ids, timing_context)
 
         if restore_state.last_sync_log:
             with timing_context("discard_already_synced_cases"):
@@ -85,8 +115,9 @@ def do_livequery(timing_context, restore_state, response, async_task=None):
 
         dependent_ids = live_ids - set(owned_ids)
         debug('updating synclog: live=%r dependent=%r', live_ids, dependent_ids)
-        restore_state.current_sync_log.case_ids_on_phone = live_ids
-        restore_state.current_sync_log.dependent_case_ids_on_phone = dependent_ids
+        with timing_context("update_case_ids_checksum"):
+            restore_state.current_sync_log.set_case_ids_on_phone(
+                live_ids, dependent_ids, restore_state.last_sync_log)
 
         total_cases = len(sync_ids)
         with timing_context("compile_response(%s cases)" % total_cases):
@@ -102,11 +133,17 @@ def do_livequery(timing_context, restore_state, response, async_task=None):
                 }
             )
             metrics_counter('commcare.restore.case_load.count', total_cases, {'domain': domain})
-            compile_response(
+            if LIVEQUERY_PIPELINED_RESTORE.enabled(domain):
+                batches = prefetch_batches(batch_cases(iaccessor, sync_ids))
+                compile = partial(compile_response_pipelined, workers=LIVEQUERY_SERIALIZATION_WORKERS)
+            else:
+                batches = batch_cases(iaccessor, sync_ids)
+                compile = compile_response
+            compile(
                 timing_context,
                 restore_state,
                 response,
-                batch_cases(iaccessor, sync_ids),
+                batches,
                 init_progress(async_task, total_cases),
                 total_cases,
             )
@@ -130,7 +167,35 @@ def get_all_related_live_cases(domain, case_ids):
     return new_cases
 
 
-def get_live_case_ids_and_indices(domain, owned_ids, timing_context):
+def get_indexed_live_case_ids_and_indices(closure_index, generation, owned_ids, timing_context):
+    """Get live case ids and indices from the closure index
+
+    The case graph is only walked if the stored closure is missing or
+    has been invalidated since it was stored.
+    """
+    with timing_context("get_case_closure"):
+        result = closure_index.get(owned_ids, generation)
+    metrics_counter('commcare.restore.case_closure_index', tags={
+        'domain': closure_index.domain,
+        'result': 'miss' if result is None else 'hit',
+    })
+    if result is not None:
+        return result
+
+    walked_ids = set()
+    live_ids, indices = get_live_case_ids_and_indices(
+        closure_index.domain, owned_ids, timing_context, walked_ids)
+    with timing_context("set_case_closure"):
+        closure_index.set(owned_ids, walked_ids, live_ids, indices, generation)
+    return live_ids, indices
+
+
+def get_live_case_ids_and_indices(domain, owned_ids, timing_context, walked_ids=None):
+    """Get live case ids and indices by walking the case graph
+
+    :param walked_ids: Optional set, which will be updated with all case
+    ids visited while walking the graph.
+    """
     def index_key(index):
         return '{} {}'.format(index.case_id, index.identifier)
 
@@ -323,6 +388,8 @@ def get_live_case_ids_and_indices(domain, owned_ids, timing_context):
                 enliven(case_id)
 
         debug('live: %r', live_ids)
+    if walked_ids is not None:
+        walked_ids.update(all_ids)
     return live_ids, indices
 
 
@@ -371,6 +438,54 @@ def batch_cases(accessor, case_ids):
         yield accessor.get_cases(next_ids)
 
 
+def prefetch_batches(batches, size=LIVEQUERY_PREFETCH_BATCHES):
+    """Iterate over `batches` while up to `size` batches ahead are fetched
+
+    Batches are produced on a background thread with its own database
+    connections, so the next database fetch overlaps with processing of
+    the current batch. Order is preserved.
+    """
+    done = object()
+    stop = threading.Event()
+    buffer = queue.Queue(maxsize=size)
+    use_standbys = allow_read_from_plproxy_standby()
+
+    def put(item):
+        while not stop.is_set():
+            try:
+                buffer.put(item, timeout=1)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def produce():
+        try:
+            with (read_from_plproxy_standbys() if use_standbys else nullcontext()):
+                for batch in batches:
+                    if not put((batch, None)):
+                        return
+            put((done, None))
+        except BaseException as err:
+            put((None, err))
+        finally:
+            connections.close_all()
+
+    thread = threading.Thread(target=produce, name="livequery-prefetch", daemon=True)
+    thread.start()
+    try:
+        while True:
+            item, error = buffer.get()
+            if error is not None:
+                raise error
+            if item is done:
+                break
+            yield item
+    finally:
+        stop.set()
+        thread.join()
+
+
 def init_progress(async_task, total):
     if not async_task:
         return lambda done: None
@@ -422,4 +537,68 @@ def compile_response(
         update_progress(done)
 
 
+def compile_response_pipelined(
+    timing_context,
+    restore_state,
+    response,
+    batches,
+    update_progress,
+    total_cases,
+    workers,
+):
+    """Like `compile_response`, but case XML is serialized on a pool of workers
+
+    Stock payloads are built on the calling thread while the case XML
+    for the same and preceding batches is built by the workers. Both
+    query the database (case XML may need case attachments), so the
+    workers read from the same databases as the calling thread, and
+    close their connections after each batch. Elements are written to
+    `response` in batch order, so the payload is identical to
+    `compile_response`.
+    """
+    done = 0
+    pending = deque()
+    use_standbys = allow_read_from_plproxy_standby()
+
+    def get_elements(cases):
+        try:
+            with (read_from_plproxy_standbys() if use_standbys else nullcontext()):
+                return get_case_xml_elements(restore_state, cases, total_cases)
+        finally:
+            connections.close_all()
+
+    def write_oldest():
+        nonlocal done
+        cases, stock_elements, future = pending.popleft()
+        response.extend(stock_elements)
+        with timing_context("wait_for_case_xml (%s cases)" % len(cases)):
+            elements = future.result()
+        response.extend(elements)
+        done += len(cases)
+        update_progress(done)
+
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="livequery-xml") as pool:
+        for cases in batches:
+            future = pool.submit(get_elements, cases)
+            with timing_context("get_stock_payload"):
+                stock_elements = list(get_stock_payload(
+                    restore_state.project,
+                    restore_state.stock_settings,
+                    cases,
+                ))
+            pending.append((cases, stock_elements, future))
+            while len(pending) > workers:
+                write_oldest()
+        while pending:
+            write_oldest()
+
+
+def get_case_xml_elements(restore_state, cases, total_cases):
+    updates = get_case_sync_updates(restore_state.domain, cases, restore_state.last_sync_log)
+    return [
+        item for update in updates
+        for item in get_xml_for_response(update, restore_state, total_cases)
+    ]
+
+
 RESTORE_CASE_LOAD_BUCKETS = [100, 200, 500, 1000, 2000, 5000, 10000, 20000, 50000, 100000, 200000, 500000, 1000000]
@@ -25,5 +25,6 @@ class Command(BaseCommand):
         for synclog in synclogs_sql:
             doc = properly_wrap_sync_log(synclog.doc)
             doc.case_ids_on_phone = {'broken to force 412'}
+            doc.case_ids_checksum = None
             synclog.doc = doc.to_json()
         bulk_update_helper(synclogs_sql)
@@ -15,7 +15,11 @@ from memoized import memoized
 
 from casexml.apps.case import const
 from casexml.apps.phone.change_publishers import publish_synclog_saved
-from casexml.apps.phone.checksum import CaseStateHash, Checksum
+from casexml.apps.phone.checksum import (
+    CaseStateHash,
+    Checksum,
+    IncrementalChecksum,
+)
 from casexml.apps.phone.exceptions import (
     IncompatibleSyncLogType,
     MissingSyncLog,
@@ -602,6 +606,10 @@ class SimplifiedSyncLog(AbstractSyncLog):
     extensions_checked = BooleanProperty(default=False)
     device_id = StringProperty()
     auth_type = StringProperty()
+    # checksum of case_ids_on_phone maintained as case ids are added and
+    # removed, along with the number of ids it was computed from
+    case_ids_checksum = StringProperty()
+    case_ids_checksum_count = IntegerProperty()
 
     _purged_cases = None
 
@@ -627,6 +635,60 @@ class SimplifiedSyncLog(AbstractSyncLog):
     def get_footprint_of_cases_on_phone(self):
         return list(self.case_ids_on_phone)
 
+    def get_state_hash(self):
+        checksum = self._get_case_ids_checksum()
+        if checksum is None:
+            checksum = IncrementalChecksum.from_ids(self.case_ids_on_phone)
+        return CaseStateHash(checksum.hexdigest())
+
+    def set_case_ids_on_phone(self, case_ids, dependent_case_ids, previous_log=None):
+        """Replace the set of case ids on the phone and update the checksum
+
+        If `previous_log` has a checksum it is updated with the
+        difference between its case ids and `case_ids` rather than
+        being computed from scratch.
+        """
+        checksum = previous_log._get_case_ids_checksum() if previous_log is not None else None
+        if checksum is None:
+            checksum = IncrementalChecksum.from_ids(case_ids)
+        else:
+            previous_ids = previous_log.case_ids_on_phone
+            checksum = checksum.copy()
+            checksum.update(case_ids - previous_ids, removed=previous_ids - case_ids)
+        self.case_ids_on_phone = case_ids
+        self.dependent_case_ids_on_phone = dependent_case_ids
+        self._set_case_ids_checksum(checksum)
+
+    def _get_case_ids_checksum(self):
+        """Get the stored checksum of case ids on the phone
+
+        :returns: `IncrementalChecksum` or `None` if there is no checksum
+        or it is out of sync with `case_ids_on_phone`.
+        """
+        if self.case_ids_checksum is None or self.case_ids_checksum_count != len(self.case_ids_on_phone):
+            return None
+        return IncrementalChecksum.from_hexdigest(self.case_ids_checksum, self.case_ids_checksum_count)
+
+    def _set_case_ids_checksum(self, checksum):
+        self.case_ids_checksum = '%032x' % checksum.value
+        self.case_ids_checksum_count = checksum.count
+
+    def _add_case_id_on_phone(self, case_id):
+        if case_id in self.case_ids_on_phone:
+            return
+        checksum = self._get_case_ids_checksum()
+        self.case_ids_on_phone.add(case_id)
+        if checksum is not None:
+            checksum.update([case_id])
+            self._set_case_ids_checksum(checksum)
+
+    def _remove_case_id_on_phone(self, case_id):
+        checksum = self._get_case_ids_checksum()
+        self.case_ids_on_phone.remove(case_id)
+        if checksum is not None:
+            checksum.update([], removed=[case_id])
+            self._set_case_ids_checksum(checksum)
+
     @property
     def primary_case_ids(self):
         return self.case_ids_on_phone - self.dependent_case_ids_on_phone
@@ -765,7 +827,7 @@ class SimplifiedSyncLog(AbstractSyncLog):
         deleted_indices.update(self.extension_index_tree.indices.pop(to_remove, {}))
 
         try:
-            self.case_ids_on_phone.remove(to_remove)
+            self._remove_case_id_on_phone(to_remove)
         except KeyError:
             should_fail_softly = not xform_id or _domain_has_legacy_toggle_set()
             if should_fail_softly:
@@ -786,7 +848,7 @@ class SimplifiedSyncLog(AbstractSyncLog):
             self.dependent_case_ids_on_phone.remove(to_remove)
 
     def _add_primary_case(self, case_id):
-        self.case_ids_on_phone.add(case_id)
+        self._add_case_id_on_phone(case_id)
         if case_id in self.dependent_case_ids_on_phone:
             self.dependent_case_ids_on_phone.remove(case_id)
 
@@ -923,7 +985,7 @@ class SimplifiedSyncLog(AbstractSyncLog):
             )
             if is_dependent:
                 _get_logger().debug('adding dependent case %s', case_id)
-                self.case_ids_on_phone.add(case_id)
+                self._add_case_id_on_phone(case_id)
                 self.dependent_case_ids_on_phone.add(case_id)
 
                 for update in non_live_updates_by_case_id[case_id]:
@@ -935,7 +997,7 @@ class SimplifiedSyncLog(AbstractSyncLog):
             for update in non_live_updates_by_case_id[case_id]:
                 if update.has_extension_indices_to_add():
                     # non-live cases with extension indices should be added and processed
-                    self.case_ids_on_phone.add(update.case_id)
+                    self._add_case_id_on_phone(update.case_id)
                     for index in update.indices_to_add:
                         self._add_index(index, update)
                     made_changes = True
@@ -32,7 +32,10 @@ from corehq.apps.domain.models import Domain
 from corehq.blobs import CODES, get_blob_db
 from corehq.blobs.exceptions import NotFound
 from corehq.const import LOADTEST_HARD_LIMIT
-from corehq.toggles import EXTENSION_CASES_SYNC_ENABLED
+from corehq.toggles import (
+    EXTENSION_CASES_SYNC_ENABLED,
+    SINGLE_PASS_RESTORE_CONTENT,
+)
 from corehq.util.metrics import metrics_counter, metrics_histogram
 from corehq.util.timer import TimingContext
 
@@ -105,24 +108,41 @@ class StockSettings(object):
 
 
 class RestoreContent(object):
-    start_tag_template = (
-        b'<OpenRosaResponse xmlns="http://openrosa.org/http/response"%(items)s>'
+    """Accumulates restore payload elements and renders the full response
+
+    By default elements are buffered in a temporary file and copied into
+    a second file by `get_fileobj()` once the item count is known. With
+    `single_pass=True` the opening tag is written up front with a
+    fixed-width `items` attribute slot that is patched in place when the
+    content is finalized, so the payload is only written to disk once.
+    """
+    start_tag_prefix = b'<OpenRosaResponse xmlns="http://openrosa.org/http/response"'
+    start_tag_suffix = b'>'
+    message_template = (
         b'<message nature="%(nature)s">Successfully restored account %(username)s!</message>'
     )
     items_template = b' items="%s"'
+    # wide enough for ' items="9999999999"'; unused space is padded with
+    # whitespace, which is insignificant between attributes
+    items_slot_width = len(items_template % (b'9' * 10))
     closing_tag = b'</OpenRosaResponse>'
 
-    def __init__(self, username=None, items=False):
+    def __init__(self, username=None, items=False, single_pass=False):
         self.username = username
         self.items = items
+        self.single_pass = single_pass
         self.num_items = 0
+        self._items_slot_offset = None
 
     def __enter__(self):
         self.response_body = tempfile.TemporaryFile('w+b')
+        if self.single_pass:
+            self._write_start_tag(self.response_body)
         return self
 
     def __exit__(self, exc_type, exc_val, exc_tb):
-        self.response_body.close()
+        if self.response_body is not None:
+            self.response_body.close()
 
     def append(self, xml_element):
         self.num_items += 1
@@ -137,21 +157,54 @@ class RestoreContent(object):
         for element in iterable:
             self.append(element)
 
-    def _write_to_file(self, fileobj):
+    def _get_items_attribute(self):
         # Add 1 to num_items to account for message element
-        items = (self.items_template % ('%s' % (self.num_items + 1)).encode('utf-8')) if self.items else b''
-        fileobj.write(self.start_tag_template % {
-            b"items": items,
+        return self.items_template % ('%s' % (self.num_items + 1)).encode('utf-8')
+
+    def _get_message(self):
+        return self.message_template % {
             b"username": self.username.encode("utf8"),
             b"nature": ResponseNature.OTA_RESTORE_SUCCESS.encode("utf8"),
-        })
+        }
+
+    def _write_start_tag(self, fileobj):
+        fileobj.write(self.start_tag_prefix)
+        if self.items:
+            self._items_slot_offset = fileobj.tell()
+            fileobj.write(b' ' * self.items_slot_width)
+        fileobj.write(self.start_tag_suffix)
+        fileobj.write(self._get_message())
+
+    def _write_to_file(self, fileobj):
+        items = self._get_items_attribute() if self.items else b''
+        fileobj.write(self.start_tag_prefix + items + self.start_tag_suffix)
+        fileobj.write(self._get_message())
 
         self.response_body.seek(0)
         shutil.copyfileobj(self.response_body, fileobj)
 
         fileobj.write(self.closing_tag)
 
+    def _finalize(self):
+        """Complete the single pass payload and return its file object
+
+        Ownership of the file is transferred to the caller.
+        """
+        fileobj = self.response_body
+        fileobj.write(self.closing_tag)
+        if self.items:
+            items = self._get_items_attribute()
+            if len(items) > self.items_slot_width:
+                raise RestoreException("Too many items in restore payload: {}".format(self.num_items))
+            fileobj.seek(self._items_slot_offset)
+            fileobj.write(items.ljust(self.items_slot_width))
+        fileobj.seek(0)
+        self.response_body = None
+        return fileobj
+
     def get_fileobj(self):
+        if self.single_pass:
+            return self._finalize()
         fileobj = tempfile.TemporaryFile('w+b')
         try:
             self._write_to_file(fileobj)
@@ -726,7 +779,8 @@ class RestoreConfig(object):
         """
         username = self.restore_user.username
         count_items = self.params.include_item_count
-        with RestoreContent(username, count_items) as content:
+        single_pass = SINGLE_PASS_RESTORE_CONTENT.enabled(self.domain)
+        with RestoreContent(username, count_items, single_pass=single_pass) as content:
             with self.timing_context('SyncElementProvider'):
                 content.append(get_sync_element(self.restore_state.current_sync_log._id))
 
@@ -0,0 +1,61 @@
+from django.test import SimpleTestCase
+
+from casexml.apps.phone.data_providers.case.closure import (
+    CaseClosureIndex,
+    invalidate_case_closures,
+)
+from corehq.tests.pytest_plugins.reusedb import clear_redis
+
+
+class CaseClosureIndexTest(SimpleTestCase):
+    domain = 'closure-index-test'
+
+    def setUp(self):
+        self.addCleanup(clear_redis)
+        self.index = CaseClosureIndex(self.domain, ['owner-b', 'owner-a'])
+        generation = self.index.get_generation()
+        self.index.set(
+            owned_ids=['a'],
+            walked_ids={'a', 'host'},
+            live_ids={'a', 'host'},
+            indices={'a': ['a-host-index']},
+            generation=generation,
+        )
+
+    def get(self, owned_ids=('a',)):
+        return self.index.get(list(owned_ids), self.index.get_generation())
+
+    def test_get(self):
+        live_ids, indices = self.get()
+        self.assertEqual(live_ids, {'a', 'host'})
+        self.assertEqual(indices['a'], ['a-host-index'])
+        self.assertEqual(indices['missing'], [])
+
+    def test_owner_order_is_irrelevant(self):
+        index = CaseClosureIndex(self.domain, ['owner-a', 'owner-b'])
+        self.assertEqual(index.key, self.index.key)
+
+    def test_owned_ids_changed(self):
+        self.assertIsNone(self.get(owned_ids=['a', 'new']))
+
+    def test_walked_case_changed(self):
+        invalidate_case_closures(self.domain, ['host'], [])
+        self.assertIsNone(self.get())
+
+    def test_owned_case_changed(self):
+        invalidate_case_closures(self.domain, ['unrelated'], ['owner-b'])
+        self.assertIsNone(self.get())
+
+    def test_unrelated_case_changed(self):
+        invalidate_case_closures(self.domain, ['unrelated'], ['other-owner'])
+        self.assertIsNotNone(self.get())
+
+    def test_other_domain_case_changed(self):
+        invalidate_case_closures('other-domain', ['host'], ['owner-a'])
+        self.assertIsNotNone(self.get())
+
+    def test_stale_generation_is_not_used(self):
+        generation = self.index.get_generation()
+        invalidate_case_closures(self.domain, ['a'], [])
+        self.index.set(['a'], {'a'}, {'a'}, {}, generation)
+        self.assertIsNone(self.get())
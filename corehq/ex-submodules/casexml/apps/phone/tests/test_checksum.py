@@ -0,0 +1,85 @@
+import doctest
+
+from django.test import SimpleTestCase
+
+from casexml.apps.phone import checksum
+from casexml.apps.phone.checksum import (
+    EMPTY_HASH,
+    CaseStateHash,
+    Checksum,
+    IncrementalChecksum,
+)
+from casexml.apps.phone.models import SimplifiedSyncLog
+
+
+def test_doctests():
+    results = doctest.testmod(checksum)
+    assert results.failed == 0
+
+
+class IncrementalChecksumTest(SimpleTestCase):
+
+    def test_matches_checksum(self):
+        ids = ['case-{}'.format(i) for i in range(100)]
+        self.assertEqual(IncrementalChecksum.from_ids(ids).hexdigest(), Checksum(ids).hexdigest())
+
+    def test_empty(self):
+        self.assertEqual(IncrementalChecksum().hexdigest(), EMPTY_HASH)
+        self.assertEqual(IncrementalChecksum.from_ids(['a']).hexdigest(), Checksum(['a']).hexdigest())
+
+    def test_update(self):
+        checksum = IncrementalChecksum.from_ids(['a', 'b', 'c'])
+        checksum.update(['d'], removed=['a'])
+        self.assertEqual(checksum.count, 3)
+        self.assertEqual(checksum.hexdigest(), Checksum(['b', 'c', 'd']).hexdigest())
+
+    def test_remove_all(self):
+        checksum = IncrementalChecksum.from_ids(['a', 'b'])
+        checksum.update([], removed=['a', 'b'])
+        self.assertEqual(checksum.hexdigest(), EMPTY_HASH)
+
+    def test_hexdigest_round_trip(self):
+        checksum = IncrementalChecksum.from_ids(['a', 'b'])
+        copy = IncrementalChecksum.from_hexdigest(checksum.hexdigest(), checksum.count)
+        self.assertEqual(copy.value, checksum.value)
+
+
+class SyncLogStateHashTest(SimpleTestCase):
+
+    def assert_state_hash(self, sync_log, case_ids):
+        self.assertEqual(sync_log.get_state_hash(), CaseStateHash(Checksum(list(case_ids)).hexdigest()))
+
+    def test_without_stored_checksum(self):
+        sync_log = SimplifiedSyncLog(case_ids_on_phone={'a', 'b'})
+        self.assertIsNone(sync_log.case_ids_checksum)
+        self.assert_state_hash(sync_log, {'a', 'b'})
+
+    def test_set_case_ids_on_phone(self):
+        sync_log = SimplifiedSyncLog()
+        sync_log.set_case_ids_on_phone({'a', 'b'}, {'b'})
+        self.assertEqual(sync_log.case_ids_checksum_count, 2)
+        self.assertEqual(sync_log.dependent_case_ids_on_phone, {'b'})
+        self.assert_state_hash(sync_log, {'a', 'b'})
+
+    def test_set_case_ids_on_phone_from_previous_log(self):
+        previous_log = SimplifiedSyncLog()
+        previous_log.set_case_ids_on_phone({'a', 'b'}, set())
+        sync_log = SimplifiedSyncLog()
+        sync_log.set_case_ids_on_phone({'b', 'c'}, set(), previous_log)
+        self.assert_state_hash(sync_log, {'b', 'c'})
+        self.assert_state_hash(previous_log, {'a', 'b'})
+
+    def test_add_and_remove_case_ids(self):
+        sync_log = SimplifiedSyncLog()
+        sync_log.set_case_ids_on_phone({'a', 'b'}, set())
+        sync_log._add_case_id_on_phone('c')
+        sync_log._add_case_id_on_phone('c')
+        sync_log._remove_case_id_on_phone('a')
+        self.assertEqual(sync_log.case_ids_checksum_count, 2)
+        self.assert_state_hash(sync_log, {'b', 'c'})
+
+    def test_stale_checksum_is_ignored(self):
+        sync_log = SimplifiedSyncLog()
+        sync_log.set_case_ids_on_phone({'a', 'b'}, set())
+        sync_log.case_ids_on_phone = {'a'}
+        self.assert_state_hash(sync_log, {'a'})
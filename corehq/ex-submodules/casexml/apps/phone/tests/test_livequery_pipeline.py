@@ -0,0 +1,69 @@
+import threading
+from unittest.mock import MagicMock, patch
+
+from django.test import SimpleTestCase
+
+from casexml.apps.phone.data_providers.case import livequery
+from casexml.apps.phone.data_providers.case.livequery import (
+    compile_response_pipelined,
+    prefetch_batches,
+)
+
+
+class PrefetchBatchesTest(SimpleTestCase):
+
+    def test_order_is_preserved(self):
+        batches = [[1, 2], [3], [4, 5, 6]]
+        self.assertEqual(list(prefetch_batches(iter(batches), size=1)), batches)
+
+    def test_empty(self):
+        self.assertEqual(list(prefetch_batches(iter([]))), [])
+
+    def test_error_is_raised_in_consumer(self):
+        def batches():
+            yield [1]
+            raise ValueError("fetch failed")
+
+        result = []
+        with self.assertRaises(ValueError):
+            for batch in prefetch_batches(batches()):
+                result.append(batch)
+        self.assertEqual(result, [[1]])
+
+    def test_consumer_stops_early(self):
+        def batches():
+            for i in range(100):
+                yield [i]
+
+        items = prefetch_batches(batches(), size=2)
+        self.assertEqual(next(items), [0])
+        items.close()  # should not hang waiting for the producer
+
+
+class CompileResponsePipelinedTest(SimpleTestCase):
+
+    def test_workers_close_their_connections(self):
+        closed_by = []
+
+        def get_case_xml_elements(restore_state, cases, total_cases):
+            return ["case-{}".format(case) for case in cases]
+
+        def close_all():
+            closed_by.append(threading.current_thread().name)
+
+        response = []
+        with patch.object(livequery, "get_case_xml_elements", get_case_xml_elements), \
+                patch.object(livequery, "get_stock_payload", lambda project, settings, cases: []), \
+                patch.object(livequery.connections, "close_all", close_all):
+            compile_response_pipelined(
+                timing_context=MagicMock(),
+                restore_state=MagicMock(),
+                response=response,
+                batches=[[1, 2], [3]],
+                update_progress=lambda done: None,
+                total_cases=3,
+                workers=2,
+            )
+        self.assertEqual(response, ["case-1", "case-2", "case-3"])
+        self.assertEqual(len(closed_by), 2)
+        self.assertTrue(all(name.startswith("livequery-xml") for name in closed_by), closed_by)
@@ -1,3 +1,6 @@
+import re
+from xml.etree import ElementTree
+
 from django.test import TestCase
 from django.test.testcases import SimpleTestCase
 from corehq.apps.users.dbaccessors import delete_all_users
@@ -73,3 +76,24 @@ class TestRestoreContent(SimpleTestCase):
             response.append(body.encode('utf-8'))
             with response.get_fileobj() as fileobj:
                 self.assertEqual(expected, fileobj.read().decode('utf-8'))
+
+    def test_single_pass_no_items(self):
+        user = 'user1'
+        body = '<elem>data0</elem>'
+        expected = self._expected(user, body, items=None)
+        with RestoreContent(user, False, single_pass=True) as response:
+            response.append(body.encode('utf-8'))
+            with response.get_fileobj() as fileobj:
+                self.assertEqual(expected, fileobj.read().decode('utf-8'))
+
+    def test_single_pass_items(self):
+        user = 'user1'
+        body = '<elem>data0</elem><elem>data1</elem>'
+        with RestoreContent(user, True, single_pass=True) as response:
+            response.append(b'<elem>data0</elem>')
+            response.append(b'<elem>data1</elem>')
+            with response.get_fileobj() as fileobj:
+                payload = fileobj.read().decode('utf-8')
+        # the items slot is padded with insignificant whitespace
+        self.assertEqual(self._expected(user, body, items=3), re.sub(r'(items="\d+")\s+>', r'\1>', payload))
+        self.assertEqual(ElementTree.fromstring(payload).attrib, {'items': '3'})
@@ -1,9 +1,11 @@
 import time
 from abc import ABCMeta, abstractproperty, abstractmethod
 from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 
 from django.conf import settings
+from django.db import close_old_connections
 from memoized import memoized
 
 from sentry_sdk import Scope
@@ -15,7 +17,7 @@ from dimagi.utils.logging import notify_exception
 from kafka.common import TopicPartition
 from pillowtop.const import CHECKPOINT_MIN_WAIT
 from pillowtop.dao.exceptions import DocumentMissingError
-from pillowtop.utils import force_seq_int
+from pillowtop.utils import bulk_fetch_changes_docs, force_seq_int
 from pillowtop.exceptions import PillowtopCheckpointReset
 from pillowtop.logger import pillow_logging
 
@@ -53,6 +55,8 @@ class PillowBase(metaclass=ABCMeta):
     retry_errors = True
     # this will be the batch size for processors that support batch processing
     processor_chunk_size = 0
+    # set to true to run batch processors concurrently on each chunk
+    concurrent_batch_processing = False
 
     @abstractproperty
     def pillow_id(self):
@@ -129,6 +133,16 @@ class PillowBase(metaclass=ABCMeta):
         else:
             return []
 
+    @property
+    @memoized
+    def _batch_processor_executor(self):
+        # long lived so that worker threads (and their database
+        # connections) are reused across chunks
+        return ThreadPoolExecutor(
+            max_workers=len(self.batch_processors),
+            thread_name_prefix="{}-batch".format(self.get_name()),
+        )
+
     @property
     @memoized
     def serial_processors(self):
@@ -202,45 +216,84 @@ class PillowBase(metaclass=ABCMeta):
             If there is an exception in chunked processing, falls back
             to serial processing.
         """
+        if not changes_chunk:
+            return
         processing_time = 0
-
-        def reprocess_serially(chunk, processor):
-            for change in chunk:
-                self.process_with_error_handling(change, processor)
-
-        for processor in self.batch_processors:
-            if not changes_chunk:
-                return set(), 0
-
+        if self.batch_processors:
             changes_chunk = self._deduplicate_changes(changes_chunk)
-            timer = TimingContext()
-            with timer:
-                try:
-                    retry_changes, change_exceptions = processor.process_changes_chunk(changes_chunk)
-                except Exception as ex:
-                    notify_exception(
-                        None,
-                        "{pillow_name} Error in processing changes chunk: {ex}".format(
-                            pillow_name=self.get_name(),
-                            ex=ex
-                        ),
-                        details={
-                            'change_ids': [c.id for c in changes_chunk]
-                        })
-                    self._record_batch_exception_in_datadog(processor)
-                    # fall back to processing one by one
-                    reprocess_serially(changes_chunk, processor)
-                else:
-                    # fall back to processing one by one for failed changes
-                    for change, exception in change_exceptions:
-                        handle_pillow_error(self, change, exception)
-                    reprocess_serially(retry_changes, processor)
-                processing_time += timer.duration
+            if self.concurrent_batch_processing and len(self.batch_processors) > 1:
+                processing_time += self._run_batch_processors_concurrently(changes_chunk)
+            else:
+                for processor in self.batch_processors:
+                    processing_time += self._run_batch_processor(processor, changes_chunk)
         # process on serial_processors
         for change in changes_chunk:
             processing_time += self.process_with_error_handling(change)
         self._record_datadog_metrics(changes_chunk, processing_time)
 
+    def _run_batch_processors_concurrently(self, changes_chunk):
+        """Run all batch processors on the chunk at the same time
+
+        Documents are fetched in bulk once up front and set on the
+        changes so that processors do not each fetch them again. Returns
+        after all processors have finished, so the checkpoint is only
+        updated once the whole chunk has been processed.
+        """
+        try:
+            bulk_fetch_changes_docs(changes_chunk)
+        except Exception:
+            # processors fetch documents themselves if this fails
+            pillow_logging.exception("[%s] Error fetching documents for chunk", self.get_name())
+        futures = [
+            self._batch_processor_executor.submit(self._run_batch_processor_in_thread, processor, changes_chunk)
+            for processor in self.batch_processors
+        ]
+        return sum(future.result() for future in futures)
+
+    def _run_batch_processor_in_thread(self, processor, changes_chunk):
+        # Database connections belong to the worker thread that opened
+        # them. Close connections that have errored or outlived
+        # CONN_MAX_AGE, the way Django does at the start and end of a
+        # request.
+        close_old_connections()
+        try:
+            return self._run_batch_processor(processor, changes_chunk)
+        finally:
+            close_old_connections()
+
+    def _run_batch_processor(self, processor, changes_chunk):
+        """Process chunk on a batch processor, falling back to serial processing on errors
+
+        :returns: processing time in seconds.
+        """
+        def reprocess_serially(chunk, processor):
+            for change in chunk:
+                self.process_with_error_handling(change, processor)
+
+        timer = TimingContext()
+        with timer:
+            try:
+                retry_changes, change_exceptions = processor.process_changes_chunk(changes_chunk)
+            except Exception as ex:
+                notify_exception(
+                    None,
+                    "{pillow_name} Error in processing changes chunk: {ex}".format(
+                        pillow_name=self.get_name(),
+                        ex=ex
+                    ),
+                    details={
+                        'change_ids': [c.id for c in changes_chunk]
+                    })
+                self._record_batch_exception_in_datadog(processor)
+                # fall back to processing one by one
+                reprocess_serially(changes_chunk, processor)
+            else:
+                # fall back to processing one by one for failed changes
+                for change, exception in change_exceptions:
+                    handle_pillow_error(self, change, exception)
+                reprocess_serially(retry_changes, processor)
+        return timer.duration
+
     def process_with_error_handling(self, change, processor=None):
         # process given change on all serial processors or given processor.
         # Tracks success/fail in datadog but not the timer metric, caller updates that
@@ -440,11 +493,12 @@ class ConstructedPillow(PillowBase):
 
     def __init__(self, name, checkpoint, change_feed, processor, process_num=0,
                  change_processed_event_handler=None, processor_chunk_size=0,
-                 is_dedicated_migration_process=False):
+                 is_dedicated_migration_process=False, concurrent_batch_processing=False):
         self._name = name
         self._checkpoint = checkpoint
         self._change_feed = change_feed
         self.processor_chunk_size = processor_chunk_size
+        self.concurrent_batch_processing = concurrent_batch_processing
         if isinstance(processor, list):
             self.processors = processor
         else:
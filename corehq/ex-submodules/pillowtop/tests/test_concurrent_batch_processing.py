@@ -0,0 +1,109 @@
+import threading
+import uuid
+from datetime import datetime
+from unittest.mock import patch
+
+from django.test import SimpleTestCase
+
+from pillowtop.checkpoints.manager import PillowCheckpoint
+from pillowtop.feed.interface import Change, ChangeMeta
+from pillowtop.feed.mock import RandomChangeFeed
+from pillowtop.pillow.interface import ConstructedPillow
+from pillowtop.processors import BulkPillowProcessor, PillowProcessor
+
+
+class BarrierProcessor(BulkPillowProcessor):
+    """Waits until all processors sharing the barrier are processing"""
+
+    def __init__(self, barrier):
+        self.barrier = barrier
+        self.chunks = []
+        self.changes = []
+
+    def process_change(self, change):
+        self.changes.append(change)
+
+    def process_changes_chunk(self, changes_chunk):
+        self.barrier.wait(timeout=5)
+        self.chunks.append(changes_chunk)
+        return [changes_chunk[0]], []
+
+
+class SerialProcessor(PillowProcessor):
+
+    def __init__(self):
+        self.changes = []
+
+    def process_change(self, change):
+        self.changes.append(change)
+
+
+class ConcurrentBatchProcessingTest(SimpleTestCase):
+
+    def _get_pillow(self, processors, concurrent):
+        return ConstructedPillow(
+            'concurrent-pillow',
+            PillowCheckpoint('test_concurrent_pillow', 'text'),
+            RandomChangeFeed(10),
+            processors,
+            processor_chunk_size=10,
+            concurrent_batch_processing=concurrent,
+        )
+
+    def _get_change(self, doc_id=None):
+        doc_id = doc_id or uuid.uuid4().hex
+        return Change(doc_id, 'seq', metadata=ChangeMeta(
+            data_source_type='couch',
+            data_source_name='test_commcarehq',
+            document_id=doc_id,
+            publish_timestamp=datetime.utcnow(),
+        ))
+
+    @patch('pillowtop.pillow.interface.bulk_fetch_changes_docs')
+    def test_batch_processors_run_concurrently(self, bulk_fetch):
+        barrier = threading.Barrier(2)
+        batch_processors = [BarrierProcessor(barrier), BarrierProcessor(barrier)]
+        serial_processor = SerialProcessor()
+        pillow = self._get_pillow(batch_processors + [serial_processor], concurrent=True)
+        duplicate = self._get_change()
+        changes = [duplicate, self._get_change(), self._get_change(duplicate.id)]
+
+        pillow._batch_process_with_error_handling(changes)
+
+        deduplicated = changes[1:]
+        bulk_fetch.assert_called_once_with(deduplicated)
+        for processor in batch_processors:
+            self.assertEqual(processor.chunks, [deduplicated])
+            # failed changes are retried serially
+            self.assertEqual(processor.changes, [deduplicated[0]])
+        self.assertEqual(serial_processor.changes, deduplicated)
+
+    @patch('pillowtop.pillow.interface.bulk_fetch_changes_docs')
+    def test_worker_threads_close_old_connections(self, bulk_fetch):
+        barrier = threading.Barrier(2)
+        batch_processors = [BarrierProcessor(barrier), BarrierProcessor(barrier)]
+        pillow = self._get_pillow(batch_processors, concurrent=True)
+        closed_by = []
+
+        def close_old_connections():
+            closed_by.append(threading.current_thread().name)
+
+        with patch('pillowtop.pillow.interface.close_old_connections', close_old_connections):
+            pillow._batch_process_with_error_handling([self._get_change()])
+
+        # before and after each processor runs
+        self.assertEqual(len(closed_by), 4)
+        self.assertTrue(all(name.startswith('concurrent-pillow-batch') for name in closed_by), closed_by)
+
+    @patch('pillowtop.pillow.interface.bulk_fetch_changes_docs')
+    def test_sequential_by_default(self, bulk_fetch):
+        barrier = threading.Barrier(1)
+        batch_processors = [BarrierProcessor(barrier), BarrierProcessor(barrier)]
+        pillow = self._get_pillow(batch_processors, concurrent=False)
+        changes = [self._get_change()]
+
+        pillow._batch_process_with_error_handling(changes)
+
+        bulk_fetch.assert_not_called()
+        for processor in batch_processors:
+            self.assertEqual(processor.chunks, [changes])
@@ -0,0 +1,116 @@
+"""
+Cache of the JSON representation of form XML
+
+Parsing form XML, and adjusting the datetimes in it, is one of the
+largest CPU costs of processing forms, and the same form is parsed again
+by each consumer of it: the xform pillow, the UCR pillow, the case
+search pillow, repeaters and exports.
+
+For domains with the CACHE_FORM_JSON toggle enabled,
+`XFormInstance.form_data` stores the JSON it parses in the cache,
+compressed. The cache key includes the time the form was last modified,
+so a form that is changed, and saved, gets a new key.
+
+Forms fetched together by `XFormInstance.objects.get_forms` share a
+`FormJsonBatch`. The first time the form data of one of them is needed,
+the cached JSON of all of them is fetched in one request, and each
+form's JSON is deserialized when its form data is needed.
+"""
+import json
+import logging
+import zlib
+
+from django.core.cache import cache
+
+from corehq.util.metrics import metrics_counter
+
+CACHE_VERSION = 1
+CACHE_TIMEOUT = 60 * 60
+
+log = logging.getLogger(__name__)
+
+
+def get_cached_form_json(form):
+    """
+    Returns the cached JSON of the form's XML, or None if it is not
+    cached
+    """
+    key = _get_cache_key(form)
+    if key is None:
+        return None
+    batch = getattr(form, '_form_json_batch', None)
+    if batch is not None and key in batch.keys:
+        value = batch.pop(key)
+    else:
+        value = _cache_get_many([key]).get(key)
+    metrics_counter('commcare.form_json_cache', tags={'result': 'miss' if value is None else 'hit'})
+    return None if value is None else _loads(value)
+
+
+def cache_form_json(form, form_json):
+    key = _get_cache_key(form)
+    if key is None:
+        return
+    try:
+        cache.set(key, _dumps(form_json), timeout=CACHE_TIMEOUT)
+    except Exception:
+        log.exception("Could not cache the JSON of form %s", form.form_id)
+
+
+def discard_form_json(form):
+    key = _get_cache_key(form)
+    if key is not None:
+        cache.delete(key)
+
+
+def add_to_batch(forms):
+    """
+    Fetch the cached JSON of all `forms` the first time it is needed for
+    any of them
+    """
+    batch = FormJsonBatch(forms)
+    for form in forms:
+        form._form_json_batch = batch
+
+
+class FormJsonBatch:
+
+    def __init__(self, forms):
+        self.keys = {key for key in map(_get_cache_key, forms) if key is not None}
+        self._values = None
+
+    def pop(self, key):
+        if self._values is None:
+            self._values = _cache_get_many(self.keys)
+        self.keys.discard(key)
+        return self._values.pop(key, None)
+
+
+def _get_cache_key(form):
+    from corehq.toggles import CACHE_FORM_JSON
+    if form.server_modified_on is None or not CACHE_FORM_JSON.enabled(form.domain):
+        # Unsaved forms can still change
+        return None
+    return 'form-json:{}:{}:{}'.format(
+        CACHE_VERSION,
+        form.form_id,
+        form.server_modified_on.isoformat(),
+    )
+
+
+def _cache_get_many(keys):
+    if not keys:
+        return {}
+    try:
+        return cache.get_many(list(keys))
+    except Exception:
+        log.exception("Could not get cached form JSON")
+        return {}
+
+
+def _dumps(form_json):
+    return zlib.compress(json.dumps(form_json, separators=(',', ':')).encode('utf-8'))
+
+
+def _loads(value):
+    return json.loads(zlib.decompress(value).decode('utf-8'))
@@ -126,6 +126,28 @@ class CommCareCaseManager(RequireDBManager):
             raise error
         return cases[0]
 
+    def get_cases_by_external_ids(self, domain, external_ids, case_type=None):
+        """Get cases in domain with any of the given external ids and
+        optional case type
+
+        Like `get_case_by_external_id()`, but for many external ids.
+        Cases are partitioned by case ID, so each partition is queried
+        once for all the external ids.
+
+        :returns: List of `CommCareCase` objects. More than one case
+        may match an external id.
+        """
+        assert isinstance(external_ids, list), type(external_ids)
+        if not external_ids:
+            return []
+        filters = {'domain': domain, 'external_id__in': external_ids, 'deleted': False}
+        if case_type:
+            filters['type'] = case_type
+        cases = []
+        for db_name in get_db_aliases_for_partitioned_query():
+            cases.extend(self.using(db_name).filter(**filters))
+        return cases
+
     def get_case_ids_that_exist(self, domain, case_ids):
         result = []
         for db_name, case_ids_chunk in split_list_by_db_partition(case_ids):
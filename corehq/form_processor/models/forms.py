@@ -38,6 +38,12 @@ from ..exceptions import (
     XFormNotFound,
     XFormSaveError,
 )
+from ..form_json_cache import (
+    add_to_batch,
+    cache_form_json,
+    discard_form_json,
+    get_cached_form_json,
+)
 from ..submission_process_tracker import unfinished_archive
 from ..system_action import system_action
 from ..track_related import TrackRelatedChanges
@@ -84,6 +90,7 @@ class XFormInstanceManager(RequireDBManager):
         if not form_ids:
             return []
         forms = list(self.plproxy_raw('SELECT * from get_forms_by_id(%s)', [form_ids]))
+        add_to_batch(forms)
         if ordered:
             sort_with_id_list(forms, form_ids, 'form_id')
         return forms
@@ -149,6 +156,7 @@ class XFormInstanceManager(RequireDBManager):
         if isinstance(form_attachment_new_xml, bytes):
             form_attachment_new_xml = BytesIO(form_attachment_new_xml)
         get_blob_db().put(form_attachment_new_xml, meta=attachment_metadata)
+        discard_form_json(form_data)
         operation = XFormOperation(user_id=SYSTEM_USER_ID, date=datetime.utcnow(),
                                    operation=XFormOperation.GDPR_SCRUB)
         form_data.track_create(operation)
@@ -624,6 +632,9 @@ class XFormInstance(PartitionedModel, models.Model, RedisLockableMixIn,
         from couchforms import XMLSyntaxError
         from ..utils import convert_xform_to_json, adjust_datetimes
         from corehq.form_processor.utils.metadata import scrub_form_meta
+        form_json = get_cached_form_json(self)
+        if form_json is not None:
+            return form_json
         xml = self.get_xml()
         try:
             form_json = convert_xform_to_json(xml)
@@ -632,6 +643,7 @@ class XFormInstance(PartitionedModel, models.Model, RedisLockableMixIn,
         adjust_datetimes(form_json)
 
         scrub_form_meta(self.form_id, form_json)
+        cache_form_json(self, form_json)
         return form_json
 
     @property
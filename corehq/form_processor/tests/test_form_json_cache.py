@@ -0,0 +1,66 @@
+from unittest.mock import patch
+
+from django.conf import settings
+from django.core.cache import cache
+from django.test import TestCase
+
+from corehq.util.test_utils import flag_enabled
+
+from ..form_json_cache import _get_cache_key
+from ..models import XFormInstance
+from ..tests.utils import FormProcessorTestUtils, create_form_for_test, sharded
+
+DOMAIN = 'test-form-json-cache'
+
+
+@sharded
+class FormJsonCacheTest(TestCase):
+
+    def tearDown(self):
+        if settings.USE_PARTITIONED_DATABASE:
+            FormProcessorTestUtils.delete_all_sql_forms(DOMAIN)
+        super().tearDown()
+
+    def get_form(self, form_id):
+        form = XFormInstance.objects.get_form(form_id, DOMAIN)
+        key = _get_cache_key(form)
+        if key is not None:
+            self.addCleanup(cache.delete, key)
+        return form
+
+    @flag_enabled('CACHE_FORM_JSON')
+    def test_form_data_is_cached(self):
+        form_id = create_form_for_test(DOMAIN).form_id
+        form_data = self.get_form(form_id).form_data
+
+        form = self.get_form(form_id)
+        with patch.object(XFormInstance, 'get_xml', side_effect=AssertionError('should not be called')):
+            self.assertEqual(form.form_data, form_data)
+
+    def test_form_data_is_not_cached_without_toggle(self):
+        form_id = create_form_for_test(DOMAIN).form_id
+        form_data = self.get_form(form_id).form_data
+
+        form = self.get_form(form_id)
+        with patch.object(XFormInstance, 'get_xml', wraps=form.get_xml) as get_xml:
+            self.assertEqual(form.form_data, form_data)
+        get_xml.assert_called_once()
+
+    @flag_enabled('CACHE_FORM_JSON')
+    def test_modified_form_gets_new_key(self):
+        form = self.get_form(create_form_for_test(DOMAIN).form_id)
+        key = _get_cache_key(form)
+        form.save()
+        self.assertNotEqual(_get_cache_key(form), key)
+
+    @flag_enabled('CACHE_FORM_JSON')
+    def test_get_forms_gets_cached_form_json_in_one_request(self):
+        form_ids = [create_form_for_test(DOMAIN).form_id for __ in range(3)]
+        expected = {form.form_id: form.form_data for form in map(self.get_form, form_ids)}
+
+        forms = XFormInstance.objects.get_forms(form_ids)
+        with patch.object(cache, 'get_many', wraps=cache.get_many) as get_many, \
+                patch.object(XFormInstance, 'get_xml', side_effect=AssertionError('should not be called')):
+            form_data = {form.form_id: form.form_data for form in forms}
+        self.assertEqual(form_data, expected)
+        get_many.assert_called_once()
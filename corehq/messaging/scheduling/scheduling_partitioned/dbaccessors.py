@@ -4,9 +4,9 @@ from django.db.models import Q
 
 from corehq.sql_db.util import (
     get_db_aliases_for_partitioned_query,
+    paginate_query,
     paginate_query_across_partitioned_databases,
 )
-from corehq.util.metrics.load_counters import load_counter_for_model
 
 
 def _validate_class(obj, cls):
@@ -164,60 +164,19 @@ def _paginate_query_across_partitioned_databases(model_class, q_expression, load
     if model_class not in (CaseAlertScheduleInstance, CaseTimedScheduleInstance):
         raise TypeError("Expected CaseAlertScheduleInstance or CaseTimedScheduleInstance")
 
+    # Paginate on (active, next_event_due, pk) to use the index on
+    # (active, next_event_due). active is always set to true in the
+    # q_expression, so it is not included in the values.
     db_names = get_db_aliases_for_partitioned_query()
     for db_name in db_names:
-        for row in _paginate_query(db_name, model_class, q_expression, load_source):
-            yield row
-
-
-def _paginate_query(db_name, model_class, q_expression, load_source, query_size=5000):
-    track_load = load_counter_for_model(model_class)(load_source, None)
-    sort_cols = ('active', 'next_event_due')
-
-    # active is always set to true in the queryset's q_expression so we
-    # don't need to include it here or filter it further later
-    return_values = ['pk', 'domain', 'case_id', 'schedule_instance_id', 'next_event_due']
-
-    qs = (
-        model_class.objects.using(db_name)
-        .filter(q_expression)
-        .order_by(*sort_cols)
-        .values_list(*return_values)
-    )
-
-    filter_expression = {}
-    previous_pks = set()
-    while True:
-        current_pks = set()
-        last_row = None
-        results = qs.filter(**filter_expression)[:query_size]
-
-        for row in results:
-            track_load()
-
-            current_pks.add(row[0])
-            if row[0] in previous_pks:
-                continue
-
-            yield row[1:]
-            last_row = row
-
-        if len(results) < query_size:
-            break
-
-        if last_row is None:
-            # This iteration produced the same result set as last time
-            # likely because the next_event_due is the same for > query_size records
-            # break here because the next iteration of this code should pick up
-            # these instances once already queued instances have been processed
-            break
-
-        # Use gte here because its not guaranteed to have completed the final
-        # events that are due on this instance for the same time
-        filter_expression = {
-            'next_event_due__gte': last_row[4]
-        }
-        previous_pks = current_pks
+        yield from paginate_query(
+            db_name,
+            model_class,
+            q_expression,
+            values=['domain', 'case_id', 'schedule_instance_id', 'next_event_due'],
+            load_source=load_source,
+            sort_key=('active', 'next_event_due'),
+        )
 
 
 def get_alert_schedule_instances_for_schedule(schedule):
@@ -104,6 +104,14 @@ class AuthManager:
         session.auth = self.get_auth()
         return session
 
+    def is_session_reusable(self, session: Session) -> bool:
+        """
+        Returns whether a session returned by ``get_session()`` can be
+        used for another request. Sessions are reused by
+        ``corehq.motech.sessions.SessionPool``.
+        """
+        return True
+
 
 class BasicAuthManager(AuthManager):
 
@@ -212,7 +220,12 @@ class OAuth2ClientGrantManager(AuthManager):
         refreshed so that it can be reused in the future.
         """
         self.connection_settings.last_token = value
-        self.connection_settings.save()
+        if self.connection_settings.pk:
+            # Pooled sessions can outlive the instance of the connection
+            # settings they were created with, so only save the token
+            self.connection_settings.save(update_fields=['last_token_aes'])
+        else:
+            self.connection_settings.save()
 
     def get_session(self, domain_name: str) -> Session:
         # Compare to OAuth2PasswordGrantManager.get_session()
@@ -267,6 +280,9 @@ class OAuth2ClientGrantManager(AuthManager):
         )
         return session
 
+    def is_session_reusable(self, session: Session) -> bool:
+        return _oauth2_token_is_usable(session.token, self.refresh_url)
+
 
 class OAuth2PasswordGrantManager(AuthManager):
     """
@@ -311,7 +327,12 @@ class OAuth2PasswordGrantManager(AuthManager):
         refreshed so that it can be reused in the future.
         """
         self.connection_settings.last_token = value
-        self.connection_settings.save()
+        if self.connection_settings.pk:
+            # Pooled sessions can outlive the instance of the connection
+            # settings they were created with, so only save the token
+            self.connection_settings.save(update_fields=['last_token_aes'])
+        else:
+            self.connection_settings.save()
 
     def get_session(self, domain_name: str) -> Session:
 
@@ -365,6 +386,17 @@ class OAuth2PasswordGrantManager(AuthManager):
         )
         return session
 
+    def is_session_reusable(self, session: Session) -> bool:
+        return _oauth2_token_is_usable(session.token, self.refresh_url)
+
+
+def _oauth2_token_is_usable(token, refresh_url):
+    if token.get('refresh_token') and refresh_url:
+        # OAuth2Session refreshes the token when it expires
+        return True
+    expires_at = token.get('expires_at')
+    return not expires_at or expires_at > time.time() + 10  # 10 seconds buffer for delays
+
 
 class ApiKeyAuthManager(AuthManager):
     def __init__(self, header_name, api_key):
@@ -1,3 +1,4 @@
+import hashlib
 import json
 import re
 from typing import Any, Callable, Optional
@@ -203,8 +204,34 @@ class ConnectionSettings(models.Model):
             notify_addresses=self.notify_addresses,
             payload_id=payload_id,
             logger=logger,
+            session_key=self.session_key,
         )
 
+    @property
+    def session_key(self) -> Optional[tuple]:
+        """
+        Identifies the sessions which can be shared by requests made
+        with these connection settings. Changing the auth settings
+        changes the key, so sessions created with old settings are not
+        reused.
+        """
+        if not self.pk:
+            return None
+        auth_settings = json.dumps([
+            self.auth_type,
+            self.api_auth_settings,
+            self.username,
+            self.password,
+            self.client_id,
+            self.client_secret,
+            self.token_url,
+            self.refresh_url,
+            self.pass_credentials_in_header,
+            self.include_client_id,
+            self.scope,
+        ])
+        return self.domain, self.pk, hashlib.sha1(auth_settings.encode('utf-8')).hexdigest()
+
     def get_auth_manager(self):
         # Auth types that don't require a username:
         if self.auth_type is None:
@@ -341,7 +368,16 @@ class RequestLog(models.Model):
 
     @staticmethod
     def log(level: int, log_entry: RequestLogEntry):
-        return RequestLog.objects.create(
+        request_log = RequestLog.from_entry(level, log_entry)
+        request_log.save(force_insert=True)
+        return request_log
+
+    @staticmethod
+    def from_entry(level: int, log_entry: RequestLogEntry):
+        """
+        Returns an unsaved RequestLog for ``log_entry``
+        """
+        return RequestLog(
             domain=log_entry.domain,
             log_level=level,
             payload_id=log_entry.payload_id,
@@ -0,0 +1,134 @@
+"""
+Asynchronous repeater dispatcher
+================================
+
+``process_repeater()`` sends the repeat records of a repeater with a
+Celery chord, and each repeat record is sent by its own Celery task.
+Those tasks spend almost all of their time waiting for remote endpoints
+to respond, so many worker processes are needed to keep slow endpoints
+busy.
+
+``dispatch_repeaters()`` processes many repeaters in one worker process.
+Each repeater is processed by a coroutine that works the way the chord
+does: It sends up to ``Repeater.num_workers`` repeat records (or batches
+of repeat records) at the same time, waits for their results, updates
+the repeater's backoff, and continues while the repeater has more
+repeat records ready to be sent. The repeater's ``RepeaterLock`` is
+reacquired after each round, and released when the coroutine is done.
+
+Repeat records are sent by the same functions that the Celery tasks use,
+so rate limiting, attempts, request logs and metrics are unchanged.
+Because they block on I/O, those functions are run in a thread pool of
+``settings.REPEATER_DISPATCHER_THREADS`` threads, which limits the
+number of requests in flight in the process.
+"""
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import close_old_connections
+
+from celery.utils.log import get_task_logger
+
+from .models import Repeater
+from .tasks import (
+    RepeaterLock,
+    get_next_repeat_records,
+    process_ready_repeat_record,
+    process_ready_repeat_record_batch,
+    update_repeater_backoff,
+)
+
+logging = get_task_logger(__name__)
+
+
+def dispatch_repeaters(repeater_locks):
+    """
+    Sends the repeat records of repeaters until none are left, or the
+    repeaters back off.
+
+    ``repeater_locks`` is a list of ``(repeater_id, lock_token)`` tuples
+    for repeaters whose locks have been acquired.
+    """
+    with ThreadPoolExecutor(
+        max_workers=settings.REPEATER_DISPATCHER_THREADS,
+        thread_name_prefix='repeater-dispatcher',
+    ) as executor:
+        asyncio.run(_dispatch(repeater_locks, executor))
+
+
+async def _dispatch(repeater_locks, executor):
+    # Exceptions are handled by each coroutine. return_exceptions
+    # ensures that an unexpected one does not cancel the others.
+    await asyncio.gather(*(
+        _dispatch_repeater(repeater_id, lock_token, executor)
+        for repeater_id, lock_token in repeater_locks
+    ), return_exceptions=True)
+
+
+async def _dispatch_repeater(repeater_id, lock_token, executor):
+    loop = asyncio.get_running_loop()
+
+    def run(func, *args):
+        return loop.run_in_executor(executor, _call_in_thread, func, *args)
+
+    more = True
+    try:
+        while more:
+            repeater = await run(_get_repeater, repeater_id)
+            record_groups, more = await run(get_next_repeat_records, repeater)
+            results = await asyncio.gather(*(
+                run(_send_repeat_records, repeater, group)
+                for group in record_groups
+            ))
+            states = [state for group_states in results for state in group_states]
+            if await run(update_repeater_backoff, repeater, states):
+                more = False
+            if more:
+                await run(_reacquire_lock, repeater_id, lock_token)
+    except Exception:
+        logging.exception(f'Failed to dispatch repeater {repeater_id}')
+    finally:
+        try:
+            await run(_release_lock, repeater_id, lock_token)
+        except Exception:
+            logging.exception(f'Failed to release lock for repeater {repeater_id}')
+
+
+def _call_in_thread(func, *args):
+    # Database connections belong to the thread that opened them. Close
+    # connections that have errored or outlived CONN_MAX_AGE, the way
+    # Django does at the start and end of a request.
+    close_old_connections()
+    try:
+        return func(*args)
+    finally:
+        close_old_connections()
+
+
+def _get_repeater(repeater_id):
+    # Fetched for each round, like update_repeater() does, so that
+    # changes, like pausing the repeater, are picked up
+    return Repeater.objects.get(id=repeater_id)
+
+
+def _send_repeat_records(repeater, repeat_records):
+    """
+    Returns a list of the states of ``repeat_records`` after sending
+    them.
+    """
+    if repeater.supports_batches:
+        return process_ready_repeat_record_batch([rr.id for rr in repeat_records])
+    [repeat_record] = repeat_records
+    return [process_ready_repeat_record(repeat_record.id)]
+
+
+# RepeaterLock stores its token in a thread-local, so the lock is
+# instantiated in the thread that uses it.
+
+def _reacquire_lock(repeater_id, lock_token):
+    RepeaterLock(repeater_id, lock_token).reacquire()
+
+
+def _release_lock(repeater_id, lock_token):
+    RepeaterLock(repeater_id, lock_token).release()
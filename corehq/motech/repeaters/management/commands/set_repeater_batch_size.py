@@ -0,0 +1,38 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from corehq.motech.repeaters.models import Repeater
+
+
+class Command(BaseCommand):
+    help = f"""
+    Sets Repeater.max_batch_size, which is the number of repeat records
+    sent in one request, if the repeater's payload format supports
+    sending payloads in batches. Set to "0" or "1" to send one repeat
+    record per request. The maximum value is
+    {settings.MAX_REPEATER_BATCH_SIZE}.
+    """
+
+    def add_arguments(self, parser):
+        parser.add_argument('domain')
+        parser.add_argument('repeater_id')
+        parser.add_argument('max_batch_size', type=int)
+
+    def handle(self, domain, repeater_id, max_batch_size, *args, **options):
+        if not 0 <= max_batch_size <= settings.MAX_REPEATER_BATCH_SIZE:
+            self.stderr.write(
+                'max_batch_size must be between 0 and '
+                f'{settings.MAX_REPEATER_BATCH_SIZE}.'
+            )
+            return
+        # Use QuerySet.update() to avoid a race condition if the
+        # repeater is currently in use.
+        rows = (
+            Repeater.objects
+            .filter(domain=domain, id=repeater_id)
+            .update(max_batch_size=max_batch_size)
+        )
+        if not rows:
+            self.stderr.write(
+                f'Repeater {repeater_id} was not found in domain {domain}.'
+            )
@@ -305,6 +305,7 @@ class Repeater(RepeaterSuperProxy):
     next_attempt_at = models.DateTimeField(null=True, blank=True)
     last_attempt_at = models.DateTimeField(null=True, blank=True)
     max_workers = models.IntegerField(default=0)
+    max_batch_size = models.IntegerField(default=0)
     options = JSONField(default=dict)
     connection_settings_id = models.IntegerField(db_index=True)
     is_deleted = models.BooleanField(default=False)
@@ -424,6 +425,25 @@ class Repeater(RepeaterSuperProxy):
         num_workers = self.max_workers or settings.DEFAULT_REPEATER_WORKERS
         return min(num_workers, settings.MAX_REPEATER_WORKERS)
 
+    @property
+    def batch_size(self):
+        # If batch_size is 1, each repeat record is sent in its own
+        # request.
+        return min(self.max_batch_size or 1, settings.MAX_REPEATER_BATCH_SIZE)
+
+    @property
+    def supports_batches(self):
+        """
+        Whether the payloads of several repeat records can be sent in one
+        request. Repeaters that customize how a payload is sent always
+        send one payload per request.
+        """
+        return (
+            self.batch_size > 1
+            and self.generator.supports_batches
+            and type(self).send_request is Repeater.send_request
+        )
+
     def set_backoff(self):
         self.next_attempt_at = self._get_next_attempt_at(self.last_attempt_at)
         self.last_attempt_at = datetime.utcnow()
@@ -520,21 +540,71 @@ class Repeater(RepeaterSuperProxy):
 
     def fire_for_record(self, repeat_record, timing_context=None):
         payload = self.get_payload(repeat_record)
+        result = self._get_response_or_error(
+            lambda: self._time_request(repeat_record, payload, timing_context)
+        )
+        self.handle_response(result, repeat_record)
+
+    def fire_for_records(self, repeat_records, timing_context=None):
+        """
+        Sends the payloads of ``repeat_records`` in one request, and
+        handles the result for each repeat record.
+
+        Returns the state of each repeat record, or ``None`` for a repeat
+        record that was not sent, the way ``RepeatRecord.fire()`` does.
+        """
+        states = {}
+        records_to_send = []
+        payloads = []
+        for repeat_record in repeat_records:
+            try:
+                payloads.append(self.get_payload(repeat_record))
+            except OSError as e:
+                repeat_record.handle_exception(str(e))
+                states[repeat_record.id] = None
+            except Exception as e:
+                repeat_record.handle_payload_error(str(e), traceback_str=traceback.format_exc())
+                states[repeat_record.id] = None
+            else:
+                records_to_send.append(repeat_record)
+
+        if records_to_send:
+            payload = self.generator.get_batch_payload(records_to_send, payloads)
+            result = self._get_response_or_error(
+                lambda: self._time_batch_request(records_to_send, payload, timing_context)
+            )
+            if isinstance(result, Exception):
+                results = [result] * len(records_to_send)
+            else:
+                results = self.generator.get_batch_results(result, records_to_send)
+            for repeat_record, record_result in zip(records_to_send, results):
+                self.handle_response(record_result, repeat_record)
+                states[repeat_record.id] = repeat_record.state
+        return [states[repeat_record.id] for repeat_record in repeat_records]
+
+    def _time_batch_request(self, repeat_records, payload, timing_context):
+        with timing_context(ENDPOINT_TIMER) if timing_context else nullcontext():
+            return self.send_batch_request(repeat_records, payload)
+
+    @staticmethod
+    def _get_response_or_error(send):
+        """
+        Returns the response returned by ``send()``, or the exception
+        to be handled in its place if sending failed.
+        """
         try:
-            response = self._time_request(repeat_record, payload, timing_context)
+            return send()
         except (Timeout, ConnectionError) as error:
-            self.handle_response(RequestConnectionError(error), repeat_record)
+            return RequestConnectionError(error)
         except RequestException as err:
-            self.handle_response(err, repeat_record)
+            return err
         except (PossibleSSRFAttempt, CannotResolveHost):
-            self.handle_response(Exception("Invalid URL"), repeat_record)
+            return Exception("Invalid URL")
         except Exception:
             # This shouldn't ever happen in normal operation and would mean code broke
             # we want to notify ourselves of the error detail and tell the user something vague
             notify_exception(None, "Unexpected error sending repeat record request")
-            self.handle_response(Exception("Internal Server Error"), repeat_record)
-        else:
-            self.handle_response(response, repeat_record)
+            return Exception("Internal Server Error")
 
     @memoized
     def get_payload(self, repeat_record):
@@ -550,8 +620,26 @@ class Repeater(RepeaterSuperProxy):
             notify_addresses=self.connection_settings.notify_addresses,
             payload_id=repeat_record.payload_id,
             method=self.request_method,
+            session_key=self.connection_settings.session_key,
         )
 
+    def send_batch_request(self, repeat_records, payload):
+        # Headers that describe a single payload, like "received-on",
+        # do not apply to a batch
+        return simple_request(
+            self.domain, self.get_batch_url(repeat_records), payload,
+            headers=self.generator.get_headers(),
+            auth_manager=self.connection_settings.get_auth_manager(),
+            verify=not self.connection_settings.skip_cert_verify,
+            notify_addresses=self.connection_settings.notify_addresses,
+            payload_id=repeat_records[0].payload_id,
+            method=self.request_method,
+            session_key=self.connection_settings.session_key,
+        )
+
+    def get_batch_url(self, repeat_records):
+        return self.connection_settings.url
+
     def handle_response(self, result, repeat_record):
         """
         route the result to the success, failure, timeout, or exception handlers
@@ -672,6 +760,11 @@ class FormRepeater(Repeater):
             url_parts[4] = urlencode(query)
             return urlunparse(url_parts)
 
+    @property
+    def supports_batches(self):
+        # The forms in a batch could belong to different apps
+        return super().supports_batches and not self.include_app_id_param
+
     def get_headers(self, repeat_record):
         headers = super().get_headers(repeat_record)
         headers.update({
@@ -2,6 +2,7 @@ import json
 import warnings
 from collections import namedtuple
 from datetime import datetime
+from http import HTTPStatus
 from uuid import uuid4
 
 import attr
@@ -20,6 +21,7 @@ from corehq.const import OPENROSA_VERSION_3
 from corehq.form_processor.exceptions import CaseNotFound
 from corehq.form_processor.models import CommCareCase
 from corehq.middleware import OPENROSA_VERSION_HEADER
+from corehq.motech.repeater_helpers import RepeaterResponse
 from corehq.motech.repeaters.exceptions import ReferralError, DataRegistryCaseUpdateError
 from dimagi.utils.parsing import json_format_datetime
 from corehq.util.json import CommCareJSONEncoder
@@ -45,6 +47,10 @@ class BasePayloadGenerator(object):
     # if you ever change format_name, add the old format_name here for backwards compatability
     deprecated_format_names = ()
 
+    # set to True if the payloads of several repeat records can be
+    # combined into one request by get_batch_payload()
+    supports_batches = False
+
     def __init__(self, repeater):
         self.repeater = repeater
 
@@ -62,6 +68,72 @@ class BasePayloadGenerator(object):
     def get_headers(self):
         return {'Content-Type': self.content_type}
 
+    def get_batch_payload(self, repeat_records, payloads):
+        """
+        Returns the request body for the ``payloads`` of
+        ``repeat_records``, in the same order.
+        """
+        raise NotImplementedError()
+
+    def get_batch_results(self, response, repeat_records):
+        """
+        Returns the result for each of ``repeat_records`` of the response
+        to their batch request. By default the response is the result
+        for every repeat record in the batch.
+        """
+        return [response] * len(repeat_records)
+
+
+class JsonBatchPayloadMixin:
+    """
+    Sends the JSON payloads of a batch of repeat records as a JSON array.
+
+    If the remote endpoint responds "207 Multi-Status" with a JSON array
+    that has an item for each payload, in the same order, each item is
+    the result for its repeat record. Items are objects with a "status"
+    key for the HTTP status code of the payload, and an optional
+    "message" key. Any other response is the result for every repeat
+    record in the batch.
+    """
+    supports_batches = True
+
+    def get_batch_payload(self, repeat_records, payloads):
+        return '[' + ','.join(payloads) + ']'
+
+    def get_batch_results(self, response, repeat_records):
+        if response.status_code == HTTPStatus.MULTI_STATUS:
+            try:
+                items = response.json()
+            except ValueError:
+                items = None
+            if (
+                isinstance(items, list)
+                and len(items) == len(repeat_records)
+                and all(_is_batch_result_item(item) for item in items)
+            ):
+                return [_get_batch_item_response(item) for item in items]
+        return super().get_batch_results(response, repeat_records)
+
+
+def _is_batch_result_item(item):
+    return (
+        isinstance(item, dict)
+        and isinstance(item.get('status'), int)
+        and 100 <= item['status'] < 600
+    )
+
+
+def _get_batch_item_response(item):
+    try:
+        reason = HTTPStatus(item['status']).phrase
+    except ValueError:
+        reason = ''
+    return RepeaterResponse(
+        status_code=item['status'],
+        reason=reason,
+        text=str(item.get('message') or ''),
+    )
+
 
 FormatInfo = namedtuple('FormatInfo', 'name label generator_class')
 
@@ -213,7 +285,7 @@ class CaseRepeaterXMLPayloadGenerator(BasePayloadGenerator):
         return payload_doc.to_xml(self.repeater.version or V2, include_case_on_closed=True)
 
 
-class CaseRepeaterJsonPayloadGenerator(BasePayloadGenerator):
+class CaseRepeaterJsonPayloadGenerator(JsonBatchPayloadMixin, BasePayloadGenerator):
     format_name = 'case_json'
     format_label = _('JSON')
 
@@ -675,7 +747,7 @@ class AppStructureGenerator(BasePayloadGenerator):
         return repeat_record.payload_id
 
 
-class ShortFormRepeaterJsonPayloadGenerator(BasePayloadGenerator):
+class ShortFormRepeaterJsonPayloadGenerator(JsonBatchPayloadMixin, BasePayloadGenerator):
 
     deprecated_format_names = ('short_form_json',)
 
@@ -690,7 +762,7 @@ class ShortFormRepeaterJsonPayloadGenerator(BasePayloadGenerator):
         return 'application/json'
 
 
-class FormRepeaterJsonPayloadGenerator(BasePayloadGenerator):
+class FormRepeaterJsonPayloadGenerator(JsonBatchPayloadMixin, BasePayloadGenerator):
 
     format_name = 'form_json'
     format_label = _('JSON')
@@ -719,7 +791,7 @@ class FormDictPayloadGenerator(BasePayloadGenerator):
         return 'application/x-python'
 
 
-class UserPayloadGenerator(BasePayloadGenerator):
+class UserPayloadGenerator(JsonBatchPayloadMixin, BasePayloadGenerator):
 
     @property
     def content_type(self):
@@ -732,7 +804,7 @@ class UserPayloadGenerator(BasePayloadGenerator):
         return json.dumps(resource.full_dehydrate(bundle).data, cls=DjangoJSONEncoder)
 
 
-class LocationPayloadGenerator(BasePayloadGenerator):
+class LocationPayloadGenerator(JsonBatchPayloadMixin, BasePayloadGenerator):
 
     @property
     def content_type(self):
@@ -66,10 +66,22 @@ offline or consistently returns errors, then the repeater will be
 updated to back off. If any send attempts succeeded and a backoff had
 been set, then the backoff is reset.
 
+If a repeater's payload format supports it, its repeat records can be
+sent in batches, several payloads to a request, by setting its
+``max_batch_size`` greater than 1. Then each task in the chord sends a
+batch of repeat records, and the results for the repeat records are
+determined by the payload generator from the response.
+
 ``process_repeaters()`` runs the group of tasks in parallel. When they
 have completed, ``process_repeaters()`` loops through the repeaters
 again, until there are no more repeat records ready to be sent.
 
+For domains with the ``ASYNC_REPEATER_DISPATCHER`` feature flag,
+``process_repeaters()`` does not create a chord for each repeater.
+Instead, it passes the repeaters, in groups, to the
+``dispatch_repeaters()`` task, which processes them concurrently in one
+worker process. (See *dispatcher.py*.)
+
 """
 import random
 import uuid
@@ -77,11 +89,13 @@ from datetime import datetime, timedelta
 from inspect import cleandoc
 
 from django.conf import settings
+from django.db.models import Max
 
 from celery import chord
 from celery.schedules import crontab
 from celery.utils.log import get_task_logger
 
+from dimagi.utils.chunked import chunked
 from dimagi.utils.couch import get_redis_lock
 
 from corehq import toggles
@@ -140,15 +154,25 @@ def delete_old_request_logs():
     """
     Delete RequestLogs older than 6 weeks
     """
-    ninety_days_ago = datetime.utcnow() - timedelta(days=42)
-    while True:
-        queryset = (RequestLog.objects
-                    .filter(timestamp__lt=ninety_days_ago)
-                    .values_list('id', flat=True)[:DELETE_CHUNK_SIZE])
-        id_list = list(queryset)
-        deleted, __ = RequestLog.objects.filter(id__in=id_list).delete()
-        if not deleted:
-            return
+    six_weeks_ago = datetime.utcnow() - timedelta(days=42)
+    # IDs and timestamps are both assigned when logs are saved, so the
+    # old logs are the logs with the lowest IDs. They are deleted in
+    # ranges of primary key values, which avoids selecting IDs to delete
+    # and lets each DELETE scan only a range of the primary key index.
+    max_id = (RequestLog.objects
+              .filter(timestamp__lt=six_weeks_ago)
+              .aggregate(Max('id'))['id__max'])
+    if max_id is None:
+        return
+    min_id = RequestLog.objects.order_by('id').values_list('id', flat=True).first()
+    for start in range(min_id, max_id + 1, DELETE_CHUNK_SIZE):
+        end = min(start + DELETE_CHUNK_SIZE, max_id + 1)
+        RequestLog.objects.filter(
+            id__gte=start,
+            id__lt=end,
+            # in case a log was saved out of order
+            timestamp__lt=six_weeks_ago,
+        ).delete()
 
 
 @periodic_task(
@@ -312,6 +336,7 @@ def process_repeaters():
     independently the way that ``check_repeaters()`` does.
     """
     metrics_counter('commcare.repeaters.process_repeaters.start')
+    dispatcher_locks = []
     for domain, repeater_id in iter_ready_repeater_ids():
         if not domain_can_forward_now(domain):
             continue
@@ -319,8 +344,24 @@ def process_repeaters():
             continue
         lock = RepeaterLock(repeater_id)
         if lock.acquire():
+            if toggles.ASYNC_REPEATER_DISPATCHER.enabled(domain, toggles.NAMESPACE_DOMAIN):
+                dispatcher_locks.append((repeater_id, lock.token))
+                continue
             repeater = Repeater.objects.get(domain=domain, id=repeater_id)
             process_repeater(repeater, lock.token)
+    for chunk in chunked(dispatcher_locks, settings.REPEATER_DISPATCHER_MAX_REPEATERS, list):
+        dispatch_repeaters.delay(chunk)
+
+
+@task(queue=settings.CELERY_REPEAT_RECORD_QUEUE)
+def dispatch_repeaters(repeater_locks):
+    """
+    Processes the repeaters in ``repeater_locks``, a list of
+    ``(repeater_id, lock_token)`` tuples, concurrently in this worker
+    process, instead of with a Celery chord for each repeater.
+    """
+    from .dispatcher import dispatch_repeaters as dispatch
+    dispatch(repeater_locks)
 
 
 def iter_ready_repeater_ids():
@@ -369,22 +410,48 @@ def process_repeater(repeater, lock_token):
     Initiates a Celery chord to process a repeater.
     """
 
-    def get_task_signature(repeat_record):
+    def get_task_signature(repeat_records):
+        if repeater.supports_batches:
+            return process_repeat_record_batch.s(
+                [rr.id for rr in repeat_records],
+                repeater.domain,
+            )
+        [repeat_record] = repeat_records
         task_ = {
             State.Pending: process_pending_repeat_record,
             State.Fail: process_failed_repeat_record,
         }[repeat_record.state]
         return task_.s(repeat_record.id, repeat_record.domain)
 
+    record_groups, more = get_next_repeat_records(repeater)
+    header_tasks = [get_task_signature(group) for group in record_groups]
+    callback = update_repeater.s(repeater.repeater_id, lock_token, more)
+    chord(header_tasks, callback)()
+
+
+def get_next_repeat_records(repeater):
+    """
+    Returns the next repeat records of ``repeater`` to send, grouped by
+    the worker that sends them, and whether there are more repeat
+    records ready to be sent after them.
+
+    Each group is one repeat record, or a batch of repeat records if the
+    repeater supports batches.
+    """
+    group_size = repeater.batch_size if repeater.supports_batches else 1
+    limit = repeater.num_workers * group_size
+
     # Fetch an extra row to determine whether there are more repeat
     # records to send after this batch
-    repeat_records = repeater.repeat_records_ready[:repeater.num_workers + 1]
-    more = len(repeat_records) > repeater.num_workers
+    repeat_records = list(repeater.repeat_records_ready[:limit + 1])
+    more = len(repeat_records) > limit
 
-    repeat_records = repeat_records[:repeater.num_workers]
-    header_tasks = [get_task_signature(rr) for rr in repeat_records]
-    callback = update_repeater.s(repeater.repeater_id, lock_token, more)
-    chord(header_tasks, callback)()
+    repeat_records = repeat_records[:limit]
+    record_groups = [
+        repeat_records[i:i + group_size]
+        for i in range(0, len(repeat_records), group_size)
+    ]
+    return record_groups, more
 
 
 @task(queue=settings.CELERY_REPEAT_RECORD_QUEUE)
@@ -427,6 +494,53 @@ def process_ready_repeat_record(repeat_record_id):
     return state_or_none
 
 
+@task(queue=settings.CELERY_REPEAT_RECORD_QUEUE)
+def process_repeat_record_batch(repeat_record_ids, domain):
+    # `domain` is for tagging in Datadog
+    return process_ready_repeat_record_batch(repeat_record_ids)
+
+
+def process_ready_repeat_record_batch(repeat_record_ids):
+    """
+    Sends the payloads of the repeat records with ``repeat_record_ids``
+    in one request.
+
+    Returns a list of the states of the repeat records that were sent,
+    and ``None`` for repeat records that were not.
+    """
+    states_or_none = []
+    with TimingContext('process_repeat_record_batch') as timer:
+        try:
+            repeat_records = [
+                rr for rr in (
+                    RepeatRecord.objects
+                    .prefetch_related('repeater', 'attempt_set')
+                    .filter(id__in=repeat_record_ids)
+                    .order_by('registered_at')
+                )
+                # A repeat record could have been sent by a "Resend"
+                # in the Repeat Records Report since it was fetched
+                if rr.is_queued()
+            ]
+            if not repeat_records or not is_repeat_record_ready(repeat_records[0]):
+                return []
+
+            for repeat_record in repeat_records:
+                _metrics_wait_duration(repeat_record)
+            repeater = repeat_records[0].repeater
+            report_repeater_attempt(repeater.repeater_id)
+            with timer('fire_timing') as fire_timer:
+                states_or_none = repeater.fire_for_records(repeat_records, timing_context=fire_timer)
+            report_repeater_usage(
+                repeater.domain,
+                # round up to the nearest millisecond, meaning always at least 1ms
+                milliseconds=int(fire_timer.duration * 1000) + 1
+            )
+        except Exception:
+            logging.exception(f'Failed to process repeat record batch {repeat_record_ids}')
+    return states_or_none
+
+
 def is_repeat_record_ready(repeat_record):
     # Fail loudly if repeat_record is not ready.
     # process_ready_repeat_record() will log an exception.
@@ -484,22 +598,15 @@ def update_repeater(repeat_record_states, repeater_id, lock_token, more):
     repeater.
     """
     repeater = Repeater.objects.get(id=repeater_id)
+    # Batches of repeat records return a list of states
+    repeat_record_states = [
+        state
+        for result in repeat_record_states
+        for state in (result if isinstance(result, list) else [result])
+    ]
     try:
-        if all(s in (State.Empty, None) for s in repeat_record_states):
-            # We can't tell anything about the remote endpoint.
-            return
-        success_or_invalid = (State.Success, State.InvalidPayload)
-        if any(s in success_or_invalid for s in repeat_record_states):
-            # The remote endpoint appears to be healthy.
-            repeater.reset_backoff()
-        else:
-            # All the payloads that were sent failed. Try again later.
-            metrics_counter(
-                'commcare.repeaters.process_repeaters.repeater_backoff',
-                tags={'domain': repeater.domain},
-            )
+        if update_repeater_backoff(repeater, repeat_record_states):
             more = False
-            repeater.set_backoff()
     finally:
         lock = RepeaterLock(repeater_id, lock_token)
         if more:
@@ -509,6 +616,30 @@ def update_repeater(repeat_record_states, repeater_id, lock_token, more):
             lock.release()
 
 
+def update_repeater_backoff(repeater, repeat_record_states):
+    """
+    Sets or resets the backoff of ``repeater`` based on the states of
+    the repeat records it has just sent.
+
+    Returns ``True`` if the repeater is backing off.
+    """
+    if all(s in (State.Empty, None) for s in repeat_record_states):
+        # We can't tell anything about the remote endpoint.
+        return False
+    success_or_invalid = (State.Success, State.InvalidPayload)
+    if any(s in success_or_invalid for s in repeat_record_states):
+        # The remote endpoint appears to be healthy.
+        repeater.reset_backoff()
+        return False
+    # All the payloads that were sent failed. Try again later.
+    metrics_counter(
+        'commcare.repeaters.process_repeaters.repeater_backoff',
+        tags={'domain': repeater.domain},
+    )
+    repeater.set_backoff()
+    return True
+
+
 class RepeaterLock:
     """
     A utility class for encapsulating lock-related logic for a repeater.
@@ -0,0 +1,83 @@
+import threading
+from unittest.mock import MagicMock, call, patch
+
+from django.test import SimpleTestCase
+
+from ..const import State
+from ..dispatcher import dispatch_repeaters
+
+MODULE = 'corehq.motech.repeaters.dispatcher'
+
+
+class DispatchRepeatersTests(SimpleTestCase):
+
+    def setUp(self):
+        super().setUp()
+        for name in ('RepeaterLock', 'Repeater', 'update_repeater_backoff', 'close_old_connections'):
+            patcher = patch(f'{MODULE}.{name}')
+            setattr(self, name, patcher.start())
+            self.addCleanup(patcher.stop)
+        self.update_repeater_backoff.return_value = False
+        self.repeater = MagicMock(supports_batches=False)
+        self.Repeater.objects.get.return_value = self.repeater
+
+    def test_sends_repeat_records_concurrently(self):
+        barrier = threading.Barrier(3, timeout=5)
+
+        def process_ready_repeat_record(repeat_record_id):
+            # Fails unless all three are in flight at the same time
+            barrier.wait()
+            return State.Success
+
+        records = [[MagicMock(id=i)] for i in range(3)]
+        with patch(f'{MODULE}.get_next_repeat_records', return_value=(records, False)), \
+                patch(f'{MODULE}.process_ready_repeat_record', side_effect=process_ready_repeat_record):
+            dispatch_repeaters([('abc123', 'token')])
+
+        self.update_repeater_backoff.assert_called_once_with(self.repeater, [State.Success] * 3)
+        self.RepeaterLock.assert_called_once_with('abc123', 'token')
+        self.RepeaterLock.return_value.release.assert_called_once_with()
+
+    def test_continues_while_more(self):
+        rounds = [
+            ([[MagicMock(id=1)]], True),
+            ([[MagicMock(id=2)]], False),
+        ]
+        with patch(f'{MODULE}.get_next_repeat_records', side_effect=rounds), \
+                patch(f'{MODULE}.process_ready_repeat_record', return_value=State.Success) as process:
+            dispatch_repeaters([('abc123', 'token')])
+
+        self.assertEqual(process.call_args_list, [call(1), call(2)])
+        self.RepeaterLock.return_value.reacquire.assert_called_once_with()
+        self.RepeaterLock.return_value.release.assert_called_once_with()
+
+    def test_stops_on_backoff(self):
+        self.update_repeater_backoff.return_value = True
+        rounds = [([[MagicMock(id=1)]], True)]
+        with patch(f'{MODULE}.get_next_repeat_records', side_effect=rounds) as get_next, \
+                patch(f'{MODULE}.process_ready_repeat_record', return_value=State.Fail):
+            dispatch_repeaters([('abc123', 'token')])
+
+        get_next.assert_called_once()
+        self.RepeaterLock.return_value.reacquire.assert_not_called()
+        self.RepeaterLock.return_value.release.assert_called_once_with()
+
+    def test_sends_batches(self):
+        self.repeater.supports_batches = True
+        records = [[MagicMock(id=1), MagicMock(id=2)], [MagicMock(id=3)]]
+        with patch(f'{MODULE}.get_next_repeat_records', return_value=(records, False)), \
+                patch(f'{MODULE}.process_ready_repeat_record_batch',
+                      side_effect=lambda ids: [State.Success] * len(ids)) as process_batch:
+            dispatch_repeaters([('abc123', 'token')])
+
+        self.assertEqual(
+            sorted(c.args[0] for c in process_batch.call_args_list),
+            [[1, 2], [3]],
+        )
+        self.update_repeater_backoff.assert_called_once_with(self.repeater, [State.Success] * 3)
+
+    def test_releases_lock_on_error(self):
+        with patch(f'{MODULE}.get_next_repeat_records', side_effect=ValueError):
+            dispatch_repeaters([('abc123', 'token'), ('def456', 'token')])
+
+        self.assertEqual(self.RepeaterLock.return_value.release.call_count, 2)
@@ -671,6 +671,98 @@ class TestRepeaterModelMethods(RepeaterTestCase):
         self.assertTrue(simple_request.called)
 
 
+class TestFireForRecords(RepeaterTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.repeater.format = 'form_json'
+        self.repeater.include_app_id_param = False
+        self.repeater.max_batch_size = 10
+        self.repeater.save()
+        self.repeat_records = [
+            self.repeater.repeat_records.create(
+                domain=DOMAIN,
+                payload_id=f'payload{i}',
+                registered_at=timezone.now(),
+            )
+            for i in range(3)
+        ]
+
+    def test_supports_batches(self):
+        self.assertTrue(self.repeater.supports_batches)
+
+    def test_no_batches_by_default(self):
+        self.repeater.max_batch_size = 0
+        self.assertFalse(self.repeater.supports_batches)
+
+    def test_no_batches_with_app_id_param(self):
+        self.repeater.include_app_id_param = True
+        self.assertFalse(self.repeater.supports_batches)
+
+    def test_no_batches_for_xml(self):
+        self.repeater.format = 'form_xml'
+        self.assertFalse(self.repeater.supports_batches)
+
+    def test_batch_payload(self):
+        with self._patch_payloads() as simple_request:
+            simple_request.return_value = RepeaterResponse(200, 'OK')
+            self.repeater.fire_for_records(self.repeat_records)
+        payload = simple_request.call_args[0][2]
+        self.assertEqual(payload, '[{"id": "payload0"},{"id": "payload1"},{"id": "payload2"}]')
+
+    def test_success(self):
+        with self._patch_payloads() as simple_request:
+            simple_request.return_value = RepeaterResponse(200, 'OK')
+            states = self.repeater.fire_for_records(self.repeat_records)
+        simple_request.assert_called_once()
+        self.assertEqual(states, [State.Success] * 3)
+
+    def test_server_failure(self):
+        with self._patch_payloads() as simple_request:
+            simple_request.return_value = RepeaterResponse(503, 'Service Unavailable')
+            states = self.repeater.fire_for_records(self.repeat_records)
+        self.assertEqual(states, [State.Fail] * 3)
+
+    def test_multi_status(self):
+        response = Mock(status_code=207, reason='Multi-Status')
+        response.json.return_value = [
+            {'status': 201},
+            {'status': 400, 'message': 'Missing name'},
+            {'status': 503},
+        ]
+        with self._patch_payloads() as simple_request:
+            simple_request.return_value = response
+            states = self.repeater.fire_for_records(self.repeat_records)
+        self.assertEqual(states, [State.Success, State.InvalidPayload, State.Fail])
+        self.assertIn('Missing name', self.repeat_records[1].last_message)
+
+    def test_payload_error(self):
+        def get_payload(repeat_record):
+            if repeat_record.payload_id == 'payload1':
+                raise ValueError('Bad payload')
+            return f'{{"id": "{repeat_record.payload_id}"}}'
+
+        with self._patch_payloads(get_payload) as simple_request:
+            simple_request.return_value = RepeaterResponse(200, 'OK')
+            states = self.repeater.fire_for_records(self.repeat_records)
+        payload = simple_request.call_args[0][2]
+        self.assertEqual(payload, '[{"id": "payload0"},{"id": "payload2"}]')
+        self.assertEqual(states, [State.Success, None, State.Success])
+        self.assertEqual(self.repeat_records[1].state, State.InvalidPayload)
+
+    @contextmanager
+    def _patch_payloads(self, get_payload=None):
+        if get_payload is None:
+            def get_payload(repeat_record):
+                return f'{{"id": "{repeat_record.payload_id}"}}'
+
+        with (
+            patch.object(FormRepeater, 'get_payload', side_effect=get_payload),
+            patch('corehq.motech.repeaters.models.simple_request') as simple_request,
+        ):
+            yield simple_request
+
+
 class TestFormRepeaterAllowedToForward(RepeaterTestCase):
 
     def test_white_list_empty(self):
@@ -48,11 +48,31 @@ class TestDeleteOldRequestLogs(TestCase):
         count = RequestLog.objects.filter(domain=DOMAIN).count()
         self.assertGreater(count, 0)
 
+    def test_keeps_new_logs_in_range(self):
+        old_log = RequestLog.objects.create(domain=DOMAIN)
+        new_log = RequestLog.objects.create(domain=DOMAIN)
+        newer_log = RequestLog.objects.create(domain=DOMAIN)
+        RequestLog.objects.filter(id__in=[old_log.id, newer_log.id]).update(
+            timestamp=datetime.utcnow() - timedelta(days=43),
+        )
+        delete_old_request_logs.apply()
+
+        self.assertEqual(
+            list(RequestLog.objects.filter(domain=DOMAIN).values_list('id', flat=True)),
+            [new_log.id],
+        )
+
+    def test_no_old_logs(self):
+        RequestLog.objects.create(domain=DOMAIN)
+        with self.assertNumQueries(1):
+            delete_old_request_logs.apply()
+
     def test_num_queries_per_chunk(self):
         log = RequestLog.objects.create(domain=DOMAIN)
         log.timestamp = datetime.utcnow() - timedelta(days=91)
         log.save()
 
+        # max ID, min ID, delete
         with self.assertNumQueries(3):
             delete_old_request_logs.apply()
 
@@ -63,7 +83,8 @@ class TestDeleteOldRequestLogs(TestCase):
             log.save()
 
         with patch('corehq.motech.repeaters.tasks.DELETE_CHUNK_SIZE', 2):
-            with self.assertNumQueries(11):
+            # max ID, min ID, and a delete for each range of 2 IDs
+            with self.assertNumQueries(7):
                 delete_old_request_logs.apply()
 
         count = RequestLog.objects.filter(domain=DOMAIN).count()
@@ -354,6 +375,28 @@ class TestUpdateRepeater(SimpleTestCase):
         mock_process_repeater.assert_not_called()
         mock_lock.release.assert_called_once()
 
+    @patch('corehq.motech.repeaters.tasks.RepeaterLock')
+    @patch('corehq.motech.repeaters.tasks.Repeater.objects.get')
+    def test_update_repeater_resets_backoff_on_batch_success(self, mock_get_repeater, __):
+        repeat_record_states = [[State.Fail, State.Success], [None, State.Fail]]
+        mock_repeater = MagicMock()
+        mock_get_repeater.return_value = mock_repeater
+        update_repeater(repeat_record_states, 1, 'token', False)
+
+        mock_repeater.set_backoff.assert_not_called()
+        mock_repeater.reset_backoff.assert_called_once()
+
+    @patch('corehq.motech.repeaters.tasks.RepeaterLock')
+    @patch('corehq.motech.repeaters.tasks.Repeater.objects.get')
+    def test_update_repeater_backs_off_on_batch_failure(self, mock_get_repeater, __):
+        repeat_record_states = [[State.Fail, State.Fail], [None]]
+        mock_repeater = MagicMock()
+        mock_get_repeater.return_value = mock_repeater
+        update_repeater(repeat_record_states, 1, 'token', False)
+
+        mock_repeater.set_backoff.assert_called_once()
+        mock_repeater.reset_backoff.assert_not_called()
+
     @patch('corehq.motech.repeaters.tasks.RepeaterLock')
     @patch('corehq.motech.repeaters.tasks.Repeater.objects.get')
     def test_update_repeater_does_nothing_on_empty(self, mock_get_repeater, __):
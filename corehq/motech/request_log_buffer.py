@@ -0,0 +1,146 @@
+"""
+A write-behind buffer for ``RequestLog`` records.
+
+``RequestLog.log()`` inserts a row for every request sent to a remote
+API, on the request path. With the ``MOTECH_BUFFERED_REQUEST_LOGS``
+toggle enabled for a domain, its request logs are added to a buffer in
+memory instead, and a background thread saves them with
+``bulk_create()`` every ``flush_interval`` seconds, or as soon as
+``batch_size`` logs are waiting.
+
+The buffer holds at most ``max_size`` logs. When it is full, logs are
+saved immediately, the way they are without the buffer, so they are
+never dropped. Logs left in the buffer are saved when the process (or
+the Celery worker process) shuts down.
+
+A request log's timestamp is set when it is saved, so it can be up to
+``flush_interval`` seconds later than the request.
+"""
+import atexit
+import logging
+import os
+import queue
+import threading
+
+from django.db import close_old_connections
+
+from celery.signals import worker_process_shutdown
+
+from corehq.motech.models import RequestLog
+from corehq.util.metrics import metrics_counter
+
+FLUSH_INTERVAL_SECONDS = 5
+FLUSH_BATCH_SIZE = 100
+# Request and response bodies are truncated to MAX_REQUEST_LOG_LENGTH,
+# but most are a few KB
+MAX_BUFFERED_LOGS = 1000
+
+logger = logging.getLogger(__name__)
+
+
+class RequestLogBuffer:
+
+    def __init__(
+        self,
+        batch_size=FLUSH_BATCH_SIZE,
+        flush_interval=FLUSH_INTERVAL_SECONDS,
+        max_size=MAX_BUFFERED_LOGS,
+    ):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_size = max_size
+        self._reset()
+
+    def add(self, request_log):
+        """
+        Adds an unsaved ``RequestLog`` to the buffer, or saves it if the
+        buffer is full.
+        """
+        try:
+            self._queue.put_nowait(request_log)
+        except queue.Full:
+            metrics_counter('commcare.motech.request_log_buffer.full')
+            request_log.save(force_insert=True)
+            return
+        self._ensure_started()
+        if self._queue.qsize() >= self.batch_size:
+            self._wake.set()
+
+    def flush(self):
+        """
+        Saves all the logs in the buffer.
+        """
+        # The lock ensures that logs taken from the queue by the
+        # background thread are saved before flush() returns
+        with self._flush_lock:
+            while True:
+                batch = []
+                while len(batch) < self.batch_size:
+                    try:
+                        batch.append(self._queue.get_nowait())
+                    except queue.Empty:
+                        break
+                if not batch:
+                    return
+                self._save(batch)
+
+    def _save(self, batch):
+        try:
+            RequestLog.objects.bulk_create(batch)
+        except Exception:
+            logger.exception('Failed to save %s request logs', len(batch))
+            metrics_counter('commcare.motech.request_log_buffer.errors')
+        else:
+            metrics_counter('commcare.motech.request_log_buffer.saved', len(batch))
+
+    def _ensure_started(self):
+        if self._thread is not None:
+            return
+        with self._start_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run,
+                    name='request-log-buffer',
+                    daemon=True,
+                )
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            try:
+                self.flush()
+            finally:
+                close_old_connections()
+
+    def _reset(self):
+        # Also called in a forked child process, which does not inherit
+        # the background thread, and must not save its parent's logs
+        self._queue = queue.Queue(maxsize=self.max_size)
+        self._wake = threading.Event()
+        self._flush_lock = threading.Lock()
+        self._start_lock = threading.Lock()
+        self._thread = None
+
+
+request_log_buffer = RequestLogBuffer()
+
+
+def buffered_request_log(level, log_entry):
+    """
+    A logger for ``corehq.motech.requests.Requests`` that adds request
+    logs to ``request_log_buffer``.
+    """
+    request_log_buffer.add(RequestLog.from_entry(level, log_entry))
+
+
+@worker_process_shutdown.connect
+def flush_request_log_buffer(**kwargs):
+    request_log_buffer.flush()
+
+
+# Celery worker child processes exit without calling atexit handlers,
+# so flushing on shutdown needs both
+atexit.register(request_log_buffer.flush)
+os.register_at_fork(after_in_child=request_log_buffer._reset)
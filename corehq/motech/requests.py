@@ -20,12 +20,17 @@ from corehq.motech.const import (
     REQUEST_TIMEOUT,
 )
 from corehq.motech.models import RequestLog, RequestLogEntry
+from corehq.motech.sessions import session_pool
 from corehq.motech.utils import (
     get_endpoint_url,
     pformat_json,
     unpack_request_args,
 )
-from corehq.toggles import DECREASE_REPEATER_TIMEOUT
+from corehq.toggles import (
+    DECREASE_REPEATER_TIMEOUT,
+    MOTECH_BUFFERED_REQUEST_LOGS,
+    MOTECH_SESSION_POOL,
+)
 from corehq.util.metrics import metrics_counter
 from corehq.util.timer import TimingContext
 from corehq.util.urlvalidate.urlvalidate import (
@@ -82,6 +87,13 @@ def log_request(self, func, logger):
     return request_wrapper
 
 
+def _get_default_logger(domain_name):
+    if MOTECH_BUFFERED_REQUEST_LOGS.enabled(domain_name):
+        from corehq.motech.request_log_buffer import buffered_request_log
+        return buffered_request_log
+    return RequestLog.log
+
+
 class Requests(object):
     """
     Wraps the requests library to simplify use with JSON REST APIs.
@@ -91,6 +103,10 @@ class Requests(object):
 
     To maintain a session of authenticated non-API requests, use
     Requests as a context manager.
+
+    Outside a context manager, requests use a pooled session if
+    ``session_key`` is given and the ``MOTECH_SESSION_POOL`` toggle is
+    enabled for the domain, otherwise a new session.
     """
 
     def __init__(
@@ -103,6 +119,7 @@ class Requests(object):
         notify_addresses: Optional[list] = None,
         payload_id: Optional[str] = None,
         logger: Optional[Callable] = None,
+        session_key: Optional[tuple] = None,
     ):
         """
         Initialise instance
@@ -118,6 +135,9 @@ class Requests(object):
             associated with this request
         :param logger: function called after a request has been sent:
                         `logger(log_level, log_entry: RequestLogEntry)`
+        :param session_key: Identifies sessions which can be shared by
+            requests made with the same domain and auth settings. See
+            ``ConnectionSettings.session_key``.
         """
         self.domain_name = domain_name
         self.base_url = base_url
@@ -125,7 +145,8 @@ class Requests(object):
         self.auth_manager = auth_manager
         self.notify_addresses = notify_addresses if notify_addresses else []
         self.payload_id = payload_id
-        self.logger = logger or RequestLog.log
+        self.logger = logger or _get_default_logger(domain_name)
+        self.session_key = session_key
         self.send_request = log_request(self, self.send_request_unlogged, self.logger)
         self._session = None
 
@@ -147,6 +168,9 @@ class Requests(object):
         kwargs.setdefault('timeout', request_timeout)
         if self._session:
             response = self._session.request(method, url, *args, **kwargs)
+        elif self.session_key is not None and MOTECH_SESSION_POOL.enabled(self.domain_name):
+            with session_pool.session(self.session_key, self.auth_manager, self.domain_name) as session:
+                response = session.request(method, url, *args, **kwargs)
         else:
             # Mimics the behaviour of requests.api.request()
             with self:
@@ -253,7 +277,8 @@ def parse_request_exception(err):
 
 
 def simple_request(domain, url, data, *, headers, auth_manager, verify,
-                   method="POST", notify_addresses=None, payload_id=None):
+                   method="POST", notify_addresses=None, payload_id=None,
+                   session_key=None):
     if isinstance(data, str):
         # Encode as UTF-8, otherwise requests will send data containing
         # non-ASCII characters as 'data:application/octet-stream;base64,...'
@@ -272,6 +297,7 @@ def simple_request(domain, url, data, *, headers, auth_manager, verify,
         auth_manager=auth_manager,
         notify_addresses=notify_addresses,
         payload_id=payload_id,
+        session_key=session_key,
     )
 
     request_methods = {
@@ -0,0 +1,108 @@
+"""
+A process-wide pool of ``requests.Session`` objects for remote APIs.
+
+Without the pool, every request sent outside a ``Requests`` context
+manager (including every repeat record sent by ``simple_request()``)
+uses a new session, so it opens a new connection, and OAuth 2.0 auth
+managers may fetch a new token for it.
+
+Sessions are pooled by a key that identifies the domain and the
+connection settings they were created for (see
+``ConnectionSettings.session_key``). A session is used by one request
+at a time: it is taken from the pool for the request and returned to it
+afterwards, keeping its open connections and auth token for the next
+request with the same key. Sessions that have been idle for longer than
+``max_idle`` seconds are closed, as are the least recently used sessions
+when there are more than ``max_size`` idle sessions.
+"""
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+
+from corehq.util.metrics import metrics_counter
+
+# Servers commonly close keep-alive connections after 60 seconds or more
+MAX_IDLE_SECONDS = 55
+MAX_IDLE_SESSIONS = 200
+
+
+class SessionPool:
+
+    def __init__(self, max_size=MAX_IDLE_SESSIONS, max_idle=MAX_IDLE_SECONDS):
+        self.max_size = max_size
+        self.max_idle = max_idle
+        self._lock = threading.Lock()
+        # (key, id(session)) -> (session, returned_at), least recently
+        # returned first
+        self._idle = OrderedDict()
+
+    @contextmanager
+    def session(self, key, auth_manager, domain_name):
+        """
+        Yields a session for ``key``, created by ``auth_manager`` if there
+        is no idle session for it which the auth manager can reuse.
+
+        The session is closed instead of returned to the pool if the
+        request raises an exception.
+        """
+        session = self._acquire(key, auth_manager)
+        if session is None:
+            metrics_counter('commcare.motech.session_pool', tags={'result': 'miss'})
+            session = auth_manager.get_session(domain_name)
+        else:
+            metrics_counter('commcare.motech.session_pool', tags={'result': 'hit'})
+        try:
+            yield session
+        except BaseException:
+            session.close()
+            raise
+        self._release(key, session)
+
+    def clear(self):
+        with self._lock:
+            sessions = [session for session, returned_at in self._idle.values()]
+            self._idle.clear()
+        for session in sessions:
+            session.close()
+
+    def _acquire(self, key, auth_manager):
+        to_close = []
+        session = None
+        with self._lock:
+            to_close.extend(self._pop_expired())
+            pool_keys = [pool_key for pool_key in reversed(self._idle) if pool_key[0] == key]
+            for pool_key in pool_keys:
+                candidate, returned_at = self._idle.pop(pool_key)
+                if auth_manager.is_session_reusable(candidate):
+                    session = candidate
+                    break
+                to_close.append(candidate)
+        for expired in to_close:
+            expired.close()
+        return session
+
+    def _release(self, key, session):
+        to_close = []
+        with self._lock:
+            self._idle[(key, id(session))] = (session, time.monotonic())
+            to_close.extend(self._pop_expired())
+            while len(self._idle) > self.max_size:
+                pool_key, (oldest, returned_at) = self._idle.popitem(last=False)
+                to_close.append(oldest)
+        for expired in to_close:
+            expired.close()
+
+    def _pop_expired(self):
+        expired = []
+        cutoff = time.monotonic() - self.max_idle
+        while self._idle:
+            pool_key, (session, returned_at) = next(iter(self._idle.items()))
+            if returned_at > cutoff:
+                break
+            del self._idle[pool_key]
+            expired.append(session)
+        return expired
+
+
+session_pool = SessionPool()
@@ -0,0 +1,91 @@
+import logging
+from unittest.mock import MagicMock, patch
+
+from django.test import SimpleTestCase, TestCase
+
+from corehq.motech.models import RequestLog, RequestLogEntry
+from corehq.motech.request_log_buffer import (
+    RequestLogBuffer,
+    buffered_request_log,
+)
+from corehq.motech.requests import Requests
+from corehq.util.test_utils import flag_enabled
+
+DOMAIN = 'test-domain'
+
+
+def _get_request_log(payload_id='c0ffee'):
+    entry = RequestLogEntry(
+        domain=DOMAIN,
+        payload_id=payload_id,
+        method='POST',
+        url='https://example.com/api/',
+        headers={},
+        params={},
+        data='{"foo": "bar"}',
+        error='',
+        response_status=200,
+        response_headers={},
+        response_body='OK',
+        duration=10,
+    )
+    return RequestLog.from_entry(logging.INFO, entry)
+
+
+@patch.object(RequestLogBuffer, '_ensure_started')
+class RequestLogBufferTests(TestCase):
+
+    def test_flush(self, _):
+        buffer = RequestLogBuffer(batch_size=2)
+        for i in range(3):
+            buffer.add(_get_request_log(f'payload{i}'))
+        self.assertEqual(RequestLog.objects.filter(domain=DOMAIN).count(), 0)
+
+        with self.assertNumQueries(2):
+            buffer.flush()
+        self.assertEqual(
+            sorted(RequestLog.objects.filter(domain=DOMAIN).values_list('payload_id', flat=True)),
+            ['payload0', 'payload1', 'payload2'],
+        )
+
+    def test_flush_empty(self, _):
+        buffer = RequestLogBuffer()
+        with self.assertNumQueries(0):
+            buffer.flush()
+
+    def test_full_buffer_saves_immediately(self, _):
+        buffer = RequestLogBuffer(max_size=1)
+        buffer.add(_get_request_log('payload0'))
+        buffer.add(_get_request_log('payload1'))
+        self.assertEqual(
+            list(RequestLog.objects.filter(domain=DOMAIN).values_list('payload_id', flat=True)),
+            ['payload1'],
+        )
+        buffer.flush()
+        self.assertEqual(RequestLog.objects.filter(domain=DOMAIN).count(), 2)
+
+    def test_wake_at_batch_size(self, _):
+        buffer = RequestLogBuffer(batch_size=2)
+        buffer.add(_get_request_log())
+        self.assertFalse(buffer._wake.is_set())
+        buffer.add(_get_request_log())
+        self.assertTrue(buffer._wake.is_set())
+
+    def test_reset_after_fork(self, _):
+        buffer = RequestLogBuffer()
+        buffer.add(_get_request_log())
+        buffer._reset()
+        buffer.flush()
+        self.assertEqual(RequestLog.objects.filter(domain=DOMAIN).count(), 0)
+
+
+class RequestsLoggerTests(SimpleTestCase):
+
+    def test_default_logger(self):
+        requests = Requests(DOMAIN, 'https://example.com/api/', auth_manager=MagicMock())
+        self.assertEqual(requests.logger, RequestLog.log)
+
+    @flag_enabled('MOTECH_BUFFERED_REQUEST_LOGS')
+    def test_buffered_logger(self):
+        requests = Requests(DOMAIN, 'https://example.com/api/', auth_manager=MagicMock())
+        self.assertIs(requests.logger, buffered_request_log)
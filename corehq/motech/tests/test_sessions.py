@@ -0,0 +1,147 @@
+import time
+from unittest.mock import MagicMock, patch
+
+from django.test import SimpleTestCase
+
+from corehq.motech.auth import AuthManager, OAuth2ClientGrantManager
+from corehq.motech.requests import Requests
+from corehq.motech.sessions import SessionPool
+from corehq.util.test_utils import flag_enabled
+
+DOMAIN = 'test-domain'
+KEY = (DOMAIN, 1, 'abc123')
+
+
+def _get_auth_manager():
+    auth_manager = AuthManager()
+    auth_manager.get_session = MagicMock(side_effect=lambda domain_name: MagicMock())
+    return auth_manager
+
+
+class SessionPoolTests(SimpleTestCase):
+
+    def test_reuse_session(self):
+        pool = SessionPool()
+        auth_manager = _get_auth_manager()
+        with pool.session(KEY, auth_manager, DOMAIN) as session1:
+            pass
+        with pool.session(KEY, auth_manager, DOMAIN) as session2:
+            pass
+        self.assertIs(session1, session2)
+        auth_manager.get_session.assert_called_once_with(DOMAIN)
+        session1.close.assert_not_called()
+
+    def test_sessions_not_shared_by_keys(self):
+        pool = SessionPool()
+        auth_manager = _get_auth_manager()
+        with pool.session(KEY, auth_manager, DOMAIN) as session1:
+            pass
+        with pool.session((DOMAIN, 2, 'abc123'), auth_manager, DOMAIN) as session2:
+            pass
+        self.assertIsNot(session1, session2)
+
+    def test_session_in_use_not_shared(self):
+        pool = SessionPool()
+        auth_manager = _get_auth_manager()
+        with pool.session(KEY, auth_manager, DOMAIN) as session1:
+            with pool.session(KEY, auth_manager, DOMAIN) as session2:
+                self.assertIsNot(session1, session2)
+
+    def test_close_session_after_error(self):
+        pool = SessionPool()
+        auth_manager = _get_auth_manager()
+        with self.assertRaises(ValueError):
+            with pool.session(KEY, auth_manager, DOMAIN) as session1:
+                raise ValueError
+        session1.close.assert_called_once_with()
+        with pool.session(KEY, auth_manager, DOMAIN) as session2:
+            pass
+        self.assertIsNot(session1, session2)
+
+    def test_evict_idle_sessions(self):
+        pool = SessionPool(max_idle=60)
+        auth_manager = _get_auth_manager()
+        with pool.session(KEY, auth_manager, DOMAIN) as session1:
+            pass
+        later = time.monotonic() + 61
+        with patch('corehq.motech.sessions.time.monotonic', return_value=later):
+            with pool.session(KEY, auth_manager, DOMAIN) as session2:
+                pass
+        session1.close.assert_called_once_with()
+        self.assertIsNot(session1, session2)
+
+    def test_max_size(self):
+        pool = SessionPool(max_size=1)
+        auth_manager = _get_auth_manager()
+        with pool.session(KEY, auth_manager, DOMAIN) as session1:
+            pass
+        with pool.session((DOMAIN, 2, 'abc123'), auth_manager, DOMAIN) as session2:
+            pass
+        session1.close.assert_called_once_with()
+        session2.close.assert_not_called()
+
+    def test_expired_oauth2_token_not_reused(self):
+        pool = SessionPool()
+        auth_manager = OAuth2ClientGrantManager(
+            'https://example.com/api/',
+            client_id='client',
+            client_secret='secret',
+            token_url='https://example.com/token',
+            refresh_url=None,
+            pass_credentials_in_header=False,
+            include_client_id=False,
+            scope=None,
+            connection_settings=MagicMock(),
+        )
+        sessions = [MagicMock(token={'expires_at': time.time() + 5}), MagicMock(token={})]
+        with patch.object(auth_manager, 'get_session', side_effect=sessions):
+            with pool.session(KEY, auth_manager, DOMAIN) as session1:
+                pass
+            with pool.session(KEY, auth_manager, DOMAIN) as session2:
+                pass
+        self.assertIs(session2, sessions[1])
+        session1.close.assert_called_once_with()
+
+    def test_older_session_reused_if_newer_is_not_reusable(self):
+        pool = SessionPool()
+        auth_manager = _get_auth_manager()
+        with pool.session(KEY, auth_manager, DOMAIN) as session1:
+            with pool.session(KEY, auth_manager, DOMAIN) as session2:
+                pass
+        # session1 was returned last, so it is tried first
+        with patch.object(auth_manager, 'is_session_reusable', side_effect=lambda s: s is session2):
+            with pool.session(KEY, auth_manager, DOMAIN) as session3:
+                pass
+        self.assertIs(session3, session2)
+        session1.close.assert_called_once_with()
+        session2.close.assert_not_called()
+
+    def test_no_idle_session_is_reusable(self):
+        pool = SessionPool()
+        auth_manager = _get_auth_manager()
+        with pool.session(KEY, auth_manager, DOMAIN) as session1:
+            with pool.session(KEY, auth_manager, DOMAIN) as session2:
+                pass
+        with patch.object(auth_manager, 'is_session_reusable', return_value=False):
+            with pool.session(KEY, auth_manager, DOMAIN) as session3:
+                pass
+        self.assertNotIn(session3, [session1, session2])
+        session1.close.assert_called_once_with()
+        session2.close.assert_called_once_with()
+
+
+class RequestsSessionPoolTests(SimpleTestCase):
+
+    def test_uses_session_pool(self):
+        auth_manager = _get_auth_manager()
+        requests = Requests(
+            DOMAIN, 'https://example.com/api/',
+            auth_manager=auth_manager,
+            logger=MagicMock(),
+            session_key=KEY,
+        )
+        with patch('corehq.motech.requests.session_pool', SessionPool()), \
+                flag_enabled('MOTECH_SESSION_POOL'):
+            requests.get('me')
+            requests.get('me')
+        auth_manager.get_session.assert_called_once_with(DOMAIN)
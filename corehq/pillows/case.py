@@ -8,12 +8,16 @@ from pillowtop.checkpoints.manager import (
 )
 from pillowtop.const import DEFAULT_PROCESSOR_CHUNK_SIZE
 from pillowtop.pillow.interface import ConstructedPillow
+from pillowtop.processors import PillowProcessor
 from pillowtop.processors.elastic import BulkElasticProcessor, ElasticProcessor
 from pillowtop.reindexer.reindexer import (
     ReindexerFactory,
     ResumableBulkElasticPillowReindexer,
 )
 
+from casexml.apps.phone.data_providers.case.closure import invalidate_case_closures
+
+from corehq import toggles
 from corehq.apps.change_feed.consumer.feed import (
     KafkaChangeFeed,
     KafkaCheckpointEventHandler,
@@ -79,15 +83,20 @@ def get_case_pillow(
     processor_chunk_size=DEFAULT_PROCESSOR_CHUNK_SIZE,
     topics=None,
     dedicated_migration_process=False,
+    concurrent_batch_processing=False,
     **kwargs,
 ):
     """Return a pillow that processes cases. The processors include, UCR and elastic processors
 
+    Set ``concurrent_batch_processing`` (in the pillow ``params`` setting) to
+    run the batch processors concurrently on each chunk of changes.
+
     Processors:
       - :py:class:`corehq.apps.userreports.pillow.ConfigurableReportPillowProcessor` (disabled when skip_ucr=True)
       - :py:class:`pillowtop.processors.elastic.BulkElasticProcessor`
       - :py:func:`corehq.pillows.case_search.get_case_search_processor`
       - :py:class:`corehq.messaging.pillow.CaseMessagingSyncProcessor`
+      - :py:class:`corehq.pillows.case.CaseClosureIndexProcessor`
     """
     if topics:
         assert set(topics).issubset(CASE_TOPICS), "This is a pillow to process cases only"
@@ -130,6 +139,8 @@ def get_case_pillow(
         processors.append(case_search_processor)
     if settings.RUN_DEDUPLICATION_PILLOW:
         processors.append(CaseDeduplicationProcessor())
+    if settings.RUN_CASE_CLOSURE_INDEX_PILLOW:
+        processors.append(CaseClosureIndexProcessor())
     if not skip_ucr:
         # this option is useful in tests to avoid extra UCR setup where unneccessary
         processors = [ucr_processor, ucr_dr_processor] + processors
@@ -141,10 +152,44 @@ def get_case_pillow(
         processor=processors,
         processor_chunk_size=processor_chunk_size,
         process_num=process_num,
-        is_dedicated_migration_process=dedicated_migration_process and run_migrations
+        is_dedicated_migration_process=dedicated_migration_process and run_migrations,
+        concurrent_batch_processing=concurrent_batch_processing,
     )
 
 
+class CaseClosureIndexProcessor(PillowProcessor):
+    """Invalidates livequery case closures that include changed cases
+
+    See :py:mod:`casexml.apps.phone.data_providers.case.closure`
+
+    Reads from:
+      - Case data source
+
+    Writes to:
+      - Redis (closure generation counters)
+    """
+
+    def process_change(self, change):
+        domain = change.metadata.domain
+        if not domain or not toggles.LIVEQUERY_CLOSURE_INDEX.enabled(domain):
+            return
+        if is_couch_change_for_sql_domain(change):
+            return
+
+        case_ids = {change.id}
+        owner_ids = set()
+        case = None if change.deleted else change.get_document()
+        if case:
+            if case.get('owner_id'):
+                owner_ids.add(case['owner_id'])
+            case_ids.update(
+                index['referenced_id']
+                for index in case.get('indices', [])
+                if index.get('referenced_id')
+            )
+        invalidate_case_closures(domain, case_ids, owner_ids)
+
+
 class SqlCaseReindexerFactory(ReindexerFactory):
     slug = 'sql-case'
     arg_contributors = [
@@ -1,3 +1,6 @@
+import threading
+from contextlib import contextmanager
+
 from django.core.mail import mail_admins
 from django.db import ProgrammingError
 
@@ -32,8 +35,9 @@ from pillowtop.checkpoints.manager import (
 )
 from pillowtop.es_utils import initialize_index_and_mapping
 from pillowtop.feed.interface import Change
+from pillowtop.logger import pillow_logging
 from pillowtop.pillow.interface import ConstructedPillow
-from pillowtop.processors.elastic import ElasticProcessor
+from pillowtop.processors.elastic import BulkElasticProcessor
 from pillowtop.reindexer.change_providers.case import (
     get_domain_case_change_provider,
 )
@@ -42,9 +46,17 @@ from pillowtop.reindexer.reindexer import (
     ReindexerFactory,
     ResumableBulkElasticPillowReindexer,
 )
+from pillowtop.utils import (
+    ErrorCollector,
+    build_bulk_payload,
+    bulk_fetch_changes_docs,
+    get_errors_with_ids,
+)
 
 _assert_string_property = soft_assert(to='{}@{}.com'.format('cellowitz', 'dimagi'), notify_admins=True)
 
+_chunk_local = threading.local()
+
 
 def _domains_needing_search_index():
     # This is only used by the reindexer now, so we don't need to cache it for performance.
@@ -91,10 +103,34 @@ def _add_smart_types(dynamic_properties, domain, case_type):
     # Properties are stored in a dict like {"key": "dob", "value": "1900-01-01"}
     # `value` is a multi-field property that duck types numeric and date values
     # We can't do that for properties like geo_points in ES v2, as `ignore_malformed` is broken
+    cache = getattr(_chunk_local, 'gps_properties', None)
+    if cache is None:
+        gps_props = _get_all_gps_properties(domain, case_type)
+    else:
+        try:
+            gps_props = cache[(domain, case_type)]
+        except KeyError:
+            gps_props = cache[(domain, case_type)] = _get_all_gps_properties(domain, case_type)
+    _add_gps_smart_types(dynamic_properties, gps_props)
+
+
+def _get_all_gps_properties(domain, case_type):
     gps_props = set({get_geo_case_property(domain)})
     if domain_has_privilege(domain, DATA_DICTIONARY):
         gps_props |= get_gps_properties(domain, case_type)
-    _add_gps_smart_types(dynamic_properties, gps_props)
+    return gps_props
+
+
+@contextmanager
+def _share_gps_properties():
+    """Look up the GPS properties of each domain and case type only once
+    while transforming a chunk of cases for the current thread
+    """
+    _chunk_local.gps_properties = {}
+    try:
+        yield
+    finally:
+        del _chunk_local.gps_properties
 
 
 def _add_gps_smart_types(dynamic_properties, gps_props):
@@ -107,7 +143,21 @@ def _add_gps_smart_types(dynamic_properties, gps_props):
                 prop[GEOPOINT_VALUE] = None
 
 
-class CaseSearchPillowProcessor(ElasticProcessor):
+class CaseSearchPillowProcessor(BulkElasticProcessor):
+    """Transforms cases for domains that use case search and inserts them
+    into the case search index.
+
+    Chunks of changes are indexed with one bulk request. Changes that fail
+    to be fetched, transformed or indexed, as well as deletions (which also
+    need to be removed from the domain's sub index), are returned to the
+    pillow to be reprocessed one at a time.
+
+    Reads from:
+      - Case data source
+
+    Writes to:
+      - Case Search ES index
+    """
 
     def process_change(self, change):
         assert isinstance(change, Change)
@@ -124,6 +174,58 @@ class CaseSearchPillowProcessor(ElasticProcessor):
         if domain and domain_needs_search_index(domain):
             super(CaseSearchPillowProcessor, self).process_change(change)
 
+    def process_changes_chunk(self, changes_chunk):
+        retry_changes = []
+        changes_to_fetch = []
+        for change in changes_chunk:
+            if self.change_filter_fn and self.change_filter_fn(change):
+                continue
+            if change.metadata is None:
+                retry_changes.append(change)
+            elif change.metadata.domain and domain_needs_search_index(change.metadata.domain):
+                changes_to_fetch.append(change)
+
+        with self._datadog_timing('bulk_extract'):
+            bad_changes, _ = bulk_fetch_changes_docs(changes_to_fetch)
+        retry_changes.extend(bad_changes)
+
+        with self._datadog_timing('bulk_transform'):
+            changes_to_process = {}
+            for change in changes_to_fetch:
+                if change in bad_changes:
+                    continue
+                if self._is_deletion(change):
+                    retry_changes.append(change)
+                elif not self.doc_filter_fn(change.document):
+                    changes_to_process[change.id] = change
+            error_collector = ErrorCollector()
+            es_actions = build_bulk_payload(list(changes_to_process.values()), error_collector)
+            retry_changes.extend(error.change for error in error_collector.errors)
+
+        if not es_actions:
+            return retry_changes, []
+
+        try:
+            with self._datadog_timing('bulk_load'), _share_gps_properties():
+                _, errors = self.adapter.bulk(es_actions, raise_errors=False)
+        except Exception as e:
+            pillow_logging.exception("Elastic bulk error: %s", e)
+            retry_changes.extend(changes_to_process.values())
+        else:
+            failed_ids = {change_id for change_id, error in get_errors_with_ids(errors)}
+            retry_changes.extend(changes_to_process[change_id] for change_id in failed_ids)
+        return retry_changes, []
+
+    @staticmethod
+    def _is_deletion(change):
+        from corehq.apps.change_feed.document_types import (
+            get_doc_meta_object_from_document,
+        )
+        doc = change.document
+        if doc.get('doc_type'):
+            return get_doc_meta_object_from_document(doc).is_deletion
+        return change.deleted
+
 
 def get_case_search_processor():
     """Case Search
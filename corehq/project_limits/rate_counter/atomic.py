@@ -0,0 +1,188 @@
+"""
+Checks and increments all the rate counters of a rate limiter in one
+round trip to Redis
+
+A rate limiter has a `SlidingWindowRateCounter` for each window of each
+of its scopes, and each of those reads several grains. Read one at a
+time, every grain that is not memoized locally costs a round trip to
+Redis. Incrementing the counters after checking them costs another round
+trip for each counter, and leaves a gap in which other processes can use
+the same capacity.
+
+`check_and_increment` sends the keys of all the grains to a Lua script,
+which reads them, decides whether usage is allowed, and if it is,
+increments the current grain of every counter, all atomically.
+
+Memoized grain counts are still used: if every grain is memoized and
+nothing needs to be incremented, Redis is not called. Counts read by the
+script are memoized the same way that `CounterCache.get` memoizes them.
+"""
+import json
+import time
+
+# KEYS: the grain keys of each counter, starting with its current grain
+# ARGV[1]: how much to increment the current grain of each counter by
+# ARGV[2]: '1' to increment only if usage is allowed, otherwise '0'
+# ARGV[3]: JSON list of scopes, each a list of counters, each
+#          [number of grains, limit, weight of earliest grain, timeout]
+#
+# Returns 1 if usage is allowed, otherwise 0, and the counts of the
+# grains from before they were incremented.
+CHECK_AND_INCREMENT_SCRIPT = """
+local delta = tonumber(ARGV[1])
+local enforce = ARGV[2] == '1'
+local scopes = cjson.decode(ARGV[3])
+local counts = redis.call('MGET', unpack(KEYS))
+
+local allowed = false
+local offset = 0
+for _, counters in ipairs(scopes) do
+    local scope_allowed = true
+    for _, counter in ipairs(counters) do
+        local n_grains = counter[1]
+        local rate = 0
+        for i = 1, n_grains do
+            local count = tonumber(counts[offset + i]) or 0
+            if i == n_grains then
+                count = count * counter[3]
+            end
+            rate = rate + count
+        end
+        if rate >= counter[2] then
+            scope_allowed = false
+        end
+        offset = offset + n_grains
+    end
+    if scope_allowed then
+        allowed = true
+    end
+end
+
+if delta ~= 0 and (allowed or not enforce) then
+    offset = 0
+    for _, counters in ipairs(scopes) do
+        for _, counter in ipairs(counters) do
+            local key = KEYS[offset + 1]
+            if redis.call('INCRBY', key, delta) == delta then
+                redis.call('EXPIRE', key, counter[4])
+            end
+            offset = offset + counter[1]
+        end
+    end
+end
+
+return {allowed and 1 or 0, counts}
+"""
+
+
+def check_and_increment(scoped_limits, delta=1, enforce=True, timestamp=None):
+    """
+    Checks whether usage is allowed, and increments every counter by `delta`
+    if it is. Usage is allowed if all the counters of any scope are below
+    their limits.
+
+    :param scoped_limits: A list of (counter scope, [(rate_counter, limit), ...])
+        for `SlidingWindowRateCounter` rate counters
+    :param delta: How much to increment each counter by. Use 0 to only check.
+    :param enforce: If False, counters are incremented even if usage is not allowed
+    :return: A tuple of whether usage is allowed, and a list of
+        (counter scope, [(rate_counter, current rate, limit), ...])
+        with the rates from before the counters were incremented
+    """
+    if timestamp is None:
+        timestamp = time.time()
+    scopes = [
+        (counter_scope, [
+            (rate_counter, limit, rate_counter.get_grains(counter_scope, timestamp))
+            for rate_counter, limit in limits
+        ])
+        for counter_scope, limits in scoped_limits
+    ]
+    counts = _get_memoized_counts(scopes)
+    if counts is not None:
+        allowed, rates = _get_rates(scopes, counts)
+        if not delta or (enforce and not allowed):
+            return allowed, rates
+
+    allowed, counts = _run_script(scopes, delta, enforce)
+    incremented = bool(delta) and (allowed or not enforce)
+    _memoize_counts(scopes, counts, delta if incremented else 0)
+    __, rates = _get_rates(scopes, counts)
+    return allowed, rates
+
+
+def _iter_counters(scopes):
+    for __, counters in scopes:
+        yield from counters
+
+
+def _get_memoized_counts(scopes):
+    """
+    Returns a dict of the counts of all the grains, or None if any of
+    them is not memoized
+    """
+    counts = {}
+    for rate_counter, __, grains in _iter_counters(scopes):
+        keys = [key for key, __ in grains]
+        memoized = rate_counter.grain_counter.counter.get_memoized(keys)
+        if len(memoized) < len(keys):
+            return None
+        counts.update(memoized)
+    return counts
+
+
+def _get_rates(scopes, counts):
+    allowed = False
+    rates = []
+    for counter_scope, counters in scopes:
+        scope_rates = [
+            (rate_counter, sum(counts[key] * weight for key, weight in grains), limit)
+            for rate_counter, limit, grains in counters
+        ]
+        if all(current_rate < limit for __, current_rate, limit in scope_rates):
+            allowed = True
+        rates.append((counter_scope, scope_rates))
+    return allowed, rates
+
+
+def _run_script(scopes, delta, enforce):
+    """
+    Returns whether usage is allowed, and a dict of the counts of all
+    the grains from before they were incremented
+    """
+    counters = list(_iter_counters(scopes))
+    if not counters:
+        allowed, __ = _get_rates(scopes, {})
+        return allowed, {}
+
+    shared_cache = counters[0][0].grain_counter.counter.shared_cache
+    keys = [key for __, __, grains in counters for key, __ in grains]
+    args = [
+        delta,
+        1 if enforce else 0,
+        json.dumps([
+            [
+                [len(grains), limit, grains[-1][1], rate_counter.grain_counter.counter.timeout]
+                for rate_counter, limit, grains in counters
+            ]
+            for __, counters in scopes
+        ]),
+    ]
+    client = shared_cache.client.get_client(write=True)
+    script = client.register_script(CHECK_AND_INCREMENT_SCRIPT)
+    allowed, values = script(keys=[shared_cache.client.make_key(key) for key in keys], args=args)
+    counts = {
+        key: int(value) if value is not None else 0
+        for key, value in zip(keys, values)
+    }
+    return bool(allowed), counts
+
+
+def _memoize_counts(scopes, counts, delta):
+    for rate_counter, __, grains in _iter_counters(scopes):
+        counter_cache = rate_counter.grain_counter.counter
+        for i, (key, __) in enumerate(grains):
+            if i == 0:
+                counter_cache.memoize(key, counts[key] + delta, key_is_active=True)
+            else:
+                counter_cache.memoize(key, counts[key], key_is_active=False)
@@ -71,6 +71,22 @@ class SlidingWindowRateCounter(AbstractRateCounter):
         contribution_from_earliest = earliest_grain_count * (1 - progress_in_current_grain)
         return sum(counts) + contribution_from_earliest
 
+    def get_grains(self, scope, timestamp=None):
+        """
+        Returns a list of (cache key, weight) for each grain that `get` reads,
+        starting with the current grain
+
+        `get` is the sum of the count of each grain times its weight.
+        """
+        if timestamp is None:
+            timestamp = time.time()
+        progress_in_current_grain = (timestamp % self.grain_duration) / self.grain_duration
+        return [
+            (self.grain_counter._cache_key(scope, timestamp - i * self.grain_duration),
+             1 if i < self.grains_per_window else 1 - progress_in_current_grain)
+            for i in range(self.grains_per_window + 1)
+        ]
+
     def retry_after(self):
         """Calculates the time (in seconds) left in the current grain"""
         timestamp = time.time()
@@ -154,10 +170,19 @@ class CounterCache(object):
         :param key_is_active: Whether you believe the key is being actively updated
             If not, then use the longer timeout for local memory cache as well.
         """
-        local_timeout = self.memoized_timeout if key_is_active else self.timeout
         value = self.local_cache.get(key, default=None)
         if value is None:
             value = self.shared_cache.get(key, default=0)
-            self.local_cache.set(key, value, timeout=local_timeout)
+            self.memoize(key, value, key_is_active=key_is_active)
         assert value is not None
         return value
+
+    def get_memoized(self, keys):
+        """
+        Returns a dict of the values of `keys` that are memoized in the local cache
+        """
+        return self.local_cache.get_many(keys)
+
+    def memoize(self, key, value, key_is_active=True):
+        local_timeout = self.memoized_timeout if key_is_active else self.timeout
+        self.local_cache.set(key, value, timeout=local_timeout)
@@ -5,6 +5,7 @@ import attr
 
 from corehq.apps.users.models import CommCareUser, WebUser
 from corehq.project_limits.models import DynamicRateDefinition
+from corehq.project_limits.rate_counter.atomic import check_and_increment
 from corehq.project_limits.rate_counter.presets import (
     day_rate_counter,
     hour_rate_counter,
@@ -28,15 +29,18 @@ class RateLimiter(object):
     ...     # ...do stuff...
     ...     my_feature_rate_limiter.report_usage('my_domain')
 
+    or, to check and report usage atomically:
+
+    >>> if my_feature_rate_limiter.allow_and_report_usage('my_domain'):
+    ...     # ...do stuff...
+
     """
     def __init__(self, feature_key, get_rate_limits):
         self.feature_key = feature_key
         self.get_rate_limits = get_rate_limits
 
     def report_usage(self, scope='', delta=1):
-        for limit_scope, limits in self.get_rate_limits(scope):
-            for rate_counter, limit in limits:
-                rate_counter.increment(self.feature_key + limit_scope, delta=delta)
+        self._check_and_increment(scope, delta=delta, enforce=False)
 
     def get_window_of_first_exceeded_limit(self, scope=''):
         for _limit_scope, rates in self.iter_rates(scope):
@@ -47,16 +51,27 @@ class RateLimiter(object):
         return None
 
     def allow_usage(self, scope=''):
-        allowed = False
+        return self._check_and_increment(scope, delta=0)
+
+    def allow_and_report_usage(self, scope='', delta=1):
+        """
+        Like `allow_usage` followed by `report_usage` if usage is allowed,
+        but atomic, so that other processes cannot use the same capacity
+        in between
+        """
+        return self._check_and_increment(scope, delta=delta)
+
+    def _check_and_increment(self, scope, delta, enforce=True):
         # allow usage if any scope has capacity
-        for _limit_scope, rates in self.iter_rates(scope):
-            allow = all(current_rate < limit
-                        for _rate_counter, current_rate, limit in rates)
-            # for each scope all counters must be below threshold
-            if allow:
-                allowed = True
-            else:
-                metrics_counter('commcare.rate_limit_exceeded', tags={'key': self.feature_key, 'scope': scope})
+        allowed, scoped_rates = check_and_increment([
+            (self.feature_key + limit_scope, limits)
+            for limit_scope, limits in self.get_rate_limits(scope)
+        ], delta=delta, enforce=enforce)
+        if enforce:
+            for _counter_scope, rates in scoped_rates:
+                # for each scope all counters must be below threshold
+                if not all(current_rate < limit for _rate_counter, current_rate, limit in rates):
+                    metrics_counter('commcare.rate_limit_exceeded', tags={'key': self.feature_key, 'scope': scope})
         return allowed
 
     def get_retry_after(self, scope):
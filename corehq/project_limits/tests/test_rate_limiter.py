@@ -1,8 +1,12 @@
+import time
+import uuid
 from unittest.mock import Mock, patch
 
 from testil import eq
 
+from corehq.project_limits.rate_counter.atomic import check_and_increment
 from corehq.project_limits.rate_counter.presets import (
+    day_rate_counter,
     second_rate_counter,
     week_rate_counter,
 )
@@ -69,3 +73,42 @@ def test_get_window_of_first_exceeded_limit_priority():
     expected_window = 'week'
     actual_window = rate_limiter.get_window_of_first_exceeded_limit('my_domain')
     eq(actual_window, expected_window)
+
+
+def test_allow_and_report_usage():
+    rate_limiter = RateLimiter(f'test_feature_{uuid.uuid4().hex}', RateDefinition(per_week=3).get_rate_limits)
+    eq([rate_limiter.allow_and_report_usage() for __ in range(5)], [True, True, True, False, False])
+    eq(week_rate_counter.get(rate_limiter.feature_key), 3)
+
+
+def test_report_usage_beyond_limit():
+    rate_limiter = RateLimiter(f'test_feature_{uuid.uuid4().hex}', RateDefinition(per_week=3).get_rate_limits)
+    for __ in range(4):
+        rate_limiter.report_usage(delta=2)
+    eq(week_rate_counter.get(rate_limiter.feature_key), 8)
+    eq(rate_limiter.allow_usage(), False)
+
+
+def test_check_and_increment_rates():
+    feature_key = f'test_feature_{uuid.uuid4().hex}'
+    timestamp = time.time()
+    for i, rate_counter in enumerate([week_rate_counter, second_rate_counter]):
+        rate_counter.increment(feature_key, delta=i + 1, timestamp=timestamp - rate_counter.grain_duration)
+        rate_counter.increment(feature_key, delta=i + 1, timestamp=timestamp)
+    scoped_limits = [(feature_key, [(week_rate_counter, 100), (second_rate_counter, 100)])]
+
+    allowed, rates = check_and_increment(scoped_limits, delta=0, timestamp=timestamp)
+    eq(allowed, True)
+    eq(rates, [(feature_key, [
+        (week_rate_counter, week_rate_counter.get(feature_key, timestamp=timestamp), 100),
+        (second_rate_counter, second_rate_counter.get(feature_key, timestamp=timestamp), 100),
+    ])])
+
+
+def test_get_grains():
+    timestamp = time.time()
+    grains = day_rate_counter.get_grains('scope', timestamp=timestamp)
+    eq(len(grains), day_rate_counter.grains_per_window + 1)
+    eq(grains[0][0], day_rate_counter.grain_counter._cache_key('scope', timestamp))
+    progress_in_current_grain = (timestamp % day_rate_counter.grain_duration) / day_rate_counter.grain_duration
+    eq([weight for __, weight in grains], [1, 1, 1, 1, 1 - progress_in_current_grain])
@@ -20,3 +20,45 @@ class UnquotedValue(models.Value):
     This used for database keywords."""
     def as_sql(self, compiler, connection):
         return self.value, []
+
+
+class RowValueCompare(models.Expression):
+    """A row-value comparison, e.g. ``(domain, server_modified_on, id) > (%s, %s, %s)``
+
+    PostgreSQL compares row values column by column, so this selects the
+    rows that sort after (or before) the given values, and can use a
+    B-tree index on the same columns to find them.
+    See https://www.postgresql.org/docs/15/functions-comparisons.html#ROW-WISE-COMPARISON
+    """
+    output_field = models.BooleanField()
+
+    def __init__(self, fields, values, operator):
+        assert operator in ('<', '<=', '>', '>='), operator
+        assert len(fields) == len(values), (fields, values)
+        super().__init__()
+        self.operator = operator
+        self.columns = [models.F(field) for field in fields]
+        self.values = list(values)
+
+    def get_source_expressions(self):
+        return self.columns
+
+    def set_source_expressions(self, exprs):
+        self.columns = exprs
+
+    def as_sql(self, compiler, connection):
+        column_sql = []
+        value_sql = []
+        params = []
+        for column in self.columns:
+            sql, column_params = compiler.compile(column)
+            column_sql.append(sql)
+            params.extend(column_params)
+        for column, value in zip(self.columns, self.values):
+            # Prepare values like a lookup on their column would
+            value = models.Value(value, output_field=column.output_field)
+            sql, value_params = compiler.compile(value)
+            value_sql.append(sql)
+            params.extend(value_params)
+        sql = f"({', '.join(column_sql)}) {self.operator} ({', '.join(value_sql)})"
+        return sql, params
@@ -1,6 +1,16 @@
+import threading
+
+from django.db.models import Q
 from django.test import SimpleTestCase
 
-from corehq.sql_db.util import create_unique_index_name
+from corehq.form_processor.models import XFormInstance
+from corehq.sql_db.functions import RowValueCompare
+from corehq.sql_db.util import (
+    _after_key,
+    _get_sort_columns,
+    _iter_pages_in_parallel,
+    create_unique_index_name,
+)
 
 
 class TestCreateUniqueIndexName(SimpleTestCase):
@@ -42,3 +52,92 @@ class TestCreateUniqueIndexName(SimpleTestCase):
     def test_raises_error_if_fields_is_not_a_list(self):
         with self.assertRaises(AssertionError):
             create_unique_index_name('app', 'table', 'field_one')
+
+
+class TestGetSortColumns(SimpleTestCase):
+
+    def test_pk_appended(self):
+        sort_cols, descending = _get_sort_columns(XFormInstance, ('domain', 'received_on'))
+        self.assertEqual(sort_cols, ['domain', 'received_on', 'pk'])
+        self.assertFalse(descending)
+
+    def test_pk_not_appended_twice(self):
+        sort_cols, __ = _get_sort_columns(XFormInstance, ('received_on', 'id'))
+        self.assertEqual(sort_cols, ['received_on', 'id'])
+
+    def test_descending(self):
+        sort_cols, descending = _get_sort_columns(XFormInstance, ('-received_on', '-pk'))
+        self.assertEqual(sort_cols, ['received_on', 'pk'])
+        self.assertTrue(descending)
+
+    def test_mixed_directions(self):
+        with self.assertRaises(ValueError):
+            _get_sort_columns(XFormInstance, ('received_on', '-pk'))
+
+
+class TestAfterKey(SimpleTestCase):
+
+    def test_single_column(self):
+        self.assertEqual(_after_key(['pk'], (5,)), Q(pk__gt=5))
+        self.assertEqual(_after_key(['pk'], (5,), descending=True), Q(pk__lt=5))
+
+    def test_composite_key(self):
+        expr = _after_key(['domain', 'pk'], ('test', 5), descending=True)
+        self.assertIsInstance(expr, RowValueCompare)
+        self.assertEqual(expr.operator, '<')
+        self.assertEqual(expr.values, ['test', 5])
+
+
+class TestIterPagesInParallel(SimpleTestCase):
+
+    pages = {
+        'db1': [[(1, 'a'), (4, 'd')], [(7, 'g')]],
+        'db2': [[(2, 'b'), (5, 'e')]],
+        'db3': [[(3, 'c')], [(6, 'f'), (8, 'h')]],
+    }
+
+    def iter_pages(self, db_name):
+        yield from self.pages[db_name]
+
+    def test_ordered(self):
+        rows = list(_iter_pages_in_parallel(list(self.pages), self.iter_pages, ordered=True))
+        self.assertEqual(
+            rows,
+            [(1, 'a'), (2, 'b'), (3, 'c'), (4, 'd'), (5, 'e'), (6, 'f'), (7, 'g'), (8, 'h')],
+        )
+
+    def test_unordered(self):
+        rows = list(_iter_pages_in_parallel(list(self.pages), self.iter_pages, ordered=False))
+        self.assertEqual(sorted(rows), sorted(row for pages in self.pages.values() for page in pages
+                                              for row in page))
+
+    def test_no_databases(self):
+        self.assertEqual(list(_iter_pages_in_parallel([], self.iter_pages, ordered=False)), [])
+
+    def test_error(self):
+        def iter_pages(db_name):
+            if db_name == 'db2':
+                raise ValueError(db_name)
+            yield from self.pages[db_name]
+
+        with self.assertRaises(ValueError):
+            list(_iter_pages_in_parallel(list(self.pages), iter_pages, ordered=True))
+
+    def test_stop_early(self):
+        fetched = []
+        done = threading.Event()
+
+        def iter_pages(db_name):
+            try:
+                for i in range(100):
+                    fetched.append(i)
+                    yield [(i, i)]
+            finally:
+                done.set()
+
+        rows = _iter_pages_in_parallel(['db1'], iter_pages, ordered=False)
+        self.assertEqual(next(rows), (0, 0))
+        rows.close()
+        self.assertTrue(done.wait(timeout=5))
+        # fetching is bounded by the queue
+        self.assertLess(len(fetched), 5)
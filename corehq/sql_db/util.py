@@ -1,17 +1,23 @@
 import hashlib
+import heapq
+import queue
 import random
 import re
+import threading
 import uuid
 from collections import defaultdict
 from looseversion import LooseVersion
 from functools import wraps
+from operator import itemgetter
 
 from django.conf import settings
 from django.db import OperationalError, connections, transaction
+from django.db.models import Q
 from django.db.utils import DEFAULT_DB_ALIAS, DatabaseError
 from django.db.utils import InterfaceError as DjangoInterfaceError
 
 from corehq.sql_db.config import plproxy_config, plproxy_standby_config
+from corehq.sql_db.functions import RowValueCompare
 from corehq.util.metrics.load_counters import load_counter_for_model
 from corehq.util.quickcache import quickcache
 from memoized import memoized
@@ -69,7 +75,7 @@ def paginate_query_across_partitioned_databases(model_class, q_expression, annot
 
 
 def paginate_query(db_name, model_class, q_expression, annotate=None, query_size=5000, values=None,
-                   load_source=None):
+                   load_source=None, sort_key=('pk',), start_after=None, pages=False):
     """
     Runs a query on the given database in small chunks and produces a generator
     with the results.
@@ -87,41 +93,221 @@ def paginate_query(db_name, model_class, q_expression, annotate=None, query_size
     :param values: (optional) If specified, should be a list of values to retrieve rather
     than retrieving entire objects.
 
+    :param sort_key: (optional) The fields to paginate on, in order. The
+    primary key is added if it is not included, so that the key is unique.
+    Fields can be prefixed with "-" to sort in descending order, but then
+    all of them must be. Each page after the first is fetched with a
+    row-value comparison on these fields, ``(f1, f2, pk) > (v1, v2, v3)``,
+    which can use an index on the same fields, so deep pages cost no more
+    than the first page.
+
+    :param start_after: (optional) A tuple of values of the sort key
+    (including the primary key). Results start after this key, e.g. to
+    resume an earlier iteration.
+
+    :param pages: (optional) If True, yield lists of up to ``query_size``
+    results instead of individual results.
+
     :return: A generator with the results
     """
+    for page in _iter_query_pages(db_name, model_class, q_expression, annotate, query_size, values,
+                                  load_source, sort_key, start_after):
+        rows = [row for key, row in page]
+        if pages:
+            yield rows
+        else:
+            yield from rows
+
 
+def _iter_query_pages(db_name, model_class, q_expression, annotate, query_size, values, load_source,
+                      sort_key=('pk',), start_after=None):
+    """
+    Yields the pages of results of ``paginate_query()``, as lists of
+    ``(key, row)`` tuples, where ``key`` is a tuple of the row's sort
+    key values
+    """
     track_load = load_counter_for_model(model_class)(load_source, None)
-    sort_col = 'pk'
+    sort_cols, descending = _get_sort_columns(model_class, sort_key)
+    order_by = ['-' + col if descending else col for col in sort_cols]
 
     return_values = None
     if values:
-        return_values = [sort_col] + values
+        return_values = sort_cols + values
 
     qs = model_class.objects.using(db_name)
     if annotate:
         qs = qs.annotate(**annotate)
 
-    qs = qs.filter(q_expression).order_by(sort_col)
+    qs = qs.filter(q_expression).order_by(*order_by)
 
     if return_values:
         qs = qs.values_list(*return_values)
 
-    filter_expression = {}
+    key_len = len(sort_cols)
+    last_key = tuple(start_after) if start_after is not None else None
     while True:
-        results = qs.filter(**filter_expression)[:query_size]
+        if last_key is None:
+            results = qs[:query_size]
+        else:
+            results = qs.filter(_after_key(sort_cols, last_key, descending))[:query_size]
+        page = []
         for row in results:
             track_load()
             if return_values:
-                value = row[0]
-                yield row[1:]
+                page.append((row[:key_len], row[key_len:]))
             else:
-                value = row.pk
-                yield row
+                page.append((tuple(getattr(row, col) for col in sort_cols), row))
+        if page:
+            yield page
 
         if len(results) < query_size:
             break
 
-        filter_expression = {'{}__gt'.format(sort_col): value}
+        last_key = page[-1][0]
+
+
+def _get_sort_columns(model_class, sort_key):
+    """
+    Returns the fields of ``sort_key`` without "-" prefixes, with the
+    primary key appended if it is not included, and whether they are
+    sorted in descending order
+    """
+    directions = {col.startswith('-') for col in sort_key}
+    if len(directions) != 1:
+        raise ValueError(f"sort_key must be all ascending or all descending: {sort_key!r}")
+    descending = directions.pop()
+    sort_cols = [col.lstrip('-') for col in sort_key]
+    if not {'pk', model_class._meta.pk.name} & set(sort_cols):
+        sort_cols.append('pk')
+    return sort_cols, descending
+
+
+def _after_key(sort_cols, key, descending=False):
+    """
+    Returns a filter for rows that come after ``key`` in ``sort_cols``
+    order
+    """
+    if len(sort_cols) == 1:
+        lookup = 'lt' if descending else 'gt'
+        return Q(**{f'{sort_cols[0]}__{lookup}': key[0]})
+    return RowValueCompare(sort_cols, key, '<' if descending else '>')
+
+
+def paginate_query_across_partitioned_databases_in_parallel(
+    model_class,
+    q_expression,
+    annotate=None,
+    query_size=5000,
+    values=None,
+    load_source=None,
+    ordered=False,
+    sort_key=('pk',),
+):
+    """
+    Like ``paginate_query_across_partitioned_databases()``, but queries
+    all the partitioned databases at the same time. Each database is
+    queried in its own thread, with its own connection, which fetches
+    the next page of results while the current one is being consumed.
+
+    :param ordered: If True, results are yielded in ``sort_key`` order
+    across all databases. Otherwise they are yielded in the order in
+    which they are fetched.
+
+    :param sort_key: The fields to paginate on. See ``paginate_query()``.
+
+    :return: A generator with the results
+    """
+    def iter_pages(db_name):
+        try:
+            yield from _iter_query_pages(db_name, model_class, q_expression, annotate, query_size,
+                                         values, load_source, sort_key)
+        finally:
+            # Connections belong to the thread that opened them
+            connections[db_name].close()
+
+    __, descending = _get_sort_columns(model_class, sort_key)
+    db_names = get_db_aliases_for_partitioned_query()
+    for key, row in _iter_pages_in_parallel(db_names, iter_pages, ordered, descending):
+        yield row
+
+
+_END_OF_PAGES = object()
+
+
+class _FetchError:
+
+    def __init__(self, error):
+        self.error = error
+
+
+def _iter_pages_in_parallel(db_names, iter_pages, ordered, descending=False):
+    """
+    Calls ``iter_pages(db_name)`` for each of ``db_names`` in its own
+    thread, and yields the ``(key, row)`` tuples of its pages.
+
+    Each thread can fetch one page ahead. If ``ordered`` is True, each
+    database has a queue of pages, and rows are merged by key.
+    Otherwise all databases share a queue.
+    """
+    stop = threading.Event()
+    if ordered:
+        page_queues = {db_name: queue.Queue(maxsize=1) for db_name in db_names}
+    else:
+        shared_queue = queue.Queue(maxsize=len(db_names))
+        page_queues = {db_name: shared_queue for db_name in db_names}
+    for db_name in db_names:
+        threading.Thread(
+            target=_fetch_pages,
+            args=(iter_pages, db_name, page_queues[db_name], stop),
+            name=f'paginate-{db_name}',
+            daemon=True,
+        ).start()
+    try:
+        if ordered:
+            yield from heapq.merge(
+                *(_iter_queued_rows(page_queues[db_name], 1) for db_name in db_names),
+                key=itemgetter(0),
+                reverse=descending,
+            )
+        else:
+            yield from _iter_queued_rows(shared_queue, len(db_names))
+    finally:
+        # Stop threads that are still fetching if the generator is
+        # closed early or raises an exception
+        stop.set()
+
+
+def _fetch_pages(iter_pages, db_name, page_queue, stop):
+    try:
+        for page in iter_pages(db_name):
+            if not _put_unless_stopped(page_queue, page, stop):
+                return
+    except Exception as err:
+        _put_unless_stopped(page_queue, _FetchError(err), stop)
+    else:
+        _put_unless_stopped(page_queue, _END_OF_PAGES, stop)
+
+
+def _put_unless_stopped(page_queue, item, stop):
+    while not stop.is_set():
+        try:
+            page_queue.put(item, timeout=1)
+            return True
+        except queue.Full:
+            continue
+    return False
+
+
+def _iter_queued_rows(page_queue, num_producers):
+    finished = 0
+    while finished < num_producers:
+        item = page_queue.get()
+        if item is _END_OF_PAGES:
+            finished += 1
+        elif isinstance(item, _FetchError):
+            raise item.error
+        else:
+            yield from item
 
 
 def estimate_partitioned_row_count(model_class, q_expression):
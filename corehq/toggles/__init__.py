@@ -921,6 +921,18 @@ ASYNC_RESTORE = StaticToggle(
     [NAMESPACE_DOMAIN],
 )
 
+SINGLE_PASS_RESTORE_CONTENT = StaticToggle(
+    'single_pass_restore_content',
+    'Write restore payloads to disk in a single pass',
+    TAG_INTERNAL,
+    [NAMESPACE_DOMAIN],
+    description=(
+        "Write the restore payload header with a fixed-width item count that is "
+        "filled in once the payload is complete, instead of copying the whole "
+        "payload into a second temporary file. Reduces disk I/O for large restores."
+    ),
+)
+
 REPORT_BUILDER_BETA_GROUP = StaticToggle(
     'report_builder_beta_group',
     'RB beta group',
@@ -2076,6 +2088,42 @@ DECREASE_REPEATER_TIMEOUT = StaticToggle(
     """
 )
 
+ASYNC_REPEATER_DISPATCHER = StaticToggle(
+    'async_repeater_dispatcher',
+    'Send repeat records with the asynchronous repeater dispatcher',
+    TAG_INTERNAL,
+    [NAMESPACE_DOMAIN],
+    description="""
+    Requires "process_repeaters". Instead of a Celery chord that sends each
+    repeat record in its own task, the repeaters of the project are
+    processed concurrently with many others in one worker process.
+    """
+)
+
+MOTECH_SESSION_POOL = StaticToggle(
+    'motech_session_pool',
+    'Reuse HTTP sessions when forwarding data to external endpoints.',
+    TAG_INTERNAL,
+    [NAMESPACE_DOMAIN],
+    description="""
+    Requests to remote APIs (repeaters, DHIS2, OpenMRS, FHIR) reuse the open
+    connections and OAuth 2.0 tokens of earlier requests made with the same
+    connection settings, instead of opening a new session for every request.
+    """
+)
+
+MOTECH_BUFFERED_REQUEST_LOGS = StaticToggle(
+    'motech_buffered_request_logs',
+    'Save the logs of requests to external endpoints in batches.',
+    TAG_INTERNAL,
+    [NAMESPACE_DOMAIN],
+    description="""
+    Logs of requests to remote APIs are buffered in memory and saved in bulk
+    by a background thread every few seconds, instead of being saved before
+    the request returns. Logs may appear in Remote API Logs a few seconds late.
+    """
+)
+
 TEST_FORM_SUBMISSION_RATE_LIMIT_RESPONSE = StaticToggle(
     'test_form_submission_rate_limit_response',
     "Respond to all form submissions with a 429 response",
@@ -2159,6 +2207,30 @@ LIVEQUERY_READ_FROM_STANDBYS = DynamicallyPredictablyRandomToggle(
     """
 )
 
+LIVEQUERY_CLOSURE_INDEX = StaticToggle(
+    'livequery_closure_index',
+    'Reuse stored live case closures in livequery restores',
+    TAG_INTERNAL,
+    [NAMESPACE_DOMAIN],
+    description="""
+    Store the set of live cases computed for each restore user's owners
+    and reuse it until a case in it changes, instead of walking the case
+    graph on every sync. Closures are invalidated from the case pillow.
+    """
+)
+
+LIVEQUERY_PIPELINED_RESTORE = StaticToggle(
+    'livequery_pipelined_restore',
+    'Overlap case fetching and case XML serialization in livequery restores',
+    TAG_INTERNAL,
+    [NAMESPACE_DOMAIN],
+    description="""
+    Fetch the next batch of cases on a background thread and serialize
+    case XML on a pool of worker threads while the restore payload is
+    being written. Intended for users with very large caseloads.
+    """
+)
+
 ACCOUNTING_TESTING_TOOLS = StaticToggle(
     'accounting_testing_tools',
     'Enable Accounting Testing Tools',
@@ -2379,6 +2451,47 @@ UCR_EXPRESSION_REGISTRY = StaticToggle(
     help_link="https://confluence.dimagi.com/display/saas/UCR+Expression+Registry",
 )
 
+UCR_COMPILED_EXPRESSIONS = StaticToggle(
+    'ucr_compiled_expressions',
+    'Evaluate data source filters and indicators with the compiled UCR evaluator',
+    TAG_INTERNAL,
+    namespaces=[NAMESPACE_DOMAIN],
+    description="""
+    Data sources are compiled into flat functions, sharing subexpressions
+    used by more than one column, instead of walking the spec objects for
+    every document. Takes effect when the data source configuration is
+    next loaded by the pillow.
+    """,
+)
+
+UCR_PREFETCH_RELATED_DOCS = StaticToggle(
+    'ucr_prefetch_related_docs',
+    'Bulk load related documents for each chunk of changes processed by the UCR pillow',
+    TAG_INTERNAL,
+    namespaces=[NAMESPACE_DOMAIN],
+    description="""
+    Before a chunk of changes is processed, the ids used by related_doc,
+    related_case and location lookups in all the domain's data sources are
+    evaluated for every document, and the related documents are loaded
+    with one query per document type instead of one query per lookup.
+    """,
+)
+
+UCR_COPY_LOADER = StaticToggle(
+    'ucr_copy_loader',
+    'Save UCR rows with PostgreSQL COPY',
+    TAG_INTERNAL,
+    namespaces=[NAMESPACE_DOMAIN],
+    description="""
+    Large batches of rows saved by the UCR pillow, and the rows saved
+    while a data source is rebuilt, are streamed into a staging table
+    with COPY and merged into the data source table with a single
+    statement, instead of being saved with an INSERT built from every row.
+    Rows saved while rebuilding a data source from scratch are copied
+    straight into the new table.
+    """,
+)
+
 ARCGIS_INTEGRATION = StaticToggle(
     'arcgis_integration',
     'Enable the ArcGIS Form Repeater integration. Used for forwarding form data to an ArcGIS account.',
@@ -2454,6 +2567,33 @@ CASE_IMPORT_DATA_DICTIONARY_VALIDATION = StaticToggle(
     help_link="https://confluence.dimagi.com/display/saas/Validate+data+per+data+dictionary+definitions+during+case+import",  # noqa: E501
 )
 
+CASE_IMPORT_PIPELINED_SUBMISSION = StaticToggle(
+    'case_import_pipelined_submission',
+    'Submit case import forms in the background while the next rows are read',
+    TAG_INTERNAL,
+    namespaces=[NAMESPACE_DOMAIN],
+    description="""
+    The case importer submits a form for each chunk of rows, and waits
+    for it to be processed before it reads more rows. With this toggle
+    enabled, forms are submitted by a background thread, so reading and
+    validating the next chunk of rows overlaps with processing the last
+    one.
+    """
+)
+
+CACHE_FORM_JSON = StaticToggle(
+    'cache_form_json',
+    'Cache the JSON of form XML so that consumers of a form do not parse it again',
+    TAG_INTERNAL,
+    namespaces=[NAMESPACE_DOMAIN],
+    description="""
+    The xform pillow, UCR pillow, case search pillow, repeaters and
+    exports each parse the XML of the forms they process. With this
+    toggle enabled, the parsed form data is cached for an hour, and
+    forms fetched together get their cached form data in one request.
+    """
+)
+
 DO_NOT_REPUBLISH_DOCS = StaticToggle(
     'do_not_republish_docs',
     'Prevents automatic attempts to repair stale ES docs in this domain',
@@ -2941,6 +3081,15 @@ SUPPORT_ROAD_NETWORK_DISBURSEMENT_ALGORITHM = StaticToggle(
     description='Add support for the Road Network disbursement algorithm for the Geospatial feature',
 )
 
+CLUSTERED_DISBURSEMENT_ALGORITHM = StaticToggle(
+    slug='clustered_disbursement_algorithm',
+    label='Split Radial Algorithm case disbursement into clusters of nearby users and cases',
+    tag=TAG_SOLUTIONS_OPEN,
+    namespaces=[NAMESPACE_DOMAIN],
+    description='Solves large case disbursements as several smaller problems, one for each cluster '
+                'of nearby users and cases, instead of one problem for all users and cases',
+)
+
 USH_RESTORE_FILE_LOCATION_CASE_SYNC_RESTRICTION = StaticToggle(
     'ush_restore_file_location_case_sync_restriction',
     'USH: Limit the location-owned cases in a user\'s restore file, and allow marking whether a '
@@ -65,7 +65,9 @@ class Toggle(Document):
         self.bust_cache()
 
     def bust_cache(self):
+        from .snapshot import toggle_snapshot
         self.cached_get.clear(self.__class__, self.slug)
+        toggle_snapshot.invalidate()
 
 
 def generate_toggle_id(slug):
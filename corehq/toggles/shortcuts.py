@@ -2,6 +2,7 @@ from couchdbkit import ResourceNotFound
 from django.conf import settings
 
 from .models import Toggle
+from .snapshot import toggle_snapshot
 
 
 def toggle_enabled(slug, item, namespace=None):
@@ -14,8 +15,7 @@ def toggle_enabled(slug, item, namespace=None):
 
     item = namespaced_item(item, namespace)
     if not settings.UNIT_TESTING or getattr(settings, 'DB_ENABLED', True):
-        toggle = Toggle.cached_get(slug)
-        return item in toggle.enabled_users if toggle else False
+        return toggle_snapshot.is_enabled(slug, item)
 
 
 def set_toggle(slug, item, enabled, namespace=None):
@@ -0,0 +1,126 @@
+"""
+A per-process snapshot of the items that toggles are enabled for.
+
+``toggle_enabled()`` is called for nearly every request, and for every
+toggle by ``toggles_enabled_for_domain()``. Without the snapshot, each
+call gets the toggle doc from quickcache, and looks for the item in its
+list of enabled items.
+
+``toggle_snapshot`` keeps the enabled items of each toggle that has
+been checked in a frozenset, so a check is a set lookup in memory.
+
+A version number in Redis is incremented whenever a toggle is saved or
+deleted. The snapshot checks the version at most once every
+``VERSION_CHECK_INTERVAL`` seconds, and drops its sets when the
+version has changed. Items are loaded again, one toggle at a time, as
+they are checked. As a precaution, sets are also dropped after
+``MAX_SNAPSHOT_AGE`` seconds.
+
+Items are loaded from ``Toggle.cached_get()``, which memoizes toggle
+docs in each process for ``QUICKCACHE_MEMOIZE_TIMEOUT`` seconds. A
+process other than the one that saved a toggle may get the old doc from
+its memo until then, so items loaded within that time after the
+snapshot was dropped are not kept in it.
+
+Changes to toggles are seen immediately by the process that made them,
+and within ``VERSION_CHECK_INTERVAL + QUICKCACHE_MEMOIZE_TIMEOUT``
+seconds by other processes.
+"""
+import logging
+import time
+
+from django.conf import settings
+
+from dimagi.utils.couch.cache.cache_core import get_redis_client
+
+from .models import Toggle
+
+VERSION_KEY = 'toggles:snapshot_version'
+VERSION_CHECK_INTERVAL = 5
+MAX_SNAPSHOT_AGE = 5 * 60
+# memoize_timeout of corehq.util.quickcache.quickcache
+QUICKCACHE_MEMOIZE_TIMEOUT = 10
+
+logger = logging.getLogger(__name__)
+
+
+class ToggleSnapshot:
+
+    def __init__(self):
+        self._items_by_slug = {}
+        self._version = None
+        self._next_version_check = 0
+        self._expires = 0
+        self._keep_items_after = 0
+
+    def is_enabled(self, slug, item):
+        return item in self.get_items(slug)
+
+    def get_items(self, slug):
+        """
+        Returns a frozenset of the items that the toggle is enabled for
+        """
+        if settings.UNIT_TESTING:
+            # Tests change toggle docs without saving them
+            return _load_items(slug)
+        self._check_version()
+        if time.monotonic() < self._keep_items_after:
+            # Toggle docs memoized before the snapshot was dropped may
+            # be out of date
+            return _load_items(slug)
+        # A reference is kept so that items loaded while the snapshot
+        # is dropped by another thread are not added to the new one
+        items_by_slug = self._items_by_slug
+        try:
+            return items_by_slug[slug]
+        except KeyError:
+            items = items_by_slug[slug] = _load_items(slug)
+            return items
+
+    def invalidate(self):
+        """
+        Drops the snapshot in this process, and increments the version
+        so that other processes drop theirs.
+        """
+        try:
+            self._version = get_redis_client().client.get_client().incr(VERSION_KEY)
+        except Exception:
+            logger.exception('Failed to increment the toggle snapshot version')
+            self._version = None
+        self._reset()
+
+    def _check_version(self):
+        now = time.monotonic()
+        if now < self._next_version_check:
+            return
+        self._next_version_check = now + VERSION_CHECK_INTERVAL
+        try:
+            version = _get_version()
+        except Exception:
+            logger.exception('Failed to get the toggle snapshot version')
+            # If the version cannot be checked, the snapshot cannot be
+            # trusted for longer than VERSION_CHECK_INTERVAL
+            version = None
+        if version is None or version != self._version or now >= self._expires:
+            self._version = version
+            self._reset()
+
+    def _reset(self):
+        now = time.monotonic()
+        self._items_by_slug = {}
+        self._expires = now + MAX_SNAPSHOT_AGE
+        self._keep_items_after = now + QUICKCACHE_MEMOIZE_TIMEOUT
+
+
+def _get_version():
+    version = get_redis_client().client.get_client().get(VERSION_KEY)
+    # A version that has never been set is treated like any other
+    return 0 if version is None else int(version)
+
+
+def _load_items(slug):
+    toggle = Toggle.cached_get(slug)
+    return frozenset(toggle.enabled_users) if toggle else frozenset()
+
+
+toggle_snapshot = ToggleSnapshot()
@@ -1,4 +1,5 @@
 import uuid
+from unittest.mock import patch
 
 from couchdbkit import ResourceConflict
 from couchdbkit.exceptions import ResourceNotFound
@@ -18,6 +19,7 @@ from corehq.toggles import (
     TWO_STAGE_USER_PROVISIONING_BY_SMS,
 )
 from .models import generate_toggle_id, Toggle
+from .snapshot import ToggleSnapshot
 from .shortcuts import (
     namespaced_item,
     find_users_with_toggle_enabled,
@@ -424,3 +426,69 @@ class NamespaceTests(TestCase):
         self.assertFalse(user_toggle.enabled(self.second_user.username))
         self.assertTrue(user_toggle.enabled_for_request(self.request))
         self.assertFalse(user_toggle.enabled_for_request(self.second_request))
+
+
+@override_settings(UNIT_TESTING=False)
+@patch('corehq.toggles.snapshot.VERSION_CHECK_INTERVAL', 0)
+@patch('corehq.toggles.snapshot.QUICKCACHE_MEMOIZE_TIMEOUT', 0)
+class ToggleSnapshotTests(SimpleTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.snapshot = ToggleSnapshot()
+        load_patcher = patch('corehq.toggles.snapshot._load_items',
+                             return_value=frozenset(['domain:joto']))
+        self.load_items = load_patcher.start()
+        self.addCleanup(load_patcher.stop)
+
+    def test_items_loaded_once(self):
+        with patch('corehq.toggles.snapshot._get_version', return_value=1):
+            self.assertTrue(self.snapshot.is_enabled('toggle', 'domain:joto'))
+            self.assertFalse(self.snapshot.is_enabled('toggle', 'domain:other'))
+        self.load_items.assert_called_once_with('toggle')
+
+    def test_reloaded_when_version_changes(self):
+        with patch('corehq.toggles.snapshot._get_version', side_effect=[1, 1, 2]):
+            for __ in range(3):
+                self.snapshot.is_enabled('toggle', 'domain:joto')
+        self.assertEqual(self.load_items.call_count, 2)
+
+    def test_reloaded_when_version_is_unavailable(self):
+        with patch('corehq.toggles.snapshot._get_version', side_effect=ConnectionError):
+            for __ in range(2):
+                self.snapshot.is_enabled('toggle', 'domain:joto')
+        self.assertEqual(self.load_items.call_count, 2)
+
+    def test_invalidate(self):
+        with patch('corehq.toggles.snapshot._get_version', side_effect=[1, 2]), \
+                patch('corehq.toggles.snapshot.get_redis_client') as get_redis_client:
+            get_redis_client().client.get_client().incr.return_value = 2
+            self.snapshot.is_enabled('toggle', 'domain:joto')
+            self.snapshot.invalidate()
+            self.snapshot.is_enabled('toggle', 'domain:joto')
+        self.assertEqual(self.load_items.call_count, 2)
+
+    @patch('corehq.toggles.snapshot.QUICKCACHE_MEMOIZE_TIMEOUT', 10)
+    def test_items_memoized_before_version_change_are_not_kept(self):
+        # The toggle is saved by another process, and the toggle doc
+        # memoized by this process is out of date for up to 10 seconds
+        clock = [1000]
+        self.load_items.side_effect = [
+            frozenset(['domain:joto']),
+            frozenset(['domain:joto']),
+            frozenset(['domain:joto']),  # memoized doc is out of date
+            frozenset(),
+        ]
+        versions = [1, 1, 2, 2, 2]
+        with patch('corehq.toggles.snapshot._get_version', side_effect=versions), \
+                patch('corehq.toggles.snapshot.time.monotonic', side_effect=lambda: clock[0]):
+            self.assertTrue(self.snapshot.is_enabled('toggle', 'domain:joto'))
+            clock[0] += 11
+            self.assertTrue(self.snapshot.is_enabled('toggle', 'domain:joto'))
+            clock[0] += 1  # version changed
+            self.assertTrue(self.snapshot.is_enabled('toggle', 'domain:joto'))
+            clock[0] += 11
+            self.assertFalse(self.snapshot.is_enabled('toggle', 'domain:joto'))
+            clock[0] += 1
+            self.assertFalse(self.snapshot.is_enabled('toggle', 'domain:joto'))
+        self.assertEqual(self.load_items.call_count, 4)
@@ -555,6 +555,14 @@ RESTORE_PAYLOAD_DIR_NAME = None
 SHARED_TEMP_DIR_NAME = None
 SHARED_BLOB_DIR_NAME = 'blobdb'
 
+# Read-through cache of S3 blobs on local disk. See corehq/blobs/cachingdb.py
+# BLOB_DB_CACHE = {
+#     "path": "/opt/blobcache",
+#     "max_size": 10 * 1024 ** 3,  # bytes
+#     "type_codes": ["form_xml"],  # only blobs that never change
+# }
+BLOB_DB_CACHE = None
+
 ## django-transfer settings
 # These settings must match the apache / nginx config
 TRANSFER_SERVER = None  # 'apache' or 'nginx'
@@ -636,6 +644,15 @@ DEFAULT_REPEATER_WORKERS = 7
 # guardrail to prevent one repeater from hogging repeat_record_queue
 # workers and to ensure that repeaters are iterated fairly.
 MAX_REPEATER_WORKERS = 79
+# The hard limit for the number of repeat records that a repeater can
+# send in one request, if its payload format supports sending payloads
+# in batches.
+MAX_REPEATER_BATCH_SIZE = 100
+# The maximum number of repeaters that one dispatch_repeaters task
+# processes concurrently, and the number of threads it uses to send
+# their repeat records.
+REPEATER_DISPATCHER_MAX_REPEATERS = 50
+REPEATER_DISPATCHER_THREADS = 100
 
 # websockets config
 WEBSOCKET_URL = '/ws/'
@@ -824,6 +841,7 @@ RUN_FORM_META_PILLOW = True
 RUN_CASE_SEARCH_PILLOW = True
 RUN_UNKNOWN_USER_PILLOW = True
 RUN_DEDUPLICATION_PILLOW = True
+RUN_CASE_CLOSURE_INDEX_PILLOW = True
 
 # Repeaters in the order in which they should appear in "Data Forwarding"
 REPEATER_CLASSES = [
@@ -17,13 +17,16 @@ from corehq.apps.es import CaseSearchES
 from corehq.apps.es.case_search import case_search_adapter
 from corehq.apps.es.client import manager
 from corehq.apps.es.tests.utils import es_test
+from corehq.form_processor.document_stores import CaseDocumentStore
 from corehq.form_processor.tests.utils import FormProcessorTestUtils
 from corehq.pillows.case import get_case_pillow
 from corehq.pillows.case_search import (
     CaseSearchReindexerFactory,
     delete_case_search_cases,
+    get_case_search_processor,
 )
 from corehq.util.test_utils import create_and_save_a_case, privilege_enabled
+from pillowtop.feed.interface import Change, ChangeMeta
 
 
 @es_test(requires=[case_search_adapter])
@@ -95,6 +98,73 @@ class CaseSearchPillowTest(TestCase):
 
         self._assert_case_in_es(self.domain, case)
 
+    def test_process_changes_chunk(self):
+        cases = [self._make_case(case_properties={'something': 'something_else'}) for i in range(3)]
+        missing_case_id = uuid.uuid4().hex
+        changes = self._changes_from_ids([case.case_id for case in cases] + [missing_case_id])
+        processor = get_case_search_processor()
+
+        with patch('corehq.pillows.case_search.domain_needs_search_index', return_value=True):
+            retry, errors = processor.process_changes_chunk(changes)
+
+        self.assertEqual([change.id for change in retry], [missing_case_id])
+        self.assertEqual(errors, [])
+        manager.index_refresh(case_search_adapter.index_name)
+        self.assertEqual(
+            set(CaseSearchES().get_ids()),
+            {case.case_id for case in cases},
+        )
+
+    def test_process_changes_chunk_retries_failed_items(self):
+        cases = [self._make_case() for i in range(2)]
+        changes = self._changes_from_ids([case.case_id for case in cases])
+        processor = get_case_search_processor()
+        bulk_response = (1, [{'index': {'_id': cases[0].case_id, 'error': 'MapperParsingException'}}])
+
+        with patch('corehq.pillows.case_search.domain_needs_search_index', return_value=True), \
+             patch.object(case_search_adapter, 'bulk', return_value=bulk_response) as bulk:
+            retry, errors = processor.process_changes_chunk(changes)
+
+        bulk.assert_called_once()
+        self.assertEqual([change.id for change in retry], [cases[0].case_id])
+        self.assertEqual(errors, [])
+
+    def test_process_changes_chunk_retries_all_after_bulk_error(self):
+        cases = [self._make_case() for i in range(2)]
+        changes = self._changes_from_ids([case.case_id for case in cases])
+        processor = get_case_search_processor()
+
+        with patch('corehq.pillows.case_search.domain_needs_search_index', return_value=True), \
+             patch.object(case_search_adapter, 'bulk', side_effect=ConnectionError):
+            retry, errors = processor.process_changes_chunk(changes)
+
+        self.assertEqual({change.id for change in retry}, {case.case_id for case in cases})
+        self.assertEqual(errors, [])
+
+    def test_process_changes_chunk_skips_domains_without_search_index(self):
+        case = self._make_case()
+        processor = get_case_search_processor()
+
+        with patch('corehq.pillows.case_search.domain_needs_search_index', return_value=False), \
+             patch.object(case_search_adapter, 'bulk') as bulk:
+            retry, errors = processor.process_changes_chunk(self._changes_from_ids([case.case_id]))
+
+        bulk.assert_not_called()
+        self.assertEqual((retry, errors), ([], []))
+
+    def _changes_from_ids(self, case_ids):
+        return [
+            Change(
+                id=case_id,
+                sequence_id=None,
+                document_store=CaseDocumentStore(self.domain),
+                metadata=ChangeMeta(
+                    document_id=case_id, domain=self.domain, data_source_type='sql', data_source_name='case-sql'
+                )
+            )
+            for case_id in case_ids
+        ]
+
     def _get_kafka_seq(self):
         return get_topic_offset(topics.CASE_SQL)
 